@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+
+def write_atomic(path: str, content) -> None:
+    """
+    Writes a file through a temporary file in the same folder renamed over the target, so a crash mid-save leaves
+    either the old file or the new one, never half of each.
+    :param path: File to (over)write.
+    :param content: Whole content of the file, text or bytes.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=folder, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb' if isinstance(content, (bytes, bytearray)) else 'w') as outfile:
+            outfile.write(content)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
@@ -0,0 +1,310 @@
+import json
+import os
+from enum import Enum
+
+import numpy as np
+
+from data.atomic_write import write_atomic
+from data.player import PLAYER_FILE_PATH, SKILL_ATTRIBUTES, BattingStatistics, FieldingStatistics, PitchingStatistics, \
+    Player, PlayerStatistics, load_player_file, make_rating_vector
+from data.stat_history import HistoryMode, StatHistory
+from data.team import TEAM_SAVE_FOLDER, Team, load_team_file, save_league
+
+SNAPSHOT_MAGIC = b'FOULSNAP'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ALIGNMENT = 64  # every column starts on a multiple of this, so the memory-mapped views are aligned
+SNAPSHOT_FILE_PATH = 'saves/league.snapshot'
+
+# Player columns: plain fields, strings (stored as indices into one string table), and the stats #
+SNAPSHOT_INTEGER_FIELDS = ['age', 'height_inches', 'weight_lbs', 'position', 'jersey_number']
+SNAPSHOT_STRING_FIELDS = ['gender', 'first_name', 'last_name', 'full_name', 'nationality', 'handedness', 'team']
+SNAPSHOT_STAT_GROUPS = {'batting': BattingStatistics, 'fielding': FieldingStatistics, 'pitching': PitchingStatistics}
+
+
+class SaveFormat(Enum):
+    JSON = 0  # players file + one file per team, saved incrementally
+    SNAPSHOT = 1  # one binary file, memory-mapped on load
+
+
+def get_stat_layout() -> (dict, dict):
+    """
+    :return: Counting stats (group -> attribute names) and batted ball histories (group -> name -> StatHistory), both
+    taken from empty stats so new stats are picked up without touching this file.
+    """
+    counters = {}
+    histories = {}
+    for group, stats_class in SNAPSHOT_STAT_GROUPS.items():
+        empty = stats_class()
+        counters[group] = [name for name, value in vars(empty).items() if not isinstance(value, StatHistory)]
+        histories[group] = {name: value for name, value in vars(empty).items() if isinstance(value, StatHistory)}
+    return counters, histories
+
+
+def build_string_table(strings: list) -> (bytes, np.ndarray, dict):
+    """
+    :return: UTF-8 blob of the distinct strings, their offsets in it (one more than strings) and string -> index.
+    """
+    index = {}
+    for string in strings:
+        index.setdefault(string, len(index))
+    encoded = [string.encode('utf-8') for string in index]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    offsets[1:] = np.cumsum([len(string) for string in encoded])
+    return b''.join(encoded), offsets, index
+
+
+def get_history_columns(histories: list, dtype: np.dtype) -> dict:
+    """
+    Packs one history per player into flat columns: values and histogram counts are concatenated, each with an
+    offsets column (row i owns offsets[i]:offsets[i + 1]).
+    """
+    count = len(histories)
+    modes = np.zeros(count, dtype='u1')
+    counts = np.zeros(count, dtype='<i8')
+    totals = np.zeros(count, dtype='<f8')
+    offsets = np.zeros(count + 1, dtype='<i8')
+    bin_offsets = np.zeros(count + 1, dtype='<i8')
+    values = []
+    bin_counts = []
+    for row, history in enumerate(histories):
+        modes[row] = history.mode.value
+        counts[row] = history.count
+        totals[row] = history.total
+        if history.mode == HistoryMode.HISTOGRAM:
+            bin_counts.append(history.bin_counts)
+            offsets[row + 1] = offsets[row]
+            bin_offsets[row + 1] = bin_offsets[row] + len(history.bin_counts)
+        else:
+            values.append(history.get_values())
+            offsets[row + 1] = offsets[row] + history.size
+            bin_offsets[row + 1] = bin_offsets[row]
+    return {
+        'mode': modes,
+        'count': counts,
+        'total': totals,
+        'offsets': offsets,
+        'values': np.concatenate(values).astype(dtype) if values else np.zeros(0, dtype=dtype),
+        'bin_offsets': bin_offsets,
+        'bin_counts': np.concatenate(bin_counts).astype('<i8') if bin_counts else np.zeros(0, dtype='<i8')
+    }
+
+
+def write_league_snapshot(teams: list, path: str = SNAPSHOT_FILE_PATH) -> None:
+    """
+    Saves the teams and all their players as one snapshot file (atomically): a JSON header (teams, column layout)
+    followed by one fixed-width column per player field, a string table, and flat batted ball history columns.
+    Loses nothing of the JSON save, see LeagueSnapshot to read it back.
+    """
+    players = [player for team in teams for player in team.forty_man_roster]
+    counters, histories = get_stat_layout()
+    columns = {}
+
+    # Player Data #
+    for name in SNAPSHOT_INTEGER_FIELDS:
+        columns[name] = np.array([getattr(player, name) for player in players], dtype='<i8')
+    columns['ratings'] = np.array([player.ratings for player in players], dtype='<f8').reshape(len(players), len(SKILL_ATTRIBUTES))
+    blob, string_offsets, string_index = build_string_table([getattr(player, name) for player in players for name in SNAPSHOT_STRING_FIELDS])
+    for name in SNAPSHOT_STRING_FIELDS:
+        columns[name] = np.array([string_index[getattr(player, name)] for player in players], dtype='<i4')
+    columns['strings'] = np.frombuffer(blob, dtype='u1')
+    columns['string_offsets'] = string_offsets
+
+    # Stats #
+    history_layout = {}
+    for group in SNAPSHOT_STAT_GROUPS:
+        group_stats = [getattr(player.stats, group) for player in players]
+        for name in counters[group]:
+            values = [getattr(stats, name) for stats in group_stats]
+            if not all(isinstance(value, int) for value in values):
+                raise ValueError('Counting stat ' + group + '.' + name + ' is not an integer, it cannot be stored in a snapshot!')
+            columns[group + '.' + name] = np.array(values, dtype='<i8')
+        for name, empty in histories[group].items():
+            group_histories = [getattr(stats, name) for stats in group_stats]
+            for history in group_histories:
+                if history.mode == HistoryMode.HISTOGRAM and tuple(history.bins) != tuple(empty.bins):
+                    raise ValueError('Histogram bins of ' + group + '.' + name + ' differ from ' + str(empty.bins) + ', they cannot be stored in a snapshot!')
+            for part, column in get_history_columns(group_histories, empty.dtype.newbyteorder('<')).items():
+                columns[group + '.' + name + '.' + part] = column
+            history_layout[group + '.' + name] = {'dtype': empty.dtype.str, 'bins': list(empty.bins)}
+
+    # Layout: header first, then each column at an aligned offset #
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'player_count': len(players),
+        'ratings': SKILL_ATTRIBUTES,
+        'counters': counters,
+        'histories': history_layout,
+        'teams': [],
+        'columns': {}
+    }
+    start = 0
+    for team in teams:
+        team_data = team.to_dict()
+        team_data['player_rows'] = [start, start + len(team.forty_man_roster)]
+        header['teams'].append(team_data)
+        start += len(team.forty_man_roster)
+    offset = 0
+    for name, column in columns.items():
+        header['columns'][name] = {'dtype': column.dtype.str, 'shape': list(column.shape), 'offset': offset}
+        offset += -(-column.nbytes // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    data_start = -(-(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)) // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+    content = bytearray(data_start + offset)
+    content[:len(SNAPSHOT_MAGIC)] = SNAPSHOT_MAGIC
+    content[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 8] = np.uint64(len(header_bytes)).astype('<u8').tobytes()
+    content[len(SNAPSHOT_MAGIC) + 8:len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)] = header_bytes
+    for name, column in columns.items():
+        column_start = data_start + header['columns'][name]['offset']
+        content[column_start:column_start + column.nbytes] = np.ascontiguousarray(column).tobytes()
+    write_atomic(path, content)
+
+
+class LeagueSnapshot:
+    """
+    Read side of a snapshot file. Opening it only parses the header and memory-maps the rest: columns are read-only
+    NumPy views of the file (e.g. get_column('ratings') for league-wide queries), and Player objects are built on
+    demand, for the rows asked for.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_FILE_PATH):
+        with open(path, 'rb') as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(path + ' is not a league snapshot!')
+            header_length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+            self.header = json.loads(f.read(header_length).decode('utf-8'))
+        if self.header['version'] != SNAPSHOT_VERSION:
+            raise ValueError('Unsupported snapshot version ' + str(self.header['version']) + '!')
+        if self.header['ratings'] != SKILL_ATTRIBUTES:
+            raise ValueError('Snapshot ratings ' + str(self.header['ratings']) + ' do not match ' + str(SKILL_ATTRIBUTES) + '!')
+        data_start = -(-(len(SNAPSHOT_MAGIC) + 8 + header_length) // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        self.columns = {}
+        for name, spec in self.header['columns'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = data_start + spec['offset']
+            size = int(np.prod(spec['shape'], dtype=np.int64)) * dtype.itemsize
+            self.columns[name] = self.data[start:start + size].view(dtype).reshape(spec['shape'])
+        self.strings = None  # decoded string table, see get_string
+        self.player_rows = None  # player id -> row, see find_player
+
+    def __len__(self):
+        return self.header['player_count']
+
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        :param name: Column, e.g. 'ratings', 'age' or 'batting.home_runs'.
+        :return: Read-only view of the column, one entry per player row.
+        """
+        return self.columns[name]
+
+    def get_string(self, index: int) -> str:
+        if self.strings is None:
+            blob = self.columns['strings'].tobytes()
+            offsets = self.columns['string_offsets'].tolist()
+            self.strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return self.strings[index]
+
+    def get_history(self, name: str, row: int) -> StatHistory:
+        """
+        :param name: History, e.g. 'batting.exit_velocity'.
+        :param row: Player row.
+        """
+        layout = self.header['histories'][name]
+        mode = HistoryMode(int(self.columns[name + '.mode'][row]))
+        offsets = self.columns[name + '.offsets']
+        values = self.columns[name + '.values'][offsets[row]:offsets[row + 1]]
+        if mode == HistoryMode.FULL:  # loaded like a JSON list, so in HISTORY_MODE
+            history = StatHistory(tuple(layout['bins']), layout['dtype'])
+            if history.mode != HistoryMode.FULL:
+                history.extend(values)
+                return history
+            history.values = np.array(values, dtype=history.dtype)
+            history.size = len(values)
+        else:
+            history = StatHistory(tuple(layout['bins']), layout['dtype'], mode)
+            if mode == HistoryMode.HISTOGRAM:
+                bin_offsets = self.columns[name + '.bin_offsets']
+                history.bin_counts = np.array(self.columns[name + '.bin_counts'][bin_offsets[row]:bin_offsets[row + 1]], dtype=np.int64)
+            else:
+                history.values = np.array(values, dtype=history.dtype)
+                history.size = len(values)
+        history.count = int(self.columns[name + '.count'][row])
+        history.total = float(self.columns[name + '.total'][row])
+        return history
+
+    def get_player(self, row: int) -> Player:
+        """
+        Materializes the player of a row.
+        """
+        player = Player.__new__(Player)
+        for name in SNAPSHOT_INTEGER_FIELDS:
+            setattr(player, name, int(self.columns[name][row]))
+        for name in SNAPSHOT_STRING_FIELDS:
+            setattr(player, name, self.get_string(int(self.columns[name][row])))
+        player.ratings = make_rating_vector(self.columns['ratings'][row].astype(np.float64).tobytes())
+        player.stats = PlayerStatistics.__new__(PlayerStatistics)
+        for group, stats_class in SNAPSHOT_STAT_GROUPS.items():
+            stats = stats_class.__new__(stats_class)
+            for name in self.header['counters'][group]:
+                setattr(stats, name, int(self.columns[group + '.' + name][row]))
+            for name in self.header['histories']:
+                if name.startswith(group + '.'):
+                    setattr(stats, name[len(group) + 1:], self.get_history(name, row))
+            setattr(player.stats, group, stats)
+        return player
+
+    def find_player(self, player_id: str) -> Player:
+        """
+        :param player_id: Player.get_id of the player.
+        :return: The player, None if it is not in the snapshot.
+        """
+        if self.player_rows is None:
+            full_names = self.columns['full_name'].tolist()
+            heights = self.columns['height_inches'].tolist()
+            self.player_rows = {}
+            for row in range(len(self)):
+                self.player_rows.setdefault(self.get_string(full_names[row]) + str(heights[row]), row)
+        row = self.player_rows.get(player_id)
+        return None if row is None else self.get_player(row)
+
+    def get_team_count(self) -> int:
+        return len(self.header['teams'])
+
+    def get_team(self, index: int) -> Team:
+        """
+        Materializes a team and its forty-man roster only.
+        """
+        team_data = self.header['teams'][index]
+        start, stop = team_data['player_rows']
+        team = Team.__new__(Team)
+        team.from_dict(team_data, forty_man_roster=[self.get_player(row) for row in range(start, stop)])
+        return team
+
+    def load_teams(self) -> list:
+        return [self.get_team(index) for index in range(self.get_team_count())]
+
+
+def save_league_file(teams: list, save_format: SaveFormat = SaveFormat.JSON, path: str = None, team_folder: str = TEAM_SAVE_FOLDER, full: bool = False):
+    """
+    Saves the league in the format chosen for this save.
+    :param path: Snapshot file (SNAPSHOT_FILE_PATH if None), or players file (PLAYER_FILE_PATH if None) for JSON.
+    :param team_folder: Team files folder, JSON only.
+    :param full: JSON only, see team.save_league (a snapshot is always written whole).
+    :return: What team.save_league returns for JSON, None for a snapshot.
+    """
+    if save_format == SaveFormat.SNAPSHOT:
+        return write_league_snapshot(teams, SNAPSHOT_FILE_PATH if path is None else path)
+    return save_league(teams, PLAYER_FILE_PATH if path is None else path, team_folder, full)
+
+
+def load_league_file(save_format: SaveFormat = SaveFormat.JSON, path: str = None, team_folder: str = TEAM_SAVE_FOLDER) -> list:
+    """
+    Loads every team of a league saved by save_league_file.
+    :param path: Snapshot file (SNAPSHOT_FILE_PATH if None), or players file (PLAYER_FILE_PATH if None) for JSON.
+    :param team_folder: Team files folder, JSON only.
+    :return: A list of Team objects (sorted by file name for JSON, in saved order for a snapshot).
+    """
+    if save_format == SaveFormat.SNAPSHOT:
+        return LeagueSnapshot(SNAPSHOT_FILE_PATH if path is None else path).load_teams()
+    player_data = load_player_file(PLAYER_FILE_PATH if path is None else path)
+    return [load_team_file(name, team_folder, player_data) for name in sorted(os.listdir(team_folder)) if name.endswith('.json')]
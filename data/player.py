@@ -1,10 +1,41 @@
 import json
+from array import array
 from json import JSONDecodeError
 
 import names
 import numpy as np
 
-PLAYER_DATA = None
+from data.atomic_write import write_atomic
+from data.rng import resolve_generator
+from data.stat_history import BATTED_BALL_OUTCOME_BINS, DIRECTION_BINS, EXIT_VELOCITY_BINS, LAUNCH_ANGLE_BINS, HistoryMode, StatHistory
+
+PLAYER_DATA = None  # saved players by id, see get_player_data
+PLAYER_FILE_PATH = 'saves/players.json'
+NAME_TABLES = {}  # names package distribution file -> (names, cumulative percentages)
+
+# the 13 ratings drawn in Player.generate_from_scratch, stored together in Player.ratings in this order #
+SKILL_ATTRIBUTES = ['consistency', 'power', 'contact', 'crit_thinking_batting', 'crit_thinking_fielding', 'speed', 'throwing_power', 'pitching_control', 'pitching_spin', 'pitching_stamina', 'confidence', 'injury_liability', 'charisma']
+RATING_INDEX = {name: index for index, name in enumerate(SKILL_ATTRIBUTES)}
+
+# distributions new players are drawn from #
+GENDERS = ['male', 'female']
+GENDER_WEIGHTS = [0.8, 0.2]
+NATIONALITIES = ['United States', 'Dominican Republic', 'Venezuela', 'Cuba', 'Puerto Rico', 'Mexico', 'Canada', 'Colombia', 'Panama', 'Japan', 'South Korea']
+NATIONALITY_WEIGHTS = [0.708, 0.115, 0.072, 0.023, 0.020, 0.017, 0.011, 0.010, 0.009, 0.008, 0.007]
+HANDEDNESS_OPTIONS = ['right', 'left', 'switch']
+HANDEDNESS_WEIGHTS = [0.625, 0.25, 0.125]
+RATING_MEAN = 0.5
+RATING_STD = 0.125
+
+def decode_nested(value):
+    """
+    Old saves stored nested objects as JSON strings inside the JSON (sometimes twice over), new ones store them as is.
+    :return: The value, decoded until it's no longer a string.
+    """
+    while isinstance(value, str):
+        value = json.loads(value)
+    return value
+
 
 def convert_position_to_str(position):
     """
@@ -15,65 +46,174 @@ def convert_position_to_str(position):
     return ['N/A', 'P', 'C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF', 'DH'][position]
 
 
+def get_name_table(name_file: str) -> (list, np.ndarray):
+    """
+    Loads a names package distribution file once per process.
+    :param name_file: Key into names.FILES ('first:male', 'first:female' or 'last').
+    :return: List of names and array of their cumulative percentages.
+    """
+    if name_file not in NAME_TABLES:
+        name_list = []
+        cumulative = []
+        with open(names.FILES[name_file]) as f:
+            for line in f:
+                name, _, cumulative_percent, _ = line.split()
+                name_list.append(name.capitalize())
+                cumulative.append(float(cumulative_percent))
+        NAME_TABLES[name_file] = (name_list, np.array(cumulative))
+    return NAME_TABLES[name_file]
+
+
+def draw_name(name_file: str, rng: np.random.Generator) -> str:
+    """
+    Draws a name with the same distribution as names.get_name, but from the given generator.
+    :param name_file: Key into names.FILES ('first:male', 'first:female' or 'last').
+    :param rng: Generator to draw from.
+    :return: Capitalized name.
+    """
+    name_list, cumulative = get_name_table(name_file)
+    name_index = np.searchsorted(cumulative, rng.random() * 90, side='right')
+    if name_index >= len(name_list):
+        return ''
+    return name_list[name_index]
+
+
+def draw_names(name_file: str, count: int, rng: np.random.Generator) -> list:
+    """
+    Vectorized draw_name, one searchsorted for every name.
+    :param name_file: Key into names.FILES ('first:male', 'first:female' or 'last').
+    :param count: Names to draw.
+    :param rng: Generator to draw from.
+    :return: List of capitalized names.
+    """
+    name_list, cumulative = get_name_table(name_file)
+    name_indices = np.searchsorted(cumulative, rng.random(count) * 90, side='right')
+    return [name_list[name_index] if name_index < len(name_list) else '' for name_index in name_indices.tolist()]
+
+
+def make_rating_vector(ratings=None) -> array:
+    """
+    :param ratings: Values in SKILL_ATTRIBUTES order (or their float64 bytes), zeros if None.
+    :return: Compact float64 vector (np.frombuffer reads it without copying).
+    """
+    if ratings is None:
+        return array('d', bytes(8 * len(SKILL_ATTRIBUTES)))
+    return array('d', ratings)
+
+
+def rating_property(name: str) -> property:
+    """
+    Attribute access to one entry of Player.ratings, so code can keep using player.power etc.
+    """
+    index = RATING_INDEX[name]
+
+    def get_rating(player) -> float:
+        return player.ratings[index]
+
+    def set_rating(player, value: float) -> None:
+        player.ratings[index] = value
+
+    return property(get_rating, set_rating, doc='Skill rating ' + name + ' (stored in ratings).')
+
+
 class Player:
     """
     Object handling the Foulball Player.
+    Slotted: cosmetic and team data are plain slots and the skill ratings live in one float vector (ratings), which
+    bulk readers such as batch_simulation.get_attribute_arrays take whole.
     """
-
-    def __init__(self, json_str: str = None):
+    __slots__ = ['gender', 'first_name', 'last_name', 'full_name', 'age', 'height_inches', 'weight_lbs', 'nationality', 'handedness', 'ratings', 'position', 'team', 'jersey_number', 'stats']
+
+    # Intrinsic Data #
+    consistency = rating_property('consistency')
+    power = rating_property('power')
+    contact = rating_property('contact')
+    crit_thinking_batting = rating_property('crit_thinking_batting')
+    crit_thinking_fielding = rating_property('crit_thinking_fielding')
+    speed = rating_property('speed')
+    throwing_power = rating_property('throwing_power')
+    pitching_control = rating_property('pitching_control')
+    pitching_spin = rating_property('pitching_spin')
+    pitching_stamina = rating_property('pitching_stamina')
+    confidence = rating_property('confidence')
+    injury_liability = rating_property('injury_liability')
+    charisma = rating_property('charisma')
+
+    def __init__(self, json_str: str = None, rng: np.random.Generator = None, data: dict = None):
         """
         Construct a new Player.
         :param json_str: JSON data for a player as a string (loaded into object by Player class).
+        :param rng: Generator used when creating a new player (ignored when loading).
+        :param data: Already parsed player data (output of to_dict, or an old save's record).
         :return: None.
         """
-        if json_str is not None:
+        if data is not None:
+            self.from_dict(decode_nested(data))
+        elif json_str is not None:
             try:
-                json_data = json.loads(json_str)  # load string into JSON object
-                self.from_json(json_data)  # set fields using JSON data
+                self.from_dict(decode_nested(json_str))  # set fields using JSON data
             except JSONDecodeError as json_error:
                 print('Unable to load player JSON data. Is this in a valid JSON format?')
                 print(json_error)
                 print('Bad player data loaded. Exiting to preserve integrity of simulation. ')
                 exit(1)
         else:
-            self.generate_from_scratch()  # generate new player data
+            self.generate_from_scratch(rng)  # generate new player data
 
     def __repr__(self):
         return self.first_name + ' ' + self.last_name + ' [' + convert_position_to_str(
             self.current_position) + '] (#' + str(self.jersey_number) + ', ' + self.current_team + ')'
 
-    def generate_from_scratch(self) -> None:
+    # saved as current_position/current_team, same fields as position/team #
+    @property
+    def current_position(self) -> int:
+        return self.position
+
+    @current_position.setter
+    def current_position(self, position: int) -> None:
+        self.position = position
+
+    @property
+    def current_team(self) -> str:
+        return self.team
+
+    @current_team.setter
+    def current_team(self, team: str) -> None:
+        self.team = team
+
+    def generate_from_scratch(self, rng: np.random.Generator = None) -> None:
         """
         Generates new data for a player.
+        :param rng: Generator to draw from (unseeded if None).
         """
+        rng = resolve_generator(rng)
+
         # Cosmetic Data #
-        self.gender = np.random.choice(['male', 'female'], 1, p=[0.8, 0.2])[0]
-        self.first_name = names.get_first_name(gender=self.gender)
-        self.last_name = names.get_last_name()
+        self.gender = str(rng.choice(GENDERS, p=GENDER_WEIGHTS))
+        self.first_name = draw_name('first:' + self.gender, rng)
+        self.last_name = draw_name('last', rng)
         self.full_name = self.first_name + " " + self.last_name
-        self.age = int(max(np.random.normal(25, 5, 1)[0], 20))
-        self.height_inches = int(np.round(np.random.normal(68, 4, 1))[0])
-        self.weight_lbs = int(np.round(np.random.normal(180, 15, 1))[0])
-        self.nationality = np.random.choice(
-            ['United States', 'Dominican Republic', 'Venezuela', 'Cuba', 'Puerto Rico', 'Mexico', 'Canada', 'Colombia',
-             'Panama', 'Japan', 'South Korea'], 1,
-            p=[0.708, 0.115, 0.072, 0.023, 0.020, 0.017, 0.011, 0.010, 0.009, 0.008, 0.007])[0]
+        self.age = int(max(rng.normal(25, 5), 20))
+        self.height_inches = int(np.round(rng.normal(68, 4)))
+        self.weight_lbs = int(np.round(rng.normal(180, 15)))
+        self.nationality = str(rng.choice(NATIONALITIES, p=NATIONALITY_WEIGHTS))
 
         # Intrinsic Data #
-        self.consistency = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.power = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.contact = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.crit_thinking_batting = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.crit_thinking_fielding = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.speed = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.throwing_power = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.pitching_control = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.pitching_spin = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.pitching_stamina = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.confidence = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.handedness = np.random.choice(['right', 'left', 'switch'], 1, p=[0.625, 0.25, 0.125])[0]
-        self.injury_liability = float(np.random.normal(0.5, 0.125, 1)[0])
-        self.charisma = float(np.random.normal(0.5, 0.125, 1)[0])
+        self.ratings = make_rating_vector()
+        self.consistency = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.power = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.contact = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.crit_thinking_batting = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.crit_thinking_fielding = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.speed = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.throwing_power = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.pitching_control = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.pitching_spin = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.pitching_stamina = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.confidence = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.handedness = str(rng.choice(HANDEDNESS_OPTIONS, p=HANDEDNESS_WEIGHTS))
+        self.injury_liability = float(rng.normal(RATING_MEAN, RATING_STD))
+        self.charisma = float(rng.normal(RATING_MEAN, RATING_STD))
 
         # Team Data #
         self.position = 0
@@ -83,9 +223,15 @@ class Player:
         # Tracked Statistical Data #
         self.stats = PlayerStatistics()
 
-    def from_json(self, json_data) -> None:
+    def get_id(self) -> str:
+        """
+        :return: Key of the player in the players file.
+        """
+        return self.full_name + str(self.height_inches)
+
+    def from_dict(self, json_data: dict) -> None:
         """
-        Loads player data from a JSON object (not string).
+        Loads player data from a JSON object (not string). Stats saved in the old nested-string format are accepted too.
         :param json_data: Pre-loaded JSON data (not a string).
         """
 
@@ -100,6 +246,7 @@ class Player:
         self.nationality = json_data['nationality']
 
         # Intrinsic Data #
+        self.ratings = make_rating_vector()
         self.consistency = json_data['intrinsic']['consistency']
         self.power = json_data['intrinsic']['power']
         self.contact = json_data['intrinsic']['contact']
@@ -124,12 +271,12 @@ class Player:
         self.stats = PlayerStatistics(json_data['batting_stats'], json_data['fielding_stats'],
                                       json_data['pitching_stats'])
 
-    def to_json(self) -> str:
+    def to_dict(self) -> dict:
         """
-        Converts the Player to a JSON string.
-        :return: JSON string.
+        Converts the Player to a JSON object, nested objects included (nothing is encoded twice).
+        :return: Dictionary of JSON types.
         """
-        data_object = {
+        return {
             # Cosmetic Data #
             "gender": self.gender,
             "full_name": self.full_name,
@@ -159,16 +306,69 @@ class Player:
             },
 
             # Tracked Stat Data #
-            "batting_stats": self.stats.batting.to_json(),
-            "pitching_stats": self.stats.pitching.to_json(),
-            "fielding_stats": self.stats.fielding.to_json(),
+            "batting_stats": self.stats.batting.to_dict(),
+            "pitching_stats": self.stats.pitching.to_dict(),
+            "fielding_stats": self.stats.fielding.to_dict(),
 
             # Team Data #
             "current_team": self.current_team,
             "current_position": self.current_position,
             "jersey_number": self.jersey_number
         }
-        return json.dumps(data_object)
+
+    def to_json(self) -> str:
+        """
+        Converts the Player to a JSON string.
+        :return: JSON string.
+        """
+        return json.dumps(self.to_dict())
+
+
+def generate_players(count: int, rng: np.random.Generator = None) -> list:
+    """
+    Bulk version of Player.generate_from_scratch with the same distributions: each field of every player is drawn in
+    one vectorized call, for whole rosters or a free-agent pool.
+    :param count: Players to create.
+    :param rng: Generator to draw from (unseeded if None).
+    :return: List of new players without a team.
+    """
+    rng = resolve_generator(rng)
+
+    # Cosmetic Data #
+    genders = rng.choice(GENDERS, size=count, p=GENDER_WEIGHTS)
+    first_names = np.empty(count, dtype=object)
+    for gender in GENDERS:
+        is_gender = genders == gender
+        first_names[is_gender] = draw_names('first:' + gender, int(is_gender.sum()), rng)
+    last_names = draw_names('last', count, rng)
+    ages = np.maximum(rng.normal(25, 5, count), 20).astype(int).tolist()
+    heights = np.round(rng.normal(68, 4, count)).astype(int).tolist()
+    weights = np.round(rng.normal(180, 15, count)).astype(int).tolist()
+    nationalities = rng.choice(NATIONALITIES, size=count, p=NATIONALITY_WEIGHTS).tolist()
+
+    # Intrinsic Data #
+    ratings = rng.normal(RATING_MEAN, RATING_STD, (count, len(SKILL_ATTRIBUTES)))
+    handedness = rng.choice(HANDEDNESS_OPTIONS, size=count, p=HANDEDNESS_WEIGHTS).tolist()
+
+    players = []
+    for index, (gender, first_name, last_name) in enumerate(zip(genders.tolist(), first_names.tolist(), last_names)):
+        player = Player.__new__(Player)  # fields are filled in here instead of generate_from_scratch
+        player.gender = gender
+        player.first_name = first_name
+        player.last_name = last_name
+        player.full_name = first_name + " " + last_name
+        player.age = ages[index]
+        player.height_inches = heights[index]
+        player.weight_lbs = weights[index]
+        player.nationality = nationalities[index]
+        player.ratings = make_rating_vector(ratings[index].tobytes())
+        player.handedness = handedness[index]
+        player.position = 0
+        player.team = ''
+        player.jersey_number = 0
+        player.stats = PlayerStatistics()
+        players.append(player)
+    return players
 
 
 class PlayerStatistics:
@@ -176,21 +376,25 @@ class PlayerStatistics:
     Object handling player statistics of all kinds.
     """
 
-    def __init__(self, batting_str: str = None, fielding_str: str = None, pitching_str: str = None):
-        self.batting = BattingStatistics(json.loads(batting_str))
-        self.fielding = FieldingStatistics(json.loads(fielding_str))
-        self.pitching = PitchingStatistics(json.loads(pitching_str))
+    def __init__(self, batting=None, fielding=None, pitching=None, history_mode: HistoryMode = None):
+        """
+        :param batting: Batting stats as a JSON object (or an old save's JSON string), empty if None. Same for the others.
+        :param history_mode: Mode of the empty stats' histories, HISTORY_MODE if None.
+        """
+        self.batting = BattingStatistics(decode_nested(batting), history_mode)
+        self.fielding = FieldingStatistics(decode_nested(fielding))
+        self.pitching = PitchingStatistics(decode_nested(pitching), history_mode)
 
 
 class BattingStatistics:
 
-    def __init__(self, data=None):
+    def __init__(self, data=None, history_mode: HistoryMode = None):
         if data is None:
-            self.generate_empty_stats()
+            self.generate_empty_stats(history_mode)
         else:
             self.load_from_json_string(data)
 
-    def generate_empty_stats(self) -> None:
+    def generate_empty_stats(self, history_mode: HistoryMode = None) -> None:
         self.at_bats = 0
         self.plate_appearances = 0
         self.hits = 0
@@ -203,10 +407,10 @@ class BattingStatistics:
         self.runs_batted_in = 0
         self.left_on_base = 0
         self.hit_by_pitch = 0
-        self.exit_velocity = list()
-        self.launch_angle = list()
-        self.direction = list()
-        self.batted_ball_outcome = list()
+        self.exit_velocity = StatHistory(EXIT_VELOCITY_BINS, mode=history_mode)
+        self.launch_angle = StatHistory(LAUNCH_ANGLE_BINS, mode=history_mode)
+        self.direction = StatHistory(DIRECTION_BINS, mode=history_mode)
+        self.batted_ball_outcome = StatHistory(BATTED_BALL_OUTCOME_BINS, np.int16, history_mode)
         self.games_played = 0
         self.out_flyout = 0
         self.out_lineout = 0
@@ -214,8 +418,8 @@ class BattingStatistics:
         self.runs = 0
         self.batted_balls = 0
 
-    def to_json(self) -> str:
-        dictionary = {
+    def to_dict(self) -> dict:
+        return {
             "at_bats": self.at_bats,
             "plate_appearances": self.plate_appearances,
             "hits": self.hits,
@@ -228,10 +432,10 @@ class BattingStatistics:
             "runs_batted_in": self.runs_batted_in,
             "left_on_base": self.left_on_base,
             "hit_by_pitch": self.hit_by_pitch,
-            "exit_velocity": json.dumps(self.exit_velocity),
-            "launch_angle": json.dumps(self.launch_angle),
-            "direction": json.dumps(self.direction),
-            "batted_ball_outcome": json.dumps(self.batted_ball_outcome),
+            "exit_velocity": self.exit_velocity.to_json_value(),
+            "launch_angle": self.launch_angle.to_json_value(),
+            "direction": self.direction.to_json_value(),
+            "batted_ball_outcome": self.batted_ball_outcome.to_json_value(),
             "games_played": self.games_played,
             "out_flyout": self.out_flyout,
             "out_lineout": self.out_lineout,
@@ -239,7 +443,9 @@ class BattingStatistics:
             "runs": self.runs,
             "batted_balls": self.batted_balls
         }
-        return json.dumps(dictionary)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
 
     def load_from_json_string(self, data) -> None:
         """
@@ -257,10 +463,10 @@ class BattingStatistics:
         self.runs_batted_in = data['runs_batted_in']
         self.left_on_base = data['left_on_base']
         self.hit_by_pitch = data['hit_by_pitch']
-        self.exit_velocity = json.loads(data['exit_velocity'])
-        self.launch_angle = json.loads(data['launch_angle'])
-        self.direction = json.loads(data['direction'])
-        self.batted_ball_outcome = json.loads(data['batted_ball_outcome'])
+        self.exit_velocity = StatHistory.from_json_value(data['exit_velocity'], EXIT_VELOCITY_BINS)
+        self.launch_angle = StatHistory.from_json_value(data['launch_angle'], LAUNCH_ANGLE_BINS)
+        self.direction = StatHistory.from_json_value(data['direction'], DIRECTION_BINS)
+        self.batted_ball_outcome = StatHistory.from_json_value(data['batted_ball_outcome'], BATTED_BALL_OUTCOME_BINS, np.int16)
         self.games_played = data['games_played']
         self.out_flyout = data['out_flyout']
         self.out_lineout = data['out_lineout']
@@ -272,9 +478,7 @@ class BattingStatistics:
         return self.hits / max(self.at_bats, 1)
 
     def avg_ev(self) -> float:
-        if len(self.exit_velocity) == 0:
-            return 0
-        return np.average(self.exit_velocity)
+        return self.exit_velocity.mean()
 
     def slg(self) -> float:
         return (self.singles + 2 * self.doubles + 3 * self.triples + 4 * self.home_runs) / max(self.at_bats, 1)
@@ -306,11 +510,13 @@ class FieldingStatistics:
         """
         self.errors = data['errors']
 
-    def to_json(self) -> str:
-        dictionary = {
+    def to_dict(self) -> dict:
+        return {
             "errors": self.errors
         }
-        return json.dumps(dictionary)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
 
     def generate_empty_stats(self) -> None:
         self.errors = 0
@@ -318,9 +524,9 @@ class FieldingStatistics:
 
 class PitchingStatistics:
 
-    def __init__(self, data=None):
+    def __init__(self, data=None, history_mode: HistoryMode = None):
         if data is None:
-            self.generate_empty_stats()
+            self.generate_empty_stats(history_mode)
         else:
             self.load_from_json_string(data)
 
@@ -345,13 +551,13 @@ class PitchingStatistics:
         self.strikes = data['strikes']
         self.balls = data['balls']
 
-        self.exit_velocity_against = json.loads(data['exit_velocity_against'])
-        self.launch_angle_against = json.loads(data['launch_angle_against'])
-        self.direction_against = json.loads(data['direction_against'])
-        self.batted_ball_outcome_against = json.loads(data['batted_ball_outcome_against'])
+        self.exit_velocity_against = StatHistory.from_json_value(data['exit_velocity_against'], EXIT_VELOCITY_BINS)
+        self.launch_angle_against = StatHistory.from_json_value(data['launch_angle_against'], LAUNCH_ANGLE_BINS)
+        self.direction_against = StatHistory.from_json_value(data['direction_against'], DIRECTION_BINS)
+        self.batted_ball_outcome_against = StatHistory.from_json_value(data['batted_ball_outcome_against'], BATTED_BALL_OUTCOME_BINS, np.int16)
 
-    def to_json(self) -> str:
-        dictionary = {
+    def to_dict(self) -> dict:
+        return {
             "games_pitched_in": self.games_pitched_in,
             "shutouts": self.shutouts,
             "innings_pitched": self.innings_pitched,
@@ -369,14 +575,16 @@ class PitchingStatistics:
             "strikes": self.strikes,
             "balls": self.balls,
 
-            "exit_velocity_against": json.dumps(self.exit_velocity_against),
-            "launch_angle_against": json.dumps(self.launch_angle_against),
-            "direction_against": json.dumps(self.direction_against),
-            "batted_ball_outcome_against": json.dumps(self.batted_ball_outcome_against)
+            "exit_velocity_against": self.exit_velocity_against.to_json_value(),
+            "launch_angle_against": self.launch_angle_against.to_json_value(),
+            "direction_against": self.direction_against.to_json_value(),
+            "batted_ball_outcome_against": self.batted_ball_outcome_against.to_json_value()
         }
-        return json.dumps(dictionary)
 
-    def generate_empty_stats(self) -> None:
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def generate_empty_stats(self, history_mode: HistoryMode = None) -> None:
         self.games_pitched_in = 0
         self.shutouts = 0
         self.innings_pitched = 0
@@ -394,10 +602,10 @@ class PitchingStatistics:
         self.strikes = 0
         self.balls = 0
 
-        self.exit_velocity_against = list()
-        self.launch_angle_against = list()
-        self.direction_against = list()
-        self.batted_ball_outcome_against = list()
+        self.exit_velocity_against = StatHistory(EXIT_VELOCITY_BINS, mode=history_mode)
+        self.launch_angle_against = StatHistory(LAUNCH_ANGLE_BINS, mode=history_mode)
+        self.direction_against = StatHistory(DIRECTION_BINS, mode=history_mode)
+        self.batted_ball_outcome_against = StatHistory(BATTED_BALL_OUTCOME_BINS, np.int16, history_mode)
 
     def era(self) -> float:
         return 9 * self.runs_allowed / max(self.innings_pitched, 1)
@@ -415,22 +623,30 @@ class PitchingStatistics:
         return str(self.strikeouts) + '/' + str(self.walks_given)
 
 
-def save_player_file(teams: list) -> None:
-    dictionary = {}
-    for team in teams:
-        players_json = team.get_players_as_json()
-        dictionary.update(json.loads(players_json))
-
-    with open("saves/players.json", "w") as outfile:
-        json.dump(dictionary, outfile)
+def save_player_file(teams: list, path: str = PLAYER_FILE_PATH) -> None:
+    """
+    Writes every player of the teams in one pass (atomically): player id -> player JSON object. Players unchanged since
+    the last save reuse their cached JSON text (see Team.get_player_records).
+    """
+    write_atomic(path, '{' + ','.join(record for team in teams for record in team.get_player_records()) + '}')
 
 
-def load_player_file():
+def load_player_file(path: str = PLAYER_FILE_PATH) -> dict:
     """
     Loads saved players from file.
-    :return: Player objects to be sent to Player class.
+    :return: Player id -> player data to be sent to Player class (a JSON object, or a JSON string in old saves).
     """
-    with open('saves/players.json') as f:
+    with open(path) as f:
         all_players = json.load(f)
     return all_players
 
+
+def get_player_data() -> dict:
+    """
+    :return: Saved players by id (PLAYER_DATA), loaded from the players file the first time.
+    """
+    global PLAYER_DATA
+    if PLAYER_DATA is None:
+        PLAYER_DATA = load_player_file()
+    return PLAYER_DATA
+
@@ -0,0 +1,106 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from data.player import SKILL_ATTRIBUTES, Player, PlayerStatistics, make_rating_vector
+from data.stat_history import HistoryMode
+
+# Columns of the table: every rating of Player.ratings, plus the physical data the simulation reads. #
+PLAYER_TABLE_ATTRIBUTES = SKILL_ATTRIBUTES + ['height_inches', 'handedness']
+HANDEDNESS_CODES = ['right', 'left', 'switch']  # handedness is stored as its index in this list
+PLAYER_TABLE_DTYPE = np.float32
+
+
+class PlayerTable:
+    """
+    League-wide struct-of-arrays of player attributes: one float32 column per attribute, addressed by player index.
+    When created in shared memory, worker processes attach to it by name and read it without copying or pickling.
+    """
+
+    def __init__(self, player_count: int, shared_memory_name: str = None, create: bool = False):
+        """
+        :param player_count: Rows of the table.
+        :param shared_memory_name: Block to attach to (or create, see create). None keeps the table in local memory.
+        :param create: Create a new shared block (use shared_memory_name=None to let the OS pick the name).
+        """
+        self.player_count = player_count
+        shape = (len(PLAYER_TABLE_ATTRIBUTES), player_count)
+        self.shared_memory = None
+        if create or shared_memory_name is not None:
+            size = max(1, int(np.prod(shape)) * np.dtype(PLAYER_TABLE_DTYPE).itemsize)
+            self.shared_memory = shared_memory.SharedMemory(shared_memory_name, create, size)
+            self.data = np.ndarray(shape, dtype=PLAYER_TABLE_DTYPE, buffer=self.shared_memory.buf)
+        else:
+            self.data = np.zeros(shape, dtype=PLAYER_TABLE_DTYPE)
+        self.columns = {name: self.data[i] for i, name in enumerate(PLAYER_TABLE_ATTRIBUTES)}
+
+    def __len__(self):
+        return self.player_count
+
+    def get_shared_memory_name(self) -> str:
+        """
+        :return: Name of the shared memory block, None if the table is local.
+        """
+        return None if self.shared_memory is None else self.shared_memory.name
+
+    @staticmethod
+    def from_players(players: list, shared: bool = False) -> 'PlayerTable':
+        """
+        Builds a table with one row per player, in list order.
+        :param shared: Place it in shared memory (call close and unlink when done).
+        """
+        table = PlayerTable(len(players), create=shared)
+        for index, player in enumerate(players):
+            table.write_player(index, player)
+        return table
+
+    def write_player(self, index: int, player: Player) -> None:
+        self.data[:len(SKILL_ATTRIBUTES), index] = player.ratings
+        self.columns['height_inches'][index] = player.height_inches
+        self.columns['handedness'][index] = HANDEDNESS_CODES.index(player.handedness)
+
+    def get_attributes(self, index: int) -> dict:
+        """
+        :return: Attribute name -> python value of one player (handedness decoded).
+        """
+        attributes = dict(zip(PLAYER_TABLE_ATTRIBUTES, self.data[:, index].tolist()))
+        attributes['height_inches'] = int(attributes['height_inches'])
+        attributes['handedness'] = HANDEDNESS_CODES[int(attributes['handedness'])]
+        return attributes
+
+    def close(self) -> None:
+        if self.shared_memory is not None:
+            self.data = None
+            self.columns = None
+            self.shared_memory.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared block (creator only, after every process has closed it).
+        """
+        if self.shared_memory is not None:
+            self.shared_memory.unlink()
+
+
+class TablePlayer(Player):
+    """
+    Stand-in for Player rebuilt from a PlayerTable row: the attributes the simulation reads, a lineup position and
+    empty stats. Named after its index, since that's all a worker knows about it.
+    """
+    __slots__ = ['index']
+
+    def __init__(self, table: PlayerTable, index: int, position: int):
+        self.index = index
+        self.ratings = make_rating_vector(table.data[:len(SKILL_ATTRIBUTES), index].tolist())
+        self.height_inches = int(table.columns['height_inches'][index])
+        self.handedness = HANDEDNESS_CODES[int(table.columns['handedness'][index])]
+        self.position = position
+        self.team = ''
+        self.jersey_number = 0
+        self.first_name = '#' + str(index)
+        self.last_name = self.first_name
+        self.full_name = self.first_name
+        self.stats = PlayerStatistics(history_mode=HistoryMode.FULL)  # game deltas, see season.get_game_copy
+
+    def __repr__(self):
+        return 'TablePlayer(' + str(self.index) + ')'
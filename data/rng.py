@@ -0,0 +1,173 @@
+import random
+
+import numpy as np
+
+# Swap between the pre-drawn pools and direct Generator calls (e.g. to measure season throughput). #
+USE_BUFFERED_RANDOM = True
+RANDOM_BLOCK_SIZE = 4096
+
+
+class RandomContext:
+    """
+    Seedable root of every random stream in a simulation.
+    seed -> SeedSequence -> keyed child streams (per game, per team, ...). Children are derived from their key and
+    not from the order they are requested in, so worker processes can rebuild exactly the same stream independently.
+    """
+
+    def __init__(self, seed: int = None, seed_sequence: np.random.SeedSequence = None):
+        """
+        Construct a new RandomContext.
+        :param seed: Root seed. None draws fresh entropy from the OS (not reproducible).
+        :param seed_sequence: Existing SeedSequence to wrap instead of a seed (used for child contexts).
+        """
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence(seed)
+        self.seed_sequence = seed_sequence
+
+    def __repr__(self):
+        return 'RandomContext(entropy=' + str(self.seed_sequence.entropy) + ', key=' + str(self.seed_sequence.spawn_key) + ')'
+
+    def child(self, *key: int) -> 'RandomContext':
+        """
+        Gets the child context for a key, e.g. context.child(day, game_number).
+        :param key: Non-negative integers identifying the stream.
+        :return: RandomContext that is always the same for the same root seed and key.
+        """
+        return RandomContext(seed_sequence=np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + tuple(int(k) for k in key)))
+
+    def generator(self) -> np.random.Generator:
+        """
+        Creates a Generator drawing from this context's stream. Calling it twice restarts the same stream.
+        :return: numpy Generator.
+        """
+        return np.random.default_rng(self.seed_sequence)
+
+    def game_generator(self, day: int, game_number: int) -> np.random.Generator:
+        """
+        Generator for a single scheduled game.
+        :param day: Day of the schedule.
+        :param game_number: Index of the game on that day.
+        :return: numpy Generator.
+        """
+        return self.child(0, day, game_number).generator()
+
+    def lineup_generator(self, day: int, game_number: int) -> np.random.Generator:
+        """
+        Generator for the lineup decisions made before a scheduled game.
+        :param day: Day of the schedule.
+        :param game_number: Index of the game on that day.
+        :return: numpy Generator.
+        """
+        return self.child(2, day, game_number).generator()
+
+    def odds_generator(self, batch_number: int) -> np.random.Generator:
+        """
+        Generator for one batch of simulated season endings (see simulation.postseason).
+        :param batch_number: Index of the batch.
+        :return: numpy Generator.
+        """
+        return self.child(3, batch_number).generator()
+
+    def team_generator(self, team_number: int) -> np.random.Generator:
+        """
+        Generator for creating a single team (roster, stadium, strategy).
+        :param team_number: Index of the team in the league.
+        :return: numpy Generator.
+        """
+        return self.child(1, team_number).generator()
+
+
+def resolve_generator(rng: np.random.Generator = None) -> np.random.Generator:
+    """
+    Returns the generator to draw from, falling back to a fresh unseeded one.
+    :param rng: Generator passed by the caller, or None.
+    :return: numpy Generator.
+    """
+    if rng is None:
+        return np.random.default_rng()
+    return rng
+
+
+def python_random_from(rng: np.random.Generator) -> random.Random:
+    """
+    Seeds a standard library Random from a generator, for third-party helpers that only accept random.Random.
+    :param rng: numpy Generator.
+    :return: random.Random instance.
+    """
+    return random.Random(int(rng.integers(0, 2 ** 63)))
+
+
+class RandomSource:
+    """
+    Scalar random draws for the simulation hot loops, one Generator call per draw.
+    """
+
+    def __init__(self, rng: np.random.Generator):
+        self.rng = rng
+
+    def next_uniform(self) -> float:
+        """
+        :return: Uniform float in [0, 1).
+        """
+        return self.rng.random()
+
+    def next_normal(self, mean: float, std: float) -> float:
+        """
+        :return: Normally distributed float.
+        """
+        return self.rng.normal(mean, std)
+
+    def next_integer(self, high: int) -> int:
+        """
+        :return: Uniform integer in [0, high).
+        """
+        return int(self.rng.integers(high))
+
+
+class BufferedRandomSource(RandomSource):
+    """
+    RandomSource that pre-draws blocks of uniforms and standard normals and hands them out one at a time,
+    so a draw costs a list index instead of a numpy call. Blocks are refilled lazily from the same Generator.
+    """
+
+    def __init__(self, rng: np.random.Generator, block_size: int = RANDOM_BLOCK_SIZE):
+        super().__init__(rng)
+        self.block_size = block_size
+        self.uniforms = []
+        self.uniform_index = 0
+        self.normals = []
+        self.normal_index = 0
+
+    def next_uniform(self) -> float:
+        if self.uniform_index >= len(self.uniforms):
+            self.uniforms = self.rng.random(self.block_size).tolist()  # python floats are cheaper to use in scalar math
+            self.uniform_index = 0
+        value = self.uniforms[self.uniform_index]
+        self.uniform_index += 1
+        return value
+
+    def next_normal(self, mean: float, std: float) -> float:
+        if self.normal_index >= len(self.normals):
+            self.normals = self.rng.standard_normal(self.block_size).tolist()
+            self.normal_index = 0
+        value = self.normals[self.normal_index]
+        self.normal_index += 1
+        return mean + std * value
+
+    def next_integer(self, high: int) -> int:
+        return int(self.next_uniform() * high)
+
+
+def make_random_source(rng: np.random.Generator = None, buffered: bool = None) -> RandomSource:
+    """
+    Wraps a generator for the simulation module.
+    :param rng: Generator to draw from (unseeded if None).
+    :param buffered: Use pre-drawn pools. Defaults to USE_BUFFERED_RANDOM.
+    :return: RandomSource or BufferedRandomSource.
+    """
+    if buffered is None:
+        buffered = USE_BUFFERED_RANDOM
+    rng = resolve_generator(rng)
+    if buffered:
+        return BufferedRandomSource(rng)
+    return RandomSource(rng)
@@ -1,21 +1,34 @@
 import json
 import numpy as np
 
+from data.rng import resolve_generator
+
+# Wall lookup tables: one entry per WALL_TABLE_RESOLUTION degrees from the left foul pole (0) to the right (90). #
+WALL_TABLE_RESOLUTION = 0.1
+WALL_TABLE_DIRECTIONS = np.linspace(0, 90, int(round(90 / WALL_TABLE_RESOLUTION)) + 1)
+SUMMARY_DIRECTION_BINS = 9  # 10 degree slices for the per-stadium summary
+
 
 class Stadium:
-    def __init__(self, name_options=None, state=None, data=None):
+    def __init__(self, name_options=None, state=None, data=None, rng: np.random.Generator = None):
+        # derived lookup data, built lazily from field_distances #
+        self.wall_table = None
+        self.wall_table_source = None
+        self.field_summary = None
+
         if data is not None:
-            self.from_json(data)
+            self.from_dict(data)
         else:
-            self.name = self.generate_stadium_name(name_options)
+            rng = resolve_generator(rng)
+            self.name = self.generate_stadium_name(name_options, rng)
             self.state = state
 
-            self.fan_capacity = int(np.random.normal(40000, 2000, 1)[0])
-            self.air_temperature = np.random.normal(70, 5, 1)[0]
-            self.wind_speed = max(0, np.random.normal(5, 2, 1)[0])
-            self.field_distances = [np.random.normal(335, 5, 1)[0], np.random.normal(400, 3.333, 1)[0], np.random.normal(335, 5, 1)[0]] # LCR
+            self.fan_capacity = int(rng.normal(40000, 2000))
+            self.air_temperature = float(rng.normal(70, 5))
+            self.wind_speed = max(0, float(rng.normal(5, 2)))
+            self.field_distances = [float(rng.normal(335, 5)), float(rng.normal(400, 3.333)), float(rng.normal(335, 5))] # LCR
 
-    def from_json(self, data) -> None:
+    def from_dict(self, data: dict) -> None:
         self.name = data['name']
         self.state = data['state']
         self.fan_capacity = data['fan_capacity']
@@ -23,13 +36,57 @@ class Stadium:
         self.wind_speed = data['wind_speed']
         self.field_distances = [data['field_distances']['left'], data['field_distances']['center'], data['field_distances']['right']]
 
-    def generate_stadium_name(self, names) -> str:
+    def get_wall_table(self) -> np.ndarray:
+        # built once; rebuilt only if field_distances was edited since #
+        if self.wall_table is None or self.wall_table_source != tuple(self.field_distances):
+            self.wall_table = np.interp(WALL_TABLE_DIRECTIONS, [0, 45, 90], self.field_distances)
+            self.wall_table_source = tuple(self.field_distances)
+            self.field_summary = None
+        return self.wall_table
+
+    def get_wall_distance(self, direction: float) -> float:
+        # nearest table entry; the table includes the 0/45/90 corners so this is within a fraction of a foot #
+        table_index = int(direction / WALL_TABLE_RESOLUTION + 0.5)
+        return self.get_wall_table()[min(max(table_index, 0), len(WALL_TABLE_DIRECTIONS) - 1)]
+
+    def get_wall_distances(self, directions: np.ndarray) -> np.ndarray:
+        table_indices = np.clip(np.rint(np.asarray(directions) / WALL_TABLE_RESOLUTION).astype(int), 0, len(WALL_TABLE_DIRECTIONS) - 1)
+        return self.get_wall_table()[table_indices]
+
+    def are_home_runs(self, distances: np.ndarray, directions: np.ndarray) -> np.ndarray:
+        return np.asarray(distances) > self.get_wall_distances(directions)
+
+    def get_field_summary(self) -> dict:
+        """
+        Per-direction-bin data about the park, computed once per wall table.
+        :return: Dictionary with bin_edges (deg), min/mean/max wall distance (ft) and field_area (sq ft of fair
+        territory inside the wall) per bin, and total_field_area.
+        """
+        wall_table = self.get_wall_table()
+        if self.field_summary is None:
+            entries_per_bin = (len(WALL_TABLE_DIRECTIONS) - 1) // SUMMARY_DIRECTION_BINS
+            bin_walls = [wall_table[i * entries_per_bin:(i + 1) * entries_per_bin + 1] for i in range(SUMMARY_DIRECTION_BINS)]
+            # area of a thin wedge is r^2 / 2 * d(theta) #
+            wedge_areas = [0.5 * walls ** 2 * np.deg2rad(WALL_TABLE_RESOLUTION) for walls in bin_walls]
+            bin_areas = [(wedges[1:] + wedges[:-1]).sum() / 2 for wedges in wedge_areas]
+            self.field_summary = {
+                'bin_edges': np.linspace(0, 90, SUMMARY_DIRECTION_BINS + 1),
+                'min_wall_distance': np.array([walls.min() for walls in bin_walls]),
+                'mean_wall_distance': np.array([walls.mean() for walls in bin_walls]),
+                'max_wall_distance': np.array([walls.max() for walls in bin_walls]),
+                'field_area': np.array(bin_areas),
+                'total_field_area': float(np.sum(bin_areas))
+            }
+        return self.field_summary
+
+    def generate_stadium_name(self, names, rng: np.random.Generator = None) -> str:
+        rng = resolve_generator(rng)
         possible_suffixes = ['Stadium', 'Park', 'Arena', 'Field', 'Coliseum', 'Center']
         suffix_probability = [0.3, 0.3, 0.04, 0.3, 0.03, 0.03]
-        return np.random.choice(names, 1)[0] + " " + np.random.choice(possible_suffixes, 1, p=suffix_probability)[0]
+        return str(rng.choice(names)) + " " + str(rng.choice(possible_suffixes, p=suffix_probability))
 
-    def to_json(self) -> str:
-        dictionary = {
+    def to_dict(self) -> dict:
+        return {
             "name": self.name,
             "state": self.state,
             "fan_capacity": self.fan_capacity,
@@ -41,4 +98,6 @@ class Stadium:
                 "right": self.field_distances[2]
             }
         }
-        return json.dumps(dictionary)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
@@ -0,0 +1,201 @@
+import json
+from enum import Enum
+
+import numpy as np
+
+# (low, high, bins) of each batted ball history, values outside the range land in the edge bins #
+EXIT_VELOCITY_BINS = (0, 160, 160)  # mph
+LAUNCH_ANGLE_BINS = (-90, 90, 180)  # degrees
+DIRECTION_BINS = (0, 90, 90)  # degrees from the left foul pole
+BATTED_BALL_OUTCOME_BINS = (0, 14, 14)  # one bin per BattedBallOutcome value
+
+HISTORY_INITIAL_CAPACITY = 16
+RESERVOIR_SIZE = 256
+RESERVOIR_SEED = 0x5eed  # reservoirs draw from their own keyed stream so they don't disturb the game's
+
+
+class HistoryMode(Enum):
+    FULL = 0  # every value, in order
+    HISTOGRAM = 1  # fixed-bin counts only
+    RESERVOIR = 2  # uniform sample of RESERVOIR_SIZE values
+
+
+# mode of new histories (and of histories loaded from a plain list), e.g. HISTOGRAM for long multi-season leagues #
+HISTORY_MODE = HistoryMode.FULL
+
+
+class StatHistory:
+    """
+    Per batted ball values of a stat (exit velocity, launch angle...), stored as a typed NumPy column that grows by
+    doubling, with a running sum and count so averages don't rescan it. The bounded modes keep a histogram or a
+    reservoir sample instead of every value, so memory and save size stay fixed however many seasons are played.
+    """
+
+    def __init__(self, bins: tuple, dtype=np.float64, mode: HistoryMode = None):
+        """
+        :param bins: (low, high, bin count) of the histogram mode.
+        :param dtype: Type of the stored values.
+        :param mode: Storage mode, HISTORY_MODE if None.
+        """
+        self.bins = bins
+        self.dtype = np.dtype(dtype)
+        self.mode = HISTORY_MODE if mode is None else mode
+        self.count = 0
+        self.total = 0.0
+        self.values = np.empty(0, dtype=self.dtype)  # every value (FULL) or the sample (RESERVOIR)
+        self.size = 0  # used part of values
+        self.bin_counts = np.zeros(bins[2], dtype=np.int64) if self.mode == HistoryMode.HISTOGRAM else None
+        self.rng = None  # reservoir generator, created once the reservoir is full
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return 'StatHistory(' + self.mode.name + ', ' + str(self.count) + ' values)'
+
+    def append(self, value) -> None:
+        self.count += 1
+        self.total += value
+        if self.mode == HistoryMode.HISTOGRAM:
+            low, high, bin_count = self.bins
+            self.bin_counts[min(max(int((value - low) * (bin_count / (high - low))), 0), bin_count - 1)] += 1  # as get_bin
+        elif self.mode == HistoryMode.FULL or self.size < RESERVOIR_SIZE:
+            if self.size == len(self.values):
+                self.grow()
+            self.values[self.size] = value
+            self.size += 1
+        else:  # reservoir full: the new value replaces a random one with probability RESERVOIR_SIZE / count
+            if self.rng is None:
+                self.rng = np.random.default_rng([RESERVOIR_SEED, self.count])
+            slot = int(self.rng.integers(self.count))
+            if slot < RESERVOIR_SIZE:
+                self.values[slot] = value
+
+    def extend(self, values) -> None:
+        """
+        Same result as appending the values one by one, running total included (summed in the same order).
+        """
+        values = np.asarray(values, dtype=self.dtype)
+        if self.mode == HistoryMode.HISTOGRAM:
+            self.count += len(values)
+            self.total = sum(values.tolist(), self.total)
+            self.bin_counts += np.bincount(self.get_bin(values), minlength=len(self.bin_counts))
+        elif self.mode == HistoryMode.FULL:
+            self.count += len(values)
+            self.total = sum(values.tolist(), self.total)
+            while self.size + len(values) > len(self.values):
+                self.grow()
+            self.values[self.size:self.size + len(values)] = values
+            self.size += len(values)
+        else:
+            for value in values.tolist():
+                self.append(value)
+
+    def merge(self, other: 'StatHistory') -> None:
+        """
+        Adds another history's values (e.g. a game's stat delta) to this one. Values the other history kept are added
+        one by one like extend. Two histograms only have their totals added, which can round differently in the last
+        bits than appending their values would.
+        """
+        if other.mode == HistoryMode.FULL or (other.mode == HistoryMode.RESERVOIR and other.size == other.count):
+            self.extend(other.get_values())
+        elif other.mode == HistoryMode.HISTOGRAM and self.mode == HistoryMode.HISTOGRAM and other.bins == self.bins:
+            self.count += other.count
+            self.total += other.total
+            self.bin_counts += other.bin_counts
+        elif other.mode == HistoryMode.RESERVOIR and self.mode == HistoryMode.RESERVOIR:
+            # both are samples: keep RESERVOIR_SIZE of their values, each weighted by how many values it stands for #
+            if self.rng is None:
+                self.rng = np.random.default_rng([RESERVOIR_SEED, self.count])
+            pool = np.concatenate([self.get_values(), other.get_values()])
+            weights = np.concatenate([np.full(self.size, self.count / max(self.size, 1)), np.full(other.size, other.count / other.size)])
+            self.values = pool[self.rng.choice(len(pool), size=RESERVOIR_SIZE, replace=False, p=weights / weights.sum())]
+            self.size = RESERVOIR_SIZE
+            self.count += other.count
+            self.total += other.total
+        else:
+            raise ValueError('Cannot merge a ' + other.mode.name + ' history into a ' + self.mode.name + ' history!')
+
+    def grow(self) -> None:
+        capacity = max(HISTORY_INITIAL_CAPACITY, 2 * len(self.values))
+        if self.mode == HistoryMode.RESERVOIR:
+            capacity = min(capacity, RESERVOIR_SIZE)
+        values = np.empty(capacity, dtype=self.dtype)
+        values[:self.size] = self.values[:self.size]
+        self.values = values
+
+    def get_bin(self, values):
+        low, high, bin_count = self.bins
+        return np.clip(((np.asarray(values, dtype=float) - low) * (bin_count / (high - low))).astype(int), 0, bin_count - 1)
+
+    def mean(self) -> float:
+        """
+        :return: Average of every value recorded (exact in every mode), 0 if there are none.
+        """
+        if self.count == 0:
+            return 0
+        return self.total / self.count
+
+    def get_values(self) -> np.ndarray:
+        """
+        :return: Every value (FULL), the sample (RESERVOIR) or the bin centers repeated by their counts (HISTOGRAM).
+        """
+        if self.mode == HistoryMode.HISTOGRAM:
+            low, high, bin_count = self.bins
+            centers = low + (np.arange(bin_count) + 0.5) * (high - low) / bin_count
+            return np.repeat(centers, self.bin_counts).astype(self.dtype)
+        return self.values[:self.size]
+
+    def get_histogram(self) -> np.ndarray:
+        """
+        :return: Count per bin (estimated from the sample in RESERVOIR mode).
+        """
+        if self.mode == HistoryMode.HISTOGRAM:
+            return self.bin_counts.copy()
+        counts = np.bincount(self.get_bin(self.get_values()), minlength=self.bins[2])
+        if self.mode == HistoryMode.RESERVOIR and self.size > 0:
+            return np.round(counts * (self.count / self.size)).astype(np.int64)
+        return counts
+
+    def to_json_value(self):
+        """
+        :return: List of values in FULL mode (same format as the old lists), a dictionary otherwise.
+        """
+        if self.mode == HistoryMode.FULL:
+            return self.get_values().tolist()
+        data = {'mode': self.mode.name, 'count': self.count, 'total': float(self.total)}
+        if self.mode == HistoryMode.HISTOGRAM:
+            data['bins'] = list(self.bins)
+            data['bin_counts'] = self.bin_counts.tolist()
+        else:
+            data['sample'] = self.get_values().tolist()
+        return data
+
+    @staticmethod
+    def from_json_value(data, bins: tuple, dtype=np.float64) -> 'StatHistory':
+        """
+        :param data: Output of to_json_value, or a plain list of values (loaded in HISTORY_MODE). Either can still be a
+        JSON string, as in old saves.
+        """
+        if isinstance(data, str):
+            data = json.loads(data)
+        if isinstance(data, list):
+            history = StatHistory(bins, dtype)
+            if len(data) == 0:
+                pass
+            elif history.mode == HistoryMode.FULL:  # straight to a right-sized column
+                history.values = np.array(data, dtype=history.dtype)
+                history.size = history.count = len(data)
+                history.total = float(sum(data))  # same order as append, so the same sum
+            else:
+                history.extend(data)
+            return history
+        history = StatHistory(tuple(data.get('bins', bins)), dtype, HistoryMode[data['mode']])
+        if history.mode == HistoryMode.HISTOGRAM:
+            history.bin_counts = np.array(data['bin_counts'], dtype=np.int64)
+        else:
+            history.values = np.array(data['sample'], dtype=history.dtype)
+            history.size = len(history.values)
+        history.count = data['count']
+        history.total = data['total']
+        return history
@@ -1,18 +1,26 @@
+import csv
 import json
-import random
+import os
 from json import JSONDecodeError
 
 import numpy as np
-import pandas as pd
 from wonderwords import RandomWord
 from pluralizer import Pluralizer
 
-from data.player import PLAYER_DATA, Player
+from data.atomic_write import write_atomic
+from data.player import PLAYER_FILE_PATH, Player, decode_nested, generate_players, get_player_data, save_player_file
+from data.rng import resolve_generator, python_random_from
 from data.stadium import Stadium
 
 FIELDING_POSITIONS_NUMBERS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
 FIELDING_POSITIONS_TEXT = ['P', 'C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF', 'DH']
 
+CITY_SOURCE_PATH = 'sources/us-cities.csv'
+CITY_SIDECAR_PATH = 'sources/us-cities.npz'  # optional pre-parsed copy, see save_city_sidecar
+CITY_TABLE = None  # (cities, states) of the process, see get_city_table
+TEAM_SAVE_FOLDER = '../simulation/saves/teams/'
+UNPLAYED_TEAM_AVERAGE = 99999  # team average while someone hasn't played yet, so every player gets replaced
+
 
 def get_position_by_number(pos_number: int) -> str:  # this function is kinda stupid but that way it's not hard coded
     return FIELDING_POSITIONS_TEXT[FIELDING_POSITIONS_NUMBERS.index(pos_number)]
@@ -22,6 +30,65 @@ def get_position_by_name(pos_name: str) -> int:  # this one makes a little more
     return FIELDING_POSITIONS_NUMBERS[FIELDING_POSITIONS_TEXT.index(pos_name)]
 
 
+def random_choice(options: list, rng: np.random.Generator):  # like random.choice, but keeps python types
+    return options[int(rng.integers(len(options)))]
+
+
+# City Table #
+def parse_city_source(path: str = CITY_SOURCE_PATH) -> (list, list):
+    """
+    Reads the city CSV, skipping rows without a city or state (the source has a '#N/A' row).
+    :return: List of city names and list of their state abbreviations.
+    """
+    cities = []
+    states = []
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # header
+        for row in reader:
+            if len(row) < 2 or not row[1] or row[0].startswith('#'):
+                continue
+            cities.append(row[0])
+            states.append(row[1])
+    return cities, states
+
+
+def save_city_sidecar(path: str = CITY_SIDECAR_PATH, source_path: str = CITY_SOURCE_PATH) -> None:
+    """
+    Pre-parses the city CSV into a binary file get_city_table loads instead: each column is one newline-joined UTF-8
+    block, split back with a single call.
+    """
+    cities, states = parse_city_source(source_path)
+    with open(path, 'wb') as f:
+        np.savez(f, cities=np.frombuffer('\n'.join(cities).encode(), dtype=np.uint8), states=np.frombuffer('\n'.join(states).encode(), dtype=np.uint8))
+
+
+def get_city_table(source_path: str = CITY_SOURCE_PATH, sidecar_path: str = CITY_SIDECAR_PATH) -> (list, list):
+    """
+    Loads the cities once per process, from the sidecar if there is one at least as new as the CSV.
+    :return: List of city names and list of their state abbreviations, in the same order.
+    """
+    global CITY_TABLE
+    if CITY_TABLE is None:
+        if os.path.exists(sidecar_path) and os.path.getmtime(sidecar_path) >= os.path.getmtime(source_path):
+            with np.load(sidecar_path) as sidecar:
+                CITY_TABLE = tuple(sidecar[column].tobytes().decode().split('\n') for column in ['cities', 'states'])
+        else:
+            CITY_TABLE = parse_city_source(source_path)
+    return CITY_TABLE
+
+
+def draw_cities(count: int, rng: np.random.Generator) -> list:
+    """
+    Draws distinct rows of the city table.
+    :param count: Cities to draw, at most the size of the table.
+    :param rng: Generator to draw from.
+    :return: List of (city, state abbreviation).
+    """
+    cities, states = get_city_table()
+    return [(cities[city_index], states[city_index]) for city_index in rng.choice(len(cities), size=count, replace=False).tolist()]
+
+
 class TeamStatistics:
 
     def __init__(self, data=None):
@@ -36,14 +103,16 @@ class TeamStatistics:
         self.runs_scored = 0
         self.runs_against = 0
 
-    def to_json(self) -> str:
-        dictionary = {
+    def to_dict(self) -> dict:
+        return {
             "wins": self.wins,
             "losses": self.losses,
             "runs_scored": self.runs_scored,
             "runs_against": self.runs_against
         }
-        return json.dumps(dictionary)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
 
     def load_from_json(self, data) -> None:
         """
@@ -67,26 +136,82 @@ class TeamStatistics:
         return self.wins + self.losses
 
 
+class TeamAggregates:
+    """
+    Running totals behind Team.get_team_average over the active roster: OPS of the non-pitchers, ERA of the pitchers,
+    and how many non-pitchers haven't batted / pitchers haven't pitched in a game yet. Each player's last contribution is kept, so a player
+    whose stats changed is updated with one subtraction and one addition.
+    """
+
+    def __init__(self):
+        self.totals = {'ops': 0.0, 'era': 0.0}
+        self.counts = {'ops': 0, 'era': 0}
+        self.unplayed = {'ops': 0, 'era': 0}
+        self.contributions = {}  # player full name -> output of get_contribution
+
+    @staticmethod
+    def get_contribution(player: Player) -> (str, float, int):
+        """
+        :return: Stat the player counts towards, its value, and whether the player hasn't played for it yet (batted for
+        OPS, pitched for ERA). Pitchers never bat, so they only count towards ERA.
+        """
+        if player.position == 1:
+            return 'era', player.stats.pitching.era(), int(player.stats.pitching.games_pitched_in == 0)
+        return 'ops', player.stats.batting.ops(), int(player.stats.batting.games_played == 0)
+
+    def apply(self, contribution: tuple, sign: int) -> None:
+        stat_name, value, unplayed = contribution
+        self.totals[stat_name] += sign * value
+        self.counts[stat_name] += sign
+        self.unplayed[stat_name] += sign * unplayed
+
+    def add_player(self, player: Player) -> None:
+        contribution = self.get_contribution(player)
+        self.contributions[player.full_name] = contribution
+        self.apply(contribution, 1)
+
+    def update_player(self, player: Player) -> None:
+        """
+        Replaces the player's contribution with one from their current stats. Players off the active roster are ignored.
+        """
+        old_contribution = self.contributions.get(player.full_name)
+        if old_contribution is not None:
+            self.apply(old_contribution, -1)
+            self.add_player(player)
+
+    def get_average(self, stat_name: str) -> float:
+        """
+        :param stat_name: 'ops' or 'era'.
+        """
+        if self.unplayed[stat_name] > 0:
+            return UNPLAYED_TEAM_AVERAGE
+        return self.totals[stat_name] / self.counts[stat_name]
+
+
 class Team:
     """
     Object handling a Foulball Team
     """
-    def __init__(self, json_str: str = None):
+    def __init__(self, json_str: str = None, rng: np.random.Generator = None, data: dict = None, player_data: dict = None):
         """
         Construct a new Team.
         :param json_str: JSON data for a team as a string (loaded into object by Team class).
+        :param rng: Generator used when creating a new team (ignored when loading).
+        :param data: Already parsed team data (output of to_dict, or an old save's record).
+        :param player_data: Saved players by id to build the roster from, the players file if None.
         """
-        if json_str is not None:
+        if data is not None:
+            self.from_dict(decode_nested(data), player_data)
+        elif json_str is not None:
             try:
-                json_data = json.loads(json_str)
-                self.from_json(json_data)
+                self.from_dict(decode_nested(json_str), player_data)  # old team files were encoded twice
             except JSONDecodeError as json_error:
                 print('Unable to load team JSON data. Is this a valid JSON format?')
                 print(json_error)
                 print('Bad team data loaded. Exiting to preserve simulation.')
                 exit(1)
         else:
-            self.generate_from_scratch()
+            self.generate_from_scratch(rng)
 
     def __repr__(self):
         """
@@ -111,11 +236,10 @@ class Team:
             num_position = get_position_by_name(field_position)
         else:
             num_position = field_position
-        for player_name in self.game_lineup.values():
-            player = self.get_player_by_name(player_name)
-            if player.position == num_position:
-                return player
-        print('No player in lineup found at position ' + str(num_position) + '! Very odd.')
+        player = self.lineup_by_position.get(num_position)
+        if player is None:
+            print('No player in lineup found at position ' + str(num_position) + '! Very odd.')
+        return player
 
     def get_number_in_lineup(self, player_full_name) -> int:
         """
@@ -124,74 +248,168 @@ class Team:
         :param player_full_name: Player full name.
         :return: Lineup order 1-9 (0 being not found)
         """
-        if player_full_name in self.game_lineup.values():
-            return list(self.game_lineup.keys()).index(list(self.game_lineup.keys())[list(self.game_lineup.values()).index(player_full_name)])
-        else:
-            return 0
+        return self.lineup_numbers.get(player_full_name, 0)
+
+    # Indexes #
+    def index_roster(self) -> None:
+        """
+        Rebuilds the name -> player index of the forty-man roster, and the lineup indexes and team averages with it.
+        Call after replacing or editing forty_man_roster. The team counts as unsaved afterwards.
+        """
+        self.players_by_name = {}
+        for player in self.forty_man_roster:
+            self.players_by_name.setdefault(player.full_name, player)  # first one wins, like the old roster scan
+        self.index_lineup()
+        self.index_aggregates()
+
+        # save state, see save_league #
+        self.dirty = True  # team file out of date
+        self.dirty_players = set()  # ids of players whose saved record is out of date
+        self.player_records = {}  # player id -> last saved JSON text of the player
+
+    def index_lineup(self) -> None:
+        """
+        Rebuilds the field position -> player and name -> lineup number indexes. Call after changing game_lineup or the
+        position of a lineup player.
+        """
+        self.lineup_by_position = {}
+        self.lineup_numbers = {}
+        for lineup_number, player_name in enumerate(self.game_lineup.values()):
+            self.lineup_numbers.setdefault(player_name, lineup_number)
+            player = self.players_by_name.get(player_name)
+            if player is not None:
+                self.lineup_by_position.setdefault(player.position, player)
+
+    def index_aggregates(self) -> None:
+        """
+        Rebuilds the running team averages from the active roster. Call after changing the active roster or loading stats.
+        """
+        self.aggregates = TeamAggregates()
+        for player_name in self.get_active_player_names():
+            player = self.players_by_name.get(player_name)
+            if player is not None:  # lightweight game copies only carry their lineup
+                self.aggregates.add_player(player)
+
+    def update_aggregates(self, players: list) -> None:
+        """
+        Brings the team averages up to date after these players' stats changed.
+        """
+        for player in players:
+            self.aggregates.update_player(player)
+
+    def mark_changed(self, players: list = ()) -> None:
+        """
+        Records that the team's data and these players' stats or positions changed: updates the team averages and flags
+        them for the next incremental save. Call after editing them outside of games and lineup updates.
+        """
+        self.update_aggregates(players)
+        self.dirty = True
+        for player in players:
+            self.dirty_players.add(player.get_id())
 
     def get_active_players_by_position(self, position) -> list:
         """
         Gets active players according to position. Infielders and outfielders are lumped into their own groups.
-        :param position: Position as number or string.
-        :return: List of players in the position category.
+        :param position: Position as number or string (roster categories 'IF' and 'OF' are accepted too).
+        :return: Copy of the list of players in the position category (safe to remove from).
         """
 
+        if position in self.active_roster:
+            return list(self.active_roster[position])
         if isinstance(position, str):
             position_as_number = get_position_by_name(position)
         else:
             position_as_number = position
 
         if 2 < position_as_number < 7:  # infield
-            return self.active_roster['IF']
+            return list(self.active_roster['IF'])
         elif 6 < position_as_number < 10:  # outfield
-            return self.active_roster['OF']
+            return list(self.active_roster['OF'])
         else:
-            return self.active_roster[get_position_by_number(position_as_number)]
+            return list(self.active_roster[get_position_by_number(position_as_number)])
 
-    def generate_forty_man_roster(self) -> list:
+    def generate_forty_man_roster(self, rng: np.random.Generator = None) -> list:
         """
         Generates a forty-man roster from randomly created players. Unique jersey numbers.
+        :param rng: Generator to draw from.
         :return: A list of players in the forty-man roster
         """
-        all_jersey_numbers = list(range(100))
-        output = []
-        for i in range(40):
-            new_player = Player()
+        rng = resolve_generator(rng)
+        output = generate_players(40, rng)
+        for new_player, jersey_number in zip(output, rng.choice(100, size=40, replace=False).tolist()):
             new_player.team = self.name
-            new_player.jersey_number = random.choice(all_jersey_numbers)
-            all_jersey_numbers.remove(new_player.jersey_number)
-            output.append(new_player)
+            new_player.jersey_number = jersey_number
         return output
 
+    def get_active_player_names(self) -> list:
+        """
+        :return: Names of every player on the active roster, all categories together.
+        """
+        return [player_name for category in self.active_roster.values() for player_name in category]
+
     def get_player_by_name(self, player_full_name: str) -> Player:
         """
         Gets a player from the forty-man roster and returns the player data.
         :param player_full_name: full name of the player
         :return: Player data
         """
+        return self.players_by_name.get(player_full_name)
+
+    def is_player_saved(self, player: Player) -> bool:
+        player_id = player.get_id()
+        return player_id in self.player_records and player_id not in self.dirty_players
+
+    def get_player_records(self) -> list:
+        """
+        JSON text of every forty-man player for the players file, serializing again only the players changed since the
+        last call (or never serialized).
+        :return: List of '"id":{...}' entries.
+        """
+        records = []
         for player in self.forty_man_roster:
-            if player.full_name == player_full_name:
-                return player
+            player_id = player.get_id()
+            if not self.is_player_saved(player):
+                self.player_records[player_id] = json.dumps(player_id) + ':' + json.dumps(player.to_dict(), separators=(',', ':'))
+            records.append(self.player_records[player_id])
+        self.dirty_players.clear()
+        return records
+
+    def get_players_as_dict(self) -> dict:
+        """
+        :return: Player id -> player JSON object for the whole forty-man roster.
+        """
+        return {player.get_id(): player.to_dict() for player in self.forty_man_roster}
 
     def get_players_as_json(self) -> str:
         """
         Returns all the teams players as a JSON string with the ids as keys and the player data as the value.
         :return: JSON string with the ids as keys and the player data
         """
-        data_object = {}
-        for player in self.forty_man_roster:
-            data_object[player.full_name + str(player.height_inches)] = player.to_json()
-        return json.dumps(data_object)
+        return json.dumps(self.get_players_as_dict())
+
+    def get_forty_man_ids(self) -> list:
+        """
+        :return: Player ids of the forty-man roster, as stored in team files.
+        """
+        return [player.get_id() for player in self.forty_man_roster]
 
     def convert_forty_man_to_json(self) -> str:
         """
         Converts the forty-man roster into a JSON string for storage.
         :return: JSON string containing player ids.
         """
-        ids = []
-        for player in self.forty_man_roster:
-            ids.append(player.full_name + str(player.height_inches))
-        return json.dumps(ids)
+        return json.dumps(self.get_forty_man_ids())
+
+    def load_forty_man(self, player_ids: list, player_data: dict = None) -> list:
+        """
+        Builds the forty-man roster from saved players.
+        :param player_ids: Ids of the players (or an old save's JSON string of them).
+        :param player_data: Saved players by id, the players file if None.
+        :return: A list of Player objects.
+        """
+        if player_data is None:
+            player_data = get_player_data()
+        return [Player(data=player_data[player_id]) for player_id in decode_nested(player_ids)]
 
     def load_forty_man_from_json(self, json_str: str):
         """
@@ -199,46 +417,51 @@ class Team:
         :param json_str: String containing the player ids
         :return: A list of Player objects.
         """
-        forty_man = []
-        for player_id in json.loads(json_str):
-            forty_man.append(Player(json.loads(PLAYER_DATA[player_id])))
-        return forty_man
+        return self.load_forty_man(json.loads(json_str))
 
-    def update_lineup(self) -> None:
+    def update_lineup(self, rng: np.random.Generator = None) -> None:
         """
         Using the team strategy, updates the lineup for the next simulation.
+        :param rng: Generator used for lineup decisions.
         """
+        rng = resolve_generator(rng)
+        previous_lineup = dict(self.game_lineup)
+
         # possible there is no lineup yet, so check and randomly select if so.
         for pos_name in FIELDING_POSITIONS_TEXT:
             if self.game_lineup[pos_name] == '':
                 # randomly select pitcher from active list 'P'
-                self.game_lineup['P'] = random.choice(self.active_roster['P'])
+                self.game_lineup['P'] = random_choice(self.active_roster['P'], rng)
 
                 # randomly select catcher from active list 'C'
-                self.game_lineup['C'] = random.choice(self.active_roster['C'])
+                self.game_lineup['C'] = random_choice(self.active_roster['C'], rng)
 
                 # randomly select infielders from active list 'IF'
                 eligible_infielders = list(self.active_roster['IF'])
-                self.game_lineup['1B'] = random.choice(eligible_infielders)
+                self.game_lineup['1B'] = random_choice(eligible_infielders, rng)
                 eligible_infielders.remove(self.game_lineup['1B'])
-                self.game_lineup['2B'] = random.choice(eligible_infielders)
+                self.game_lineup['2B'] = random_choice(eligible_infielders, rng)
                 eligible_infielders.remove(self.game_lineup['2B'])
-                self.game_lineup['3B'] = random.choice(eligible_infielders)
+                self.game_lineup['3B'] = random_choice(eligible_infielders, rng)
                 eligible_infielders.remove(self.game_lineup['3B'])
-                self.game_lineup['SS'] = random.choice(eligible_infielders)
+                self.game_lineup['SS'] = random_choice(eligible_infielders, rng)
                 eligible_infielders.remove(self.game_lineup['SS'])
 
                 # randomly select outfielders from active list 'OF'
                 eligible_outfielders = list(self.active_roster['OF'])
-                self.game_lineup['LF'] = random.choice(eligible_outfielders)
+                self.game_lineup['LF'] = random_choice(eligible_outfielders, rng)
                 eligible_outfielders.remove(self.game_lineup['LF'])
-                self.game_lineup['CF'] = random.choice(eligible_outfielders)
+                self.game_lineup['CF'] = random_choice(eligible_outfielders, rng)
                 eligible_outfielders.remove(self.game_lineup['CF'])
-                self.game_lineup['RF'] = random.choice(eligible_outfielders)
+                self.game_lineup['RF'] = random_choice(eligible_outfielders, rng)
                 eligible_outfielders.remove(self.game_lineup['RF'])
 
                 # randomly select DH from active list 'DH'
-                self.game_lineup['DH'] = random.choice(self.active_roster['DH'])
+                self.game_lineup['DH'] = random_choice(self.active_roster['DH'], rng)
+
+                # set the position for every player in the new lineup
+                for position_name, player_name in self.game_lineup.items():
+                    self.get_player_by_name(player_name).position = get_position_by_name(position_name)
                 break
 
         # pull the list of eligible players by category #
@@ -253,22 +476,22 @@ class Team:
             if self.stats.total_games() != 0 and self.stats.total_games() % 5 == 0:
                 for position_name in FIELDING_POSITIONS_TEXT:
                     if position_name == 'P':  # pitcher
-                        new_pitching_choice: str = random.choice(eligible_pitchers)
+                        new_pitching_choice: str = random_choice(eligible_pitchers, rng)
                         self.game_lineup[position_name] = new_pitching_choice
                     elif position_name in ['1B', '2B', '3B', 'SS']:
-                        new_infielder_choice: str = random.choice(eligible_infielders)
+                        new_infielder_choice: str = random_choice(eligible_infielders, rng)
                         self.game_lineup[position_name] = new_infielder_choice
                         eligible_infielders.remove(new_infielder_choice)
                     elif position_name in ['LF', 'CF', 'RF']:
-                        new_outfielder_choice: str = random.choice(eligible_outfielders)
+                        new_outfielder_choice: str = random_choice(eligible_outfielders, rng)
                         self.game_lineup[position_name] = new_outfielder_choice
                         eligible_outfielders.remove(new_outfielder_choice)
                     elif position_name == 'C':
-                        new_catcher_choice: str = random.choice(eligible_catchers)
+                        new_catcher_choice: str = random_choice(eligible_catchers, rng)
                         self.game_lineup[position_name] = new_catcher_choice
                         eligible_catchers.remove(new_catcher_choice)
                     elif position_name == 'DH':
-                        new_designated_hitter: str = random.choice(eligible_designated_hitters)
+                        new_designated_hitter: str = random_choice(eligible_designated_hitters, rng)
                         self.game_lineup[position_name] = new_designated_hitter
                         eligible_designated_hitters.remove(new_designated_hitter)
                     # set the position for the player
@@ -280,74 +503,68 @@ class Team:
                     old_player: Player = self.get_player_by_name(old_player_name)
                     if position_name == 'P':  # here we care about ERA
                         if old_player.stats.pitching.era() <= self.get_team_average('era'):
-                            eligible_pitchers.remove(old_player_name)
-                            self.game_lineup[position_name] = random.choice(eligible_pitchers)
+                            self.replace_in_lineup(position_name, eligible_pitchers, rng)
                     else:  # everyone else we care about OPS
                         if old_player.stats.batting.ops() <= self.get_team_average('ops'):
-                            if position_name == 'C':
-                                eligible_catchers.remove(old_player_name)
-                                self.game_lineup[position_name] = random.choice(eligible_catchers)
-                            elif position_name == 'DH':
-                                eligible_designated_hitters.remove(old_player_name)
-                                self.game_lineup[position_name] = random.choice(eligible_designated_hitters)
-                            elif position_name in ['1B', '2B', '3B', 'SS']:
-                                eligible_infielders.remove(old_player_name)
-                                self.game_lineup[position_name] = random.choice(eligible_infielders)
-                            elif position_name in ['LF', 'CF', 'RF']:
-                                eligible_outfielders.remove(old_player_name)
-                                self.game_lineup[position_name] = random.choice(eligible_outfielders)
+                            self.replace_in_lineup(position_name, self.get_active_players_by_position(convert_position_name_to_category(position_name)), rng)
                     # set the position for the player
                     self.get_player_by_name(self.game_lineup[position_name]).position = get_position_by_name(position_name)
         elif self.strategy == 2:  # if team has X more losses than wins, randomly choose
             if self.stats.wins - self.stats.losses <= -10:
                 for position_name in FIELDING_POSITIONS_TEXT:
                     if position_name == 'P':  # pitcher
-                        new_pitching_choice: str = random.choice(eligible_pitchers)
+                        new_pitching_choice: str = random_choice(eligible_pitchers, rng)
                         self.game_lineup[position_name] = new_pitching_choice
                     elif position_name in ['1B', '2B', '3B', 'SS']:
-                        new_infielder_choice: str = random.choice(eligible_infielders)
+                        new_infielder_choice: str = random_choice(eligible_infielders, rng)
                         self.game_lineup[position_name] = new_infielder_choice
                         eligible_infielders.remove(new_infielder_choice)
                     elif position_name in ['LF', 'CF', 'RF']:
-                        new_outfielder_choice: str = random.choice(eligible_outfielders)
+                        new_outfielder_choice: str = random_choice(eligible_outfielders, rng)
                         self.game_lineup[position_name] = new_outfielder_choice
                         eligible_outfielders.remove(new_outfielder_choice)
                     elif position_name == 'C':
-                        new_catcher_choice: str = random.choice(eligible_catchers)
+                        new_catcher_choice: str = random_choice(eligible_catchers, rng)
                         self.game_lineup[position_name] = new_catcher_choice
                         eligible_catchers.remove(new_catcher_choice)
                     elif position_name == 'DH':
-                        new_designated_hitter: str = random.choice(eligible_designated_hitters)
+                        new_designated_hitter: str = random_choice(eligible_designated_hitters, rng)
                         self.game_lineup[position_name] = new_designated_hitter
                         eligible_designated_hitters.remove(new_designated_hitter)
                     # set the position for the player
                     self.get_player_by_name(self.game_lineup[position_name]).position = get_position_by_name(position_name)
         else:  # nothing
             pass
+        self.index_lineup()
+        if self.game_lineup != previous_lineup:  # new positions to save
+            self.mark_changed([self.get_player_by_name(player_name) for player_name in self.game_lineup.values()])
+
+    def replace_in_lineup(self, position_name: str, eligible_players: list, rng: np.random.Generator) -> None:
+        """
+        Swaps the player at a lineup position for a random eligible player not already in the lineup.
+        Keeps the current player if there is nobody else.
+        :param position_name: Lineup position ('P', '1B', etc.).
+        :param eligible_players: Names of active players who can play the position.
+        :param rng: Generator used for the choice.
+        """
+        candidates = [player_name for player_name in eligible_players if player_name not in self.game_lineup.values()]
+        if len(candidates) > 0:
+            self.game_lineup[position_name] = random_choice(candidates, rng)
+
+    def get_batting_order(self) -> list:
+        """
+        The nine hitters of the game lineup in batting order (the DH bats for the pitcher).
+        :return: List of Player objects.
+        """
+        return [self.get_player_by_name(self.game_lineup[position_name]) for position_name in FIELDING_POSITIONS_TEXT if position_name != 'P']
 
     def get_team_average(self, stat_name: str) -> float:
-        total_players = 0
-        if stat_name == 'ops':
-            ops_total = 0
-            for player_name in self.active_roster:
-                player: Player = self.get_player_by_name(player_name)
-                if player.stats.batting.games_played == 0:
-                    # if a player hasn't played yet throw the average so it forces a replacement.
-                    ops_total = 99999
-                if player.position != 1:
-                    ops_total += player.stats.batting.ops()
-                    total_players += 1
-            return ops_total / total_players
-        elif stat_name == 'era':
-            era_total = 0
-            for player_name in self.active_roster:
-                player: Player = self.get_player_by_name(player_name)
-                if player.stats.pitching.games_pitched_in == 0:
-                    era_total = 99999
-                if player.position == 1:
-                    era_total += player.stats.pitching.era()
-                    total_players += 1
-            return era_total / total_players
+        """
+        Average OPS of the active non-pitchers or ERA of the active pitchers, read from the running totals.
+        If a player hasn't played yet the average is thrown (UNPLAYED_TEAM_AVERAGE) so it forces a replacement.
+        :param stat_name: 'ops' or 'era'.
+        """
+        return self.aggregates.get_average(stat_name)
 
     def generate_random_active_roster(self) -> None:
         """
@@ -387,85 +604,146 @@ class Team:
             p: Player = eligible_players.pop()
             self.active_roster['DH'].append(p.full_name)
 
-    def generate_from_scratch(self) -> None:
+        self.index_lineup()  # positions changed
+        self.index_aggregates()
+
+    def generate_from_scratch(self, rng: np.random.Generator = None, location: tuple = None) -> None:
         """
         Generates new data for a team
+        :param rng: Generator to draw from (unseeded if None).
+        :param location: (city, state abbreviation) of the team, drawn from the city table if None.
         """
-        csvfile = pd.read_csv('sources/us-cities.csv')
-        location = csvfile.sample()
-        team_noun = Pluralizer().plural(RandomWord().word()).title()
-        self.name = location.City.to_string(index=False) + " " + team_noun
-        self.short_name = location.City.to_string(index=False)[:2].upper() + team_noun[1].upper()
-        self.state = location['State short'].to_string(index=False)
+        rng = resolve_generator(rng)
+        if location is None:
+            location = draw_cities(1, rng)[0]
+        city, self.state = location
+        team_noun = Pluralizer().plural(RandomWord(enhanced_prefixes=False, rng=python_random_from(rng)).word()).title()
+        self.name = city + " " + team_noun
+        self.short_name = city[:2].upper() + team_noun[1].upper()
 
-        self.forty_man_roster = self.generate_forty_man_roster()
-        self.active_roster = {'P': [], 'C': [], 'IF': [], 'OF': [], 'DH': []}
-        self.game_lineup = {'P': '', 'C': '', '1B': '', '2B': '', '3B': '', 'SS': '', 'LF': '', 'CF': '', 'RF': '', 'DH': ''}
-        self.generate_random_active_roster()
-        self.update_lineup()
-
-        self.home_stadium = Stadium([location.City.to_string(index=False), team_noun], self.state)
         self.stats = TeamStatistics()
         self.division = ''
 
         # management and strategy
-        self.strategy = random.choice([0, 1, 2])  # 0 is 5 simulation trial, 1 is replace if below avg, 2 is randomize if losing
+        self.strategy = random_choice([0, 1, 2], rng)  # 0 is 5 simulation trial, 1 is replace if below avg, 2 is randomize if losing
+
+        self.forty_man_roster = self.generate_forty_man_roster(rng)
+        self.active_roster = {'P': [], 'C': [], 'IF': [], 'OF': [], 'DH': []}
+        self.game_lineup = {'P': '', 'C': '', '1B': '', '2B': '', '3B': '', 'SS': '', 'LF': '', 'CF': '', 'RF': '', 'DH': ''}
+        self.index_roster()
+        self.generate_random_active_roster()
+        self.update_lineup(rng)
+
+        self.home_stadium = Stadium([city, team_noun], self.state, rng=rng)
 
-    def from_json(self, json_data) -> None:
+    def from_dict(self, json_data: dict, player_data: dict = None, forty_man_roster: list = None) -> None:
         """
-        Sets the team parameters from a JSON object.
+        Sets the team parameters from a JSON object. Nested objects saved in the old JSON-string format are accepted too.
         :param json_data: JSON object containing data from a team file.
+        :param player_data: Saved players by id, the players file if None.
+        :param forty_man_roster: Players already built (e.g. from a league snapshot), in the order of the saved ids.
         """
         self.name = json_data['name']
         self.short_name = json_data['short_name']
         self.state = json_data['state']
-        self.forty_man_roster = self.load_forty_man_from_json(json_data['forty_man_roster'])
-        self.active_roster = json.loads(json_data['active_roster'])
-        self.game_lineup = json.loads(json_data['game_lineup'])
-        self.home_stadium = Stadium(data=json.loads(json_data['home_stadium']))
-        self.stats = TeamStatistics(json.loads(json_data['stats']))
+        if forty_man_roster is None:
+            forty_man_roster = self.load_forty_man(json_data['forty_man_roster'], player_data)
+        self.forty_man_roster = forty_man_roster
+        self.active_roster = decode_nested(json_data['active_roster'])
+        self.game_lineup = decode_nested(json_data['game_lineup'])
+        self.home_stadium = Stadium(data=decode_nested(json_data['home_stadium']))
+        self.stats = TeamStatistics(decode_nested(json_data['stats']))
         self.strategy = json_data['strategy']
         self.division = json_data['division']
+        self.index_roster()
+        self.dirty = False  # same as the file it came from
 
-    def to_json(self) -> str:
+    def to_dict(self) -> dict:
         """
-        Converts the team object to a JSON string.
-        :return: JSON string of team data.
+        Converts the team object to a JSON object, nested objects included (nothing is encoded twice). Players are
+        stored by id, see save_player_file.
+        :return: Dictionary of JSON types.
         """
-        data_object = {
+        return {
             'name': self.name,
             'short_name': self.short_name,
             'state': self.state,
-            'home_stadium': self.home_stadium.to_json(),
-            'forty_man_roster': self.convert_forty_man_to_json(),
-            'active_roster': json.dumps(self.active_roster),
-            'game_lineup': json.dumps(self.game_lineup),
-            'stats': self.stats.to_json(),
+            'home_stadium': self.home_stadium.to_dict(),
+            'forty_man_roster': self.get_forty_man_ids(),
+            'active_roster': self.active_roster,
+            'game_lineup': self.game_lineup,
+            'stats': self.stats.to_dict(),
             'strategy': self.strategy,
             'division': self.division
         }
 
-        return json.dumps(data_object)
+    def to_json(self) -> str:
+        """
+        Converts the team object to a JSON string.
+        :return: JSON string of team data.
+        """
+        return json.dumps(self.to_dict())
 
 
-def save_team_file(team: Team) -> None:
+def generate_teams(count: int, rng: np.random.Generator = None) -> list:
+    """
+    Creates a league of new teams, each from a different city, with one draw for all the cities.
+    :param count: Number of teams.
+    :param rng: Generator to draw from (unseeded if None).
+    :return: List of teams.
     """
-    Saves team to json file in save folder.
+    rng = resolve_generator(rng)
+    teams = []
+    for location in draw_cities(count, rng):
+        team = Team.__new__(Team)  # generated here instead of in __init__, so the city can be passed
+        team.generate_from_scratch(rng, location)
+        teams.append(team)
+    return teams
+
+
+def get_team_file_name(team: Team) -> str:
+    return team.name.replace(" ", "_") + '.json'
+
+
+def save_team_file(team: Team, folder: str = TEAM_SAVE_FOLDER) -> None:
+    """
+    Saves team to json file in save folder (atomically).
     :param team: Team object
     """
-    team_file_name = team.name.replace(" ", "_") + '.json'
-    with open('../simulation/saves/teams/' + team_file_name, 'w') as outfile:
-        json.dump(team.to_json(), outfile)
+    write_atomic(os.path.join(folder, get_team_file_name(team)), json.dumps(team.to_dict(), separators=(',', ':')))
+    team.dirty = False
 
 
-def load_team_file(team_file_name) -> Team:
+def save_league(teams: list, player_path: str = PLAYER_FILE_PATH, team_folder: str = TEAM_SAVE_FOLDER, full: bool = False) -> (int, int):
+    """
+    Incremental save: rewrites the team files of changed teams, and the players file only if a player changed, from
+    cached records so only the changed players are serialized again. Every file is replaced atomically.
+    :param full: Rewrite everything, e.g. after editing data without mark_changed.
+    :return: Number of players serialized and of team files written.
+    """
+    if full:
+        for team in teams:
+            team.mark_changed(team.forty_man_roster)
+    changed_players = sum(not team.is_player_saved(player) for team in teams for player in team.forty_man_roster)
+    if changed_players > 0 or not os.path.exists(player_path):
+        save_player_file(teams, player_path)
+    changed_teams = 0
+    for team in teams:
+        if team.dirty or not os.path.exists(os.path.join(team_folder, get_team_file_name(team))):
+            save_team_file(team, team_folder)
+            changed_teams += 1
+    return changed_players, changed_teams
+
+
+def load_team_file(team_file_name, folder: str = TEAM_SAVE_FOLDER, player_data: dict = None) -> Team:
     """
-    Load team from file
+    Load team from file (old double-encoded files too)
     :param team_file_name: TEAMNAME.json
+    :param player_data: Saved players by id, the players file if None.
     :return: Team object.
     """
-    with open('../simulation/saves/teams/' + team_file_name) as f:
-        return Team(json_str=f.read())
+    with open(os.path.join(folder, team_file_name)) as f:
+        return Team(data=json.load(f), player_data=player_data)
 
 
 def convert_position_name_to_category(position_name: str) -> str:
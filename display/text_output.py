@@ -1,10 +1,16 @@
+import random
 from enum import Enum
 
+import numpy as np
+
 from data.team import Team, get_position_by_number, get_position_by_name
 from data.text_formatting import l1, l2, l3, convert_inning_id_to_string
 from tabulate import tabulate
 
-from simulation.game_simulation import Game, TeamSide
+from simulation.events import EventType, GameEvent
+from simulation.game_simulation import Game, TeamSide, OUTCOME_NAME
+from simulation.postseason import OddsOutcome, PostseasonOdds
+from simulation.win_expectancy import WinExpectancyTable
 
 
 class OutputType(Enum):
@@ -29,6 +35,19 @@ def display_text(output: any) -> None:
         pass  # TODO- TO BE IMPLEMENTED
 
 
+def display_events(game: Game, win_expectancy: WinExpectancyTable = None) -> None:
+    """
+    Renders the play-by-play a game has buffered since the last call.
+    :param win_expectancy: Table to show the win probability after each plate appearance with, none shown if None.
+    """
+    if not game.events.enabled:
+        return
+    for event in game.events.consume():
+        text = format_event(event, game, win_expectancy)
+        if text is not None:
+            display_text(text)
+
+
 def display_lineup(team: Team) -> None:
     if OUTPUT_TYPE == OutputType.CONSOLE:
         print_lineup(team)
@@ -84,6 +103,20 @@ def print_full_roster_stats(team: Team) -> None:
     print(tabulate(player_table))
 
 
+def print_postseason_odds(odds: PostseasonOdds) -> None:
+    probabilities = odds.get_probabilities()
+    low, high = odds.get_confidence_intervals()
+    odds_table = [['Team', 'Division', 'W', 'L', 'Div. %', 'Pennant %', 'Title %']]
+    for team_index in np.argsort(-probabilities[OddsOutcome.TITLE.value], kind='stable'):
+        team = odds.league.teams[team_index]
+        row = [team.name, team.division, team.stats.wins, team.stats.losses]
+        for outcome in OddsOutcome:
+            row.append(l1(100 * probabilities[outcome.value][team_index]) + ' +/- ' + l1(50 * (high[outcome.value][team_index] - low[outcome.value][team_index])))
+        odds_table.append(row)
+    print(tabulate(odds_table))
+    print(str(odds.simulations) + ' simulated season endings.')
+
+
 def print_game_results(game: Game):
     # Top row #
     inning_header = list(range(1, len(game.inning_runs[0]) + 1))
@@ -111,3 +144,46 @@ def print_game_results(game: Game):
     for batter, dist, direction, ev, la, inning in game.home_runs:
         print(str(batter) + " in " + convert_inning_id_to_string(inning) + ". Distance: " + str(int(dist)) + " ft, EV: " + str(round(ev, 1)) + " mph, LA: " + str(round(la, 1)) + " deg, Field Direction: " + str(round(direction, 1)) + " deg")
 
+
+def format_event(event: GameEvent, game: Game, win_expectancy: WinExpectancyTable = None) -> str:
+    """
+    Play-by-play line for one game event.
+    :param win_expectancy: Table for the win probability line after each plate appearance.
+    :return: The line, None if the event isn't shown (plate appearance ends without a table).
+    """
+    player = event.player
+    if event.event_type == EventType.GAME_START:
+        return 'Game starting! ' + event.detail[0] + ' @ ' + event.detail[1] + ' at ' + game.stadium.name + ' (' + game.stadium.state + ')'
+    if event.event_type == EventType.HALF_INNING_START:
+        return 'Now entering the ' + convert_inning_id_to_string(event.half_inning) + '. ' + game.away_team.name + ' ' + str(event.detail[0]) + ', ' + game.home_team.name + ' ' + str(event.detail[1]) + '.'
+    if event.event_type == EventType.PITCH:
+        return random.choice(['Pitcher deals...', 'And the pitch...', 'Pitcher throws...', player.last_name + ' deals...', 'And the pitch from ' + player.last_name + '...'])
+    if event.event_type == EventType.BALL:
+        return 'Ball! Count is now ' + str(event.detail[0]) + '-' + str(event.detail[1]) + '.'
+    if event.event_type == EventType.STRIKE:
+        return 'Strike! Count is now ' + str(event.detail[0]) + '-' + str(event.detail[1]) + '.'
+    if event.event_type == EventType.CONTACT:
+        return player.full_name + ' makes contact!'
+    if event.event_type == EventType.HIT_BY_PITCH:
+        return player.full_name + ' is hit by the pitch!'
+    if event.event_type == EventType.STRIKEOUT:
+        return player.full_name + ' strikes out swinging!'
+    if event.event_type == EventType.WALK:
+        return player.full_name + ' takes a walk.'
+    if event.event_type == EventType.CATCH:
+        return player.last_name + ' makes the catch.'
+    if event.event_type == EventType.ERROR:
+        return player.last_name + ' makes an error fielding the ball!'
+    if event.event_type == EventType.HIT:
+        return player.full_name + ' hits a ' + OUTCOME_NAME[event.detail.value - 1].lower() + '!'
+    if event.event_type == EventType.OUT:
+        return player.full_name + ' is out on a ' + OUTCOME_NAME[event.detail.value - 1].lower() + '.'
+    if event.event_type == EventType.FORCEOUT:
+        return player.full_name + ' is forced out on the play.'
+    if event.event_type == EventType.RUN_SCORED:
+        return player.full_name + ' scores!'
+    if event.event_type == EventType.PLATE_APPEARANCE_END:
+        if win_expectancy is None:
+            return None
+        return game.home_team.short_name + ' win probability: ' + str(round(100 * win_expectancy.get_home_win_probability(event.detail))) + '%'
+    return 'Final: ' + game.away_team.name + ' ' + str(event.detail[0]) + ', ' + game.home_team.name + ' ' + str(event.detail[1]) + '.'
@@ -0,0 +1,154 @@
+from enum import Enum
+
+import numpy as np
+
+# Base-out state: a 3-bit occupancy mask (bit 0 = first, bit 1 = second, bit 2 = third) plus the outs. #
+FIRST_BASE = 0
+SECOND_BASE = 1
+THIRD_BASE = 2
+BASE_MASKS = 8
+
+# where a batter or runner ends up after a play #
+HOME = 3  # scored
+OUT = -1  # retired
+BATTER = -1  # source of the batter in a move (runners use their base number)
+
+DOUBLE_ALL_SCORE_CHANCE = 0.6  # chance every runner scores on a double; otherwise the trailing runner holds at third
+
+
+class Advancement(Enum):
+    WALK = 0  # also hit by pitch: only forced runners move
+    SINGLE = 1
+    DOUBLE_ALL_SCORE = 2
+    DOUBLE_TRAILER_HOLDS = 3
+    TRIPLE = 4
+    HOMERUN = 5
+    OUT = 6  # batter retired, runners hold
+
+
+def count_runners_in_mask(bases: int) -> int:
+    return (bases & 1) + ((bases >> 1) & 1) + ((bases >> 2) & 1)
+
+
+def get_lead_runner_base(bases: int) -> int:
+    """
+    :return: Base number of the runner closest to scoring, -1 if the bases are empty.
+    """
+    for base in (THIRD_BASE, SECOND_BASE, FIRST_BASE):
+        if bases & (1 << base):
+            return base
+    return -1
+
+
+def get_advancement(advancement: Advancement, bases: int) -> list:
+    """
+    Rules of how everyone moves on a play, used to build the transition tables once.
+    :param advancement: Kind of play.
+    :param bases: Occupancy mask before the play.
+    :return: List of (source, destination) moves. Source is BATTER or a base, destination a base, HOME or OUT.
+    """
+    occupied = [base for base in (FIRST_BASE, SECOND_BASE, THIRD_BASE) if bases & (1 << base)]
+    if advancement == Advancement.WALK:
+        moves = [(BATTER, FIRST_BASE)]
+        forced = True  # a runner only moves if everyone behind them is forced too
+        for base in (FIRST_BASE, SECOND_BASE, THIRD_BASE):
+            forced = forced and base in occupied
+            if base in occupied:
+                moves.append((base, base + 1 if forced else base))
+        return moves
+    if advancement == Advancement.SINGLE:
+        return [(BATTER, FIRST_BASE)] + [(base, base + 1) for base in occupied]
+    if advancement == Advancement.DOUBLE_ALL_SCORE:
+        return [(BATTER, SECOND_BASE)] + [(base, HOME) for base in occupied]
+    if advancement == Advancement.DOUBLE_TRAILER_HOLDS:
+        return [(BATTER, SECOND_BASE)] + [(base, THIRD_BASE if base == occupied[0] else HOME) for base in occupied]
+    if advancement == Advancement.TRIPLE:
+        return [(BATTER, THIRD_BASE)] + [(base, HOME) for base in occupied]
+    if advancement == Advancement.HOMERUN:
+        return [(BATTER, HOME)] + [(base, HOME) for base in occupied]
+    return [(BATTER, OUT)] + [(base, base) for base in occupied]
+
+
+def build_transition_tables() -> (list, np.ndarray, np.ndarray, np.ndarray):
+    """
+    :return: moves[advancement][bases] (tuples of moves), and arrays indexed [advancement, bases] of the new
+    occupancy mask, runs scored and outs made.
+    """
+    moves = []
+    new_bases = np.zeros((len(Advancement), BASE_MASKS), dtype=np.int8)
+    runs_scored = np.zeros((len(Advancement), BASE_MASKS), dtype=np.int8)
+    outs_made = np.zeros((len(Advancement), BASE_MASKS), dtype=np.int8)
+    for advancement in Advancement:
+        advancement_moves = []
+        for bases in range(BASE_MASKS):
+            play = tuple(get_advancement(advancement, bases))
+            advancement_moves.append(play)
+            for source, destination in play:
+                if destination == HOME:
+                    runs_scored[advancement.value, bases] += 1
+                elif destination == OUT:
+                    outs_made[advancement.value, bases] += 1
+                else:
+                    new_bases[advancement.value, bases] |= 1 << destination
+        moves.append(advancement_moves)
+    return moves, new_bases, runs_scored, outs_made
+
+
+ADVANCEMENT_MOVES, NEW_BASES, RUNS_SCORED, OUTS_MADE = build_transition_tables()
+NEW_BASES_LIST = NEW_BASES.tolist()  # python ints for the scalar engine
+OUTS_MADE_LIST = OUTS_MADE.tolist()
+
+
+class BaseOutState:
+    """
+    Compact state of a half inning: occupancy mask, which batting order slot is on each base, and outs.
+    """
+
+    def __init__(self):
+        self.bases = 0
+        self.runners = [-1, -1, -1]  # batting order index per base, -1 if empty
+        self.outs = 0
+
+    def __repr__(self):
+        return 'BaseOutState(bases=' + format(self.bases, '03b') + ', outs=' + str(self.outs) + ')'
+
+    def count_runners(self) -> int:
+        return count_runners_in_mask(self.bases)
+
+    def put_runner(self, base: int, batter_index: int) -> None:
+        self.bases |= 1 << base
+        self.runners[base] = batter_index
+
+    def advance(self, advancement: Advancement, batter_index: int) -> list:
+        """
+        Applies a play from the transition tables.
+        :param advancement: Kind of play.
+        :param batter_index: Batting order slot of the batter.
+        :return: Batting order slots of everyone who scored.
+        """
+        scored = []
+        new_runners = [-1, -1, -1]
+        for source, destination in ADVANCEMENT_MOVES[advancement.value][self.bases]:
+            runner = batter_index if source == BATTER else self.runners[source]
+            if destination == HOME:
+                scored.append(runner)
+            elif destination != OUT:
+                new_runners[destination] = runner
+        self.outs += OUTS_MADE_LIST[advancement.value][self.bases]
+        self.bases = NEW_BASES_LIST[advancement.value][self.bases]
+        self.runners = new_runners
+        return scored
+
+    def force_out_lead_runner(self) -> int:
+        """
+        Retires the runner closest to scoring.
+        :return: Batting order slot of the retired runner, -1 if nobody was on.
+        """
+        lead_base = get_lead_runner_base(self.bases)
+        if lead_base < 0:
+            return -1
+        runner = self.runners[lead_base]
+        self.bases &= ~(1 << lead_base)
+        self.runners[lead_base] = -1
+        self.outs += 1
+        return runner
@@ -0,0 +1,328 @@
+import numpy as np
+
+from data.player import RATING_INDEX, SKILL_ATTRIBUTES
+from data.stadium import WALL_TABLE_RESOLUTION, WALL_TABLE_DIRECTIONS
+from simulation.fielding import DEFAULT_ALIGNMENT, INFIELD_POSITIONS, OUTFIELD_POSITIONS, FieldingAlignment
+from simulation.game_simulation import BattingOutcome, BattedBallOutcome, calculate_hit_distance_and_time
+
+# Attributes read by the at-bat model, in the same terms as the Player fields. #
+PITCHER_AT_BAT_ATTRIBUTES = ['throwing_power', 'pitching_control', 'pitching_spin', 'pitching_stamina', 'confidence', 'consistency']
+BATTER_AT_BAT_ATTRIBUTES = ['crit_thinking_batting', 'contact', 'confidence', 'consistency']
+PITCHER_BATTED_BALL_ATTRIBUTES = ['throwing_power']
+BATTER_BATTED_BALL_ATTRIBUTES = ['power', 'handedness', 'height_inches']
+FIELDER_ATTRIBUTES = ['consistency', 'speed', 'height_inches', 'throwing_power', 'crit_thinking_fielding']
+
+# hit direction distribution by batter handedness: (mean, std) in degrees from the left foul pole #
+HANDEDNESS_DIRECTION = {'left': (33, 15), 'right': (66, 15), 'switch': (45, 15)}
+
+
+def get_attribute_arrays(players: list, attribute_names: list) -> dict:
+    """
+    Collects player attributes into arrays for the batched simulation functions.
+    :param players: List of Player objects (one per at-bat, repeats allowed).
+    :param attribute_names: Names of the attributes to collect.
+    :return: Dictionary of attribute name -> array (same order as players).
+    """
+    arrays = {}
+    if any(name in RATING_INDEX for name in attribute_names):
+        # every rating vector in one buffer, (players, ratings) #
+        ratings = np.frombuffer(bytearray().join([player.ratings for player in players]), dtype=float).reshape(len(players), len(SKILL_ATTRIBUTES))
+        arrays = {name: ratings[:, RATING_INDEX[name]] for name in attribute_names if name in RATING_INDEX}
+    return {name: arrays[name] if name in arrays else np.array([getattr(player, name) for player in players]) for name in attribute_names}
+
+
+def get_pitch_constants(pitchers: dict, batters: dict) -> dict:
+    """
+    Computes the parts of the pitch model that don't change pitch to pitch.
+    :param pitchers: Attribute name -> array (see PITCHER_AT_BAT_ATTRIBUTES).
+    :param batters: Attribute name -> array (see BATTER_AT_BAT_ATTRIBUTES).
+    :return: Dictionary of per-matchup constant arrays for resolve_pitches.
+    """
+    return {
+        'ideal_pitch_difficulty': np.asarray(pitchers['throwing_power'], dtype=float) * pitchers['pitching_control'] * pitchers['pitching_spin'],
+        'random_ideal_blend': np.clip(np.asarray(pitchers['pitching_control'], dtype=float) * pitchers['pitching_stamina'] * pitchers['confidence'], 0, 1),  # np.interp clamps
+        'pitcher_consistency': np.asarray(pitchers['consistency'], dtype=float),
+        'batter_thinking': np.asarray(batters['crit_thinking_batting'], dtype=float),
+        'batter_skill': np.asarray(batters['crit_thinking_batting'], dtype=float) * batters['contact'],
+        'random_skill_blend': np.clip(np.asarray(batters['confidence'], dtype=float), 0, 1),
+        'batter_consistency': np.asarray(batters['consistency'], dtype=float),
+    }
+
+
+def resolve_pitches(constants: dict, matchups: np.ndarray, rng: np.random.Generator) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    Throws one pitch for each entry of matchups, with the same rules as a single pitch of simulate_at_bat.
+    :param constants: Output of get_pitch_constants.
+    :param matchups: Index into the constant arrays for every pitch (repeats allowed).
+    :param rng: Random generator to draw from.
+    :return: Boolean arrays is_contact, is_hit_by_pitch, is_strike, is_ball and the swing/pitch disparity of each pitch.
+    """
+    draws = rng.random((4, len(matchups)))
+    hit_draws = rng.standard_normal(len(matchups))
+
+    # finding the pitch difficulty #
+    pitcher_consistency = constants['pitcher_consistency'][matchups]
+    actual_pitch_difficulty = draws[0] + constants['random_ideal_blend'][matchups] * (constants['ideal_pitch_difficulty'][matchups] - draws[0])
+    ball_difficulty = (1 - pitcher_consistency) * draws[1] + pitcher_consistency * actual_pitch_difficulty
+
+    # finding the batter ability #
+    batter_consistency = constants['batter_consistency'][matchups]
+    batter_ability = draws[2] + constants['random_skill_blend'][matchups] * (constants['batter_skill'][matchups] - draws[2])
+    swing_skill = (1 - batter_consistency) * draws[3] + batter_consistency * batter_ability
+
+    # distribution of hits for this pitch #
+    swing_pitch_disparity = swing_skill - ball_difficulty
+    dist_mean = 0.5 * swing_pitch_disparity + 0.25
+    dist_std = (1.0 - np.abs(swing_pitch_disparity)) / 3.0 / 1.5
+
+    # find outcome of pitch #
+    thinking = constants['batter_thinking'][matchups]
+    is_ball_hit = dist_mean + dist_std * hit_draws > 0.5
+    is_ball_outside_strikezone = (ball_difficulty < 0.25) | ((ball_difficulty < 0.4) & (thinking > 0.5)) | ((ball_difficulty < 0.75) & (thinking > 0.75))
+    does_ball_hit_batter = ball_difficulty < 0.01
+
+    is_contact = is_ball_hit & ~does_ball_hit_batter
+    is_strike = ~is_ball_hit & ~is_ball_outside_strikezone & ~does_ball_hit_batter
+    is_ball = ~is_ball_hit & is_ball_outside_strikezone & ~does_ball_hit_batter
+    return is_contact, does_ball_hit_batter, is_strike, is_ball, swing_pitch_disparity
+
+
+def simulate_at_bats(pitchers: dict, batters: dict, rng: np.random.Generator = None) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    Batched counterpart of simulate_at_bat. Resolves N independent at-bats at once with the same per-pitch
+    ball/strike/HBP/contact logic, drawing each pitch's random numbers for every still-active at-bat in one call.
+    :param pitchers: Attribute name -> array of length N (see PITCHER_AT_BAT_ATTRIBUTES).
+    :param batters: Attribute name -> array of length N (see BATTER_AT_BAT_ATTRIBUTES).
+    :param rng: Random generator to draw from (a fresh unseeded one if None).
+    :return: outcomes (BattingOutcome values as int8), pitch counts, swing/pitch disparity (0 unless contact),
+    final ball count and final strike count, all arrays of length N.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    constants = get_pitch_constants(pitchers, batters)
+
+    total_at_bats = len(constants['ideal_pitch_difficulty'])
+    outcomes = np.zeros(total_at_bats, dtype=np.int8)
+    pitches = np.zeros(total_at_bats, dtype=np.int16)
+    disparity = np.zeros(total_at_bats, dtype=float)
+    balls = np.zeros(total_at_bats, dtype=np.int8)
+    strikes = np.zeros(total_at_bats, dtype=np.int8)
+
+    # indices of the at-bats still going #
+    active = np.arange(total_at_bats)
+    while len(active) > 0:
+        is_contact, does_ball_hit_batter, is_strike, is_ball, swing_pitch_disparity = resolve_pitches(constants, active, rng)
+        pitches[active] += 1
+
+        # process outcome #
+        strikes[active[is_strike]] += 1
+        balls[active[is_ball]] += 1
+
+        outcomes[active[is_contact]] = BattingOutcome.BATTER_CONTACT.value
+        disparity[active[is_contact]] = swing_pitch_disparity[is_contact]
+        outcomes[active[does_ball_hit_batter]] = BattingOutcome.HIT_BY_PITCH.value
+        outcomes[active[strikes[active] > 2]] = BattingOutcome.STRIKEOUT_SWINGING.value
+        outcomes[active[balls[active] > 3]] = BattingOutcome.WALK.value
+
+        active = active[outcomes[active] == 0]
+
+    return outcomes, pitches, disparity, balls, strikes
+
+
+def simulate_player_at_bats(pitchers: list, batters: list, rng: np.random.Generator = None) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    Convenience wrapper around simulate_at_bats for lists of Player matchups.
+    :param pitchers: Pitcher of each at-bat.
+    :param batters: Batter of each at-bat (same length as pitchers).
+    :param rng: Random generator to draw from.
+    :return: Same arrays as simulate_at_bats.
+    """
+    return simulate_at_bats(get_attribute_arrays(pitchers, PITCHER_AT_BAT_ATTRIBUTES), get_attribute_arrays(batters, BATTER_AT_BAT_ATTRIBUTES), rng)
+
+
+def calculate_hit_trajectories(throwing_power: np.ndarray, batter_power: np.ndarray, contact_strength: np.ndarray, handedness: np.ndarray, rng: np.random.Generator = None) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Array version of calculate_hit_trajectory for a batch of contact events (from any number of games).
+    :param throwing_power: Pitcher throwing_power per contact.
+    :param batter_power: Batter power per contact.
+    :param contact_strength: Swing/pitch disparity per contact.
+    :param handedness: Batter handedness strings ('left', 'right', 'switch') per contact.
+    :param rng: Random generator to draw from.
+    :return: Arrays of launch angle (deg), exit velocity (mph) and direction (deg from the left foul pole).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    contact_strength = np.asarray(contact_strength, dtype=float)
+    draws = rng.standard_normal((3, len(contact_strength)))
+
+    # Launch Angle #
+    la_magnitude = 90 * contact_strength
+    la_sign = np.sign(contact_strength + 0.333 * draws[0])
+    launch_angle = la_magnitude * la_sign
+
+    # Exit Velocity #
+    ev_mean = 30 * (np.asarray(throwing_power) * batter_power + contact_strength) + 80
+    ev_std = 3 * (1 - contact_strength)
+    exit_velocity = ev_mean + ev_std * draws[1]
+
+    # Hit Direction #
+    handedness = np.asarray(handedness)
+    direction = np.full(len(contact_strength), 45.0)  # unknown handedness goes straight up the middle
+    for hand, (direction_mean, direction_std) in HANDEDNESS_DIRECTION.items():
+        is_hand = handedness == hand
+        direction[is_hand] = np.clip(direction_mean + direction_std * draws[2][is_hand], 0, 90)
+
+    return launch_angle, exit_velocity, direction
+
+
+def calculate_hit_distances_and_times(launch_angle: np.ndarray, exit_velocity: np.ndarray, batter_height: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    Array version of calculate_hit_distance_and_time (the formula is already elementwise).
+    :return: Arrays of distance (ft) and time in air (s).
+    """
+    return calculate_hit_distance_and_time(np.asarray(launch_angle, dtype=float), np.asarray(exit_velocity, dtype=float), np.asarray(batter_height, dtype=float))
+
+
+def simulate_batted_balls(pitchers: dict, batters: dict, contact_strength: np.ndarray, rng: np.random.Generator = None) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    Runs the whole batted-ball physics pass for a batch of contacts.
+    :param pitchers: Attribute name -> array (see PITCHER_BATTED_BALL_ATTRIBUTES).
+    :param batters: Attribute name -> array (see BATTER_BATTED_BALL_ATTRIBUTES).
+    :param contact_strength: Swing/pitch disparity per contact (from simulate_at_bats).
+    :param rng: Random generator to draw from.
+    :return: Arrays of launch angle, exit velocity, direction, distance and time in air.
+    """
+    launch_angle, exit_velocity, direction = calculate_hit_trajectories(pitchers['throwing_power'], batters['power'], contact_strength, batters['handedness'], rng)
+    contact_height = np.asarray(batters['height_inches']) / 2  # ball is met around the batter's waist
+    distance, time_in_air = calculate_hit_distances_and_times(launch_angle, exit_velocity, contact_height)
+    return launch_angle, exit_velocity, direction, distance, time_in_air
+
+
+def get_wall_table_stack(stadiums: list) -> np.ndarray:
+    """
+    Stacks the wall lookup tables of several stadiums (e.g. every park in the league) into one array.
+    :return: Array of shape (stadiums, wall table entries).
+    """
+    return np.stack([stadium.get_wall_table() for stadium in stadiums])
+
+
+def are_home_runs_by_stadium(distances: np.ndarray, directions: np.ndarray, stadium_indices: np.ndarray, wall_tables: np.ndarray) -> np.ndarray:
+    """
+    Home run check for batted balls hit in different parks, in one lookup.
+    :param distances: Batted ball distances (ft).
+    :param directions: Batted ball directions (deg from the left foul pole).
+    :param stadium_indices: Row of wall_tables each ball was hit in.
+    :param wall_tables: Output of get_wall_table_stack.
+    :return: Boolean array, True if the ball clears the wall.
+    """
+    table_indices = np.clip(np.rint(np.asarray(directions) / WALL_TABLE_RESOLUTION).astype(int), 0, len(WALL_TABLE_DIRECTIONS) - 1)
+    return np.asarray(distances) > wall_tables[stadium_indices, table_indices]
+
+
+def get_defense_arrays(fielding_teams: list) -> dict:
+    """
+    Collects the fielders of one or more teams' current lineups for calculate_fielding_outcomes.
+    :param fielding_teams: Team objects (lineups already set).
+    :return: Attribute name -> array of shape (teams, 9), column is field position number - 1.
+    """
+    fielders = [[team.get_player_at_field_position_in_lineup(position) for position in range(1, 10)] for team in fielding_teams]
+    return {name: np.array([[getattr(player, name) for player in team_fielders] for team_fielders in fielders], dtype=float) for name in FIELDER_ATTRIBUTES}
+
+
+def resolve_catches(fielder_distance: np.ndarray, consistency: np.ndarray, speed: np.ndarray, height_inches: np.ndarray, is_outfield: np.ndarray, draws: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Array version of Game.get_catch_probability.
+    :param fielder_distance: Distance between the fielder and the ball (ft).
+    :param draws: Standard normals, shape (2, balls).
+    :return: Boolean arrays is_caught and is_error, and the distance (ft) the fielder was short by.
+    """
+    # Calculate Fielder Reach #
+    range_mean = np.where(is_outfield, 10 * (consistency + speed) + 30, 3 * (consistency + speed) + 5)
+    range_std = np.where(is_outfield, 10 * (1 - consistency), 2 * (1 - consistency))
+    max_range = np.maximum(0, range_mean + range_std * draws[0])
+
+    # Calculating Range Deficit (units are in feet) #
+    short_distance = np.maximum(0, fielder_distance - max_range)
+    reach = height_inches / 12
+    range_deficit = (short_distance - reach / 2) / reach
+
+    # Catching Probability #
+    catch_probability = range_deficit + 0.5 * (1 - consistency) * draws[1]
+    is_caught = catch_probability <= 0
+    return is_caught, ~is_caught & (range_deficit < 0), short_distance
+
+
+def calculate_fielding_outcomes(distances: np.ndarray, directions: np.ndarray, times_in_air: np.ndarray, launch_angles: np.ndarray, defense: dict, defense_indices: np.ndarray, wall_tables: np.ndarray, stadium_indices: np.ndarray, alignment: FieldingAlignment = None, rng: np.random.Generator = None) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    Array version of Game.calculate_fielding_outcome for a batch of batted balls. Doesn't touch player stats.
+    :param distances: Batted ball distances (ft).
+    :param directions: Batted ball directions (deg from the left foul pole).
+    :param times_in_air: Hang times (s).
+    :param launch_angles: Launch angles (deg).
+    :param defense: Output of get_defense_arrays.
+    :param defense_indices: Row of the defense arrays fielding each ball.
+    :param wall_tables: Output of get_wall_table_stack.
+    :param stadium_indices: Row of wall_tables each ball was hit in.
+    :param alignment: Where the fielders stand (no shift if None).
+    :param rng: Random generator to draw from.
+    :return: outcomes (BattedBallOutcome values as int8), fielder play skill (for forceouts), field position number of
+    the fielder making the play (0 if none) and a boolean array of fielding errors.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if alignment is None:
+        alignment = DEFAULT_ALIGNMENT
+    distances = np.asarray(distances, dtype=float)
+    total_balls = len(distances)
+    uniforms = rng.random((3, total_balls))
+    normals = rng.standard_normal((2, total_balls))
+
+    outcomes = np.full(total_balls, BattedBallOutcome.INFIELD_SINGLE.value, dtype=np.int8)
+    play_skill = np.zeros(total_balls)
+    fielders = np.zeros(total_balls, dtype=np.int8)
+    errors = np.zeros(total_balls, dtype=bool)
+
+    # Where is the ball going to land? #
+    is_home_run = are_home_runs_by_stadium(distances, directions, stadium_indices, wall_tables)
+    outcomes[is_home_run] = BattedBallOutcome.HOMERUN.value
+    is_outfield = ~is_home_run & (distances > 160)
+    is_infield = ~is_home_run & (distances > 50) & (distances < 160)
+    is_battery = ~is_home_run & ~is_outfield & ~is_infield
+
+    # infield popouts don't need a fielder #
+    popout_catch_chance = np.interp(times_in_air, [2, 3, 4, 6], [0, 0.5, 0.7, 1])
+    is_popout = is_infield & (uniforms[0] > 1 - popout_catch_chance)
+    outcomes[is_popout] = BattedBallOutcome.POPOUT.value
+
+    # Fielder Play Simulation #
+    for is_zone, candidates, is_outfield_zone in [(is_outfield, OUTFIELD_POSITIONS, True), (is_infield & ~is_popout, INFIELD_POSITIONS, False)]:
+        balls = np.flatnonzero(is_zone)
+        if len(balls) == 0:
+            continue
+        positions, fielder_distances = alignment.get_nearest_fielders(distances[balls], np.asarray(directions)[balls], candidates)
+        positions = positions[:, 0]
+        rows = np.asarray(defense_indices)[balls]
+        columns = positions - 1
+        is_caught, is_error, short_distance = resolve_catches(fielder_distances[:, 0], defense['consistency'][rows, columns], defense['speed'][rows, columns], defense['height_inches'][rows, columns], is_outfield_zone, normals[:, balls])
+        skill = defense['throwing_power'][rows, columns] * defense['crit_thinking_fielding'][rows, columns]
+        errors[balls] = is_error
+
+        if is_outfield_zone:
+            zone_outcomes = np.select([is_caught, short_distance > 100, short_distance >= 25], [BattedBallOutcome.FLYOUT.value, BattedBallOutcome.OUTFIELD_TRIPLE.value, BattedBallOutcome.OUTFIELD_DOUBLE.value], BattedBallOutcome.OUTFIELD_SINGLE.value)
+            is_fielded = np.ones(len(balls), dtype=bool)
+        else:
+            # TODO- TEMPORARY GROUND BALLS (same as the scalar version)
+            is_ground_out = ~is_caught & (uniforms[1][balls] > 0.5)
+            zone_outcomes = np.select([is_caught, is_ground_out], [BattedBallOutcome.LINEOUT.value, BattedBallOutcome.GROUND_OUT.value], BattedBallOutcome.INFIELD_SINGLE.value)
+            is_fielded = is_caught | is_ground_out
+        outcomes[balls] = zone_outcomes
+        play_skill[balls] = np.where(is_fielded, skill, 0)
+        fielders[balls] = np.where(is_fielded, positions, 0)
+
+    # catcher/pitcher fielding #
+    battery_skill = (defense['consistency'][np.asarray(defense_indices), 0] + defense['consistency'][np.asarray(defense_indices), 1]) / 2
+    is_battery_out = is_battery & (uniforms[2] < battery_skill)
+    outcomes[is_battery_out] = np.where(np.asarray(launch_angles)[is_battery_out] > 0, BattedBallOutcome.POPOUT.value, BattedBallOutcome.GROUND_OUT.value)
+    fielders[is_battery_out] = np.where(uniforms[2][is_battery_out] < battery_skill[is_battery_out] / 2, 1, 2)  # either one, evenly
+
+    return outcomes, play_skill, fielders, errors
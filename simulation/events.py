@@ -0,0 +1,85 @@
+from enum import Enum
+
+
+class EventType(Enum):
+    GAME_START = 0  # detail: (away team, home team) text with their records before the game
+    HALF_INNING_START = 1  # detail: (away runs, home runs)
+    PITCH = 2  # player: pitcher
+    BALL = 3  # player: batter, detail: (balls, strikes) after the pitch
+    STRIKE = 4  # player: batter, detail: (balls, strikes) after the pitch
+    CONTACT = 5  # player: batter, detail: swing/pitch disparity
+    HIT_BY_PITCH = 6  # player: batter
+    STRIKEOUT = 7  # player: batter
+    WALK = 8  # player: batter
+    CATCH = 9  # player: fielder
+    ERROR = 10  # player: fielder
+    HIT = 11  # player: batter, detail: BattedBallOutcome
+    OUT = 12  # player: batter, detail: BattedBallOutcome
+    FORCEOUT = 13  # player: runner
+    RUN_SCORED = 14  # player: runner
+    GAME_END = 15  # detail: (away runs, home runs)
+    PLATE_APPEARANCE_END = 16  # detail: GameSnapshot once the score and base-out state include the play
+
+
+class GameEvent:
+    """
+    One thing that happened in a game. Kept small since a game produces a few hundred of them.
+    """
+    __slots__ = ['event_type', 'half_inning', 'player', 'detail']
+
+    def __init__(self, event_type: EventType, half_inning: int, player=None, detail=None):
+        self.event_type = event_type
+        self.half_inning = half_inning
+        self.player = player
+        self.detail = detail
+
+    def __repr__(self):
+        return 'GameEvent(' + self.event_type.name + ', half_inning=' + str(self.half_inning) + ', player=' + str(self.player) + ', detail=' + str(self.detail) + ')'
+
+
+class EventSink:
+    """
+    Where a game sends its events. The simulation checks enabled before building an event, so a disabled sink
+    costs one attribute lookup per call site.
+    """
+    enabled = True
+
+    def emit(self, event: GameEvent) -> None:
+        raise NotImplementedError
+
+
+class NullSink(EventSink):
+    """
+    Discards everything, for bulk runs.
+    """
+    enabled = False
+
+    def emit(self, event: GameEvent) -> None:
+        pass
+
+
+class BufferedSink(EventSink):
+    """
+    Keeps every event in order. Nothing is rendered until someone consumes them
+    (see display.text_output.display_events and simulation.playback), and the buffer doubles as a replay log.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __len__(self):
+        return len(self.events)
+
+    def emit(self, event: GameEvent) -> None:
+        self.events.append(event)
+
+    def consume(self) -> list:
+        """
+        :return: Events emitted since the last call, oldest first.
+        """
+        events = self.events
+        self.events = []
+        return events
+
+
+NULL_SINK = NullSink()
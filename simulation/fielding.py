@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+
+# default (no shift) fielding positions, see FieldingAlignment for per-team ones. #
+# FORMAT: DISTANCE_IN_FEET, ANGLE_FROM_LEFT_FOUL_LINE_DEGREES (index is field position number - 1) #
+FIELDER_POSITIONS = [(60.5, 45), (0, 0), (100, 78.75), (130, 56.25), (100, 11.25), (130, 33.75), (270, 16.5), (320, 45), (270, 82.5)]
+
+# field position numbers (see FieldPosition) that can field each kind of ball #
+INFIELD_POSITIONS = [3, 4, 5, 6]
+OUTFIELD_POSITIONS = [7, 8, 9]
+
+
+def polar_to_cartesian(distance, direction) -> (float, float):
+    """
+    Converts field coordinates to feet on a plane with home plate at the origin and the left foul line as the x axis.
+    Works on floats or arrays.
+    :param distance: Distance from home plate (ft).
+    :param direction: Degrees from the left foul line.
+    :return: x and y (ft).
+    """
+    direction_radians = np.deg2rad(direction)
+    return distance * np.cos(direction_radians), distance * np.sin(direction_radians)
+
+
+class FieldingAlignment:
+    """
+    Where a team's fielders stand, kept in cartesian form so finding the closest fielder to a ball is a handful
+    of multiplies instead of a law-of-cosines call per fielder. One instance per team allows defensive shifts.
+    """
+
+    def __init__(self, positions: list = None):
+        """
+        :param positions: (distance, direction) for positions 1-9, same format as FIELDER_POSITIONS.
+        """
+        if positions is None:
+            positions = FIELDER_POSITIONS
+        self.positions = list(positions)
+        x, y = polar_to_cartesian(np.array([p[0] for p in positions], dtype=float), np.array([p[1] for p in positions], dtype=float))
+        self.x = x
+        self.y = y
+        self.x_list = x.tolist()  # python floats for the scalar path
+        self.y_list = y.tolist()
+
+    def get_fielder_distance(self, field_position: int, distance: float, direction: float) -> float:
+        """
+        Distance (ft) between a fielder's spot and where a ball lands.
+        """
+        direction_radians = math.radians(direction)
+        return math.hypot(distance * math.cos(direction_radians) - self.x_list[field_position - 1], distance * math.sin(direction_radians) - self.y_list[field_position - 1])
+
+    def get_nearest_fielder(self, distance: float, direction: float, candidates: list) -> (int, float):
+        """
+        Scalar nearest fielder lookup for one ball.
+        :param candidates: Field position numbers allowed to make the play (e.g. OUTFIELD_POSITIONS).
+        :return: Field position number of the closest candidate and its distance to the ball (ft).
+        """
+        direction_radians = math.radians(direction)
+        ball_x = distance * math.cos(direction_radians)
+        ball_y = distance * math.sin(direction_radians)
+        nearest_position = candidates[0]
+        nearest_distance = math.inf
+        for position in candidates:
+            fielder_distance = math.hypot(ball_x - self.x_list[position - 1], ball_y - self.y_list[position - 1])
+            if fielder_distance < nearest_distance:
+                nearest_position = position
+                nearest_distance = fielder_distance
+        return nearest_position, nearest_distance
+
+    def get_nearest_fielders(self, distances: np.ndarray, directions: np.ndarray, candidates: list, count: int = 1) -> (np.ndarray, np.ndarray):
+        """
+        Vectorized nearest fielder lookup for a batch of landing points.
+        :param distances: Landing distances (ft).
+        :param directions: Landing directions (deg from the left foul line).
+        :param candidates: Field position numbers allowed to make the play.
+        :param count: How many of the closest fielders to return per ball.
+        :return: Field position numbers and distances (ft), shape (balls, count), closest first.
+        """
+        ball_x, ball_y = polar_to_cartesian(np.asarray(distances, dtype=float), np.asarray(directions, dtype=float))
+        candidate_indices = np.asarray(candidates) - 1
+        fielder_distances = np.hypot(ball_x[:, None] - self.x[candidate_indices], ball_y[:, None] - self.y[candidate_indices])
+        if count == 1:
+            order = np.argmin(fielder_distances, axis=1)[:, None]
+        else:
+            order = np.argsort(fielder_distances, axis=1)[:, :count]
+        return np.asarray(candidates)[order], np.take_along_axis(fielder_distances, order, axis=1)
+
+
+DEFAULT_ALIGNMENT = FieldingAlignment()
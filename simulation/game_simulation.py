@@ -1,14 +1,14 @@
-import random
-import time
 from enum import Enum
 
 import numpy as np
 
+from data.rng import RandomSource, make_random_source, resolve_generator
 from data.stadium import Stadium
 from data.team import Team
-from data.text_formatting import convert_inning_id_to_string
 from data.player import Player
-from display.text_output import display_text
+from simulation.base_out import Advancement, BaseOutState, DOUBLE_ALL_SCORE_CHANCE, SECOND_BASE
+from simulation.events import EventSink, EventType, GameEvent, BufferedSink, NULL_SINK
+from simulation.fielding import INFIELD_POSITIONS, OUTFIELD_POSITIONS, DEFAULT_ALIGNMENT, FieldingAlignment
 
 
 class TeamSide(Enum):
@@ -60,44 +60,63 @@ GRAVITY = 9.8106
 DRAG_CONSTANT_K = 0.0002855973575
 BATTING_DISTANCE_ADJUSTMENT = 1.25
 
-# for now, fielding positions are static as shifts are not implemented. #
-# FORMAT: DISTANCE_IN_FEET, ANGLE_FROM_LEFT_FOUL_LINE_DEGREES #
-FIELDER_POSITIONS = [(60.5, 45), (0, 0), (100, 78.75), (130, 56.25), (130, 33.75), (100, 11.25), (270, 16.5), (320, 45), (270, 82.5)]
-
 # TODO- figure out EXACTLY how this works. I don't think ground balls existed before.
 # Chance that a play results in another runner on base being forced out. #
-FORCEOUT_THRESHOLD = [0.9, 0.8, 1, 1, 0.8, 1, 0.8, 1, 1, 0.75, 1, 1]  # 1 is impossible, 0 is easiest
-OUTCOME_NAME = ['OUTFIELD SINGLE', 'OUTFIELD DOUBLE', 'OUTFIELD TRIPLE', 'HOMERUN', 'FLYOUT', 'POPOUT', 'LINEOUT', '-', '-', 'INFIELD SINGLE', '-', '-']
+# Both are indexed by BattedBallOutcome value - 1. #
+FORCEOUT_THRESHOLD = [0.9, 0.8, 1, 1, 0.8, 1, 0.8, 1, 1, 0.75, 1, 1, 0.5]  # 1 is impossible, 0 is easiest
+OUTCOME_NAME = ['OUTFIELD SINGLE', 'OUTFIELD DOUBLE', 'OUTFIELD TRIPLE', 'HOMERUN', 'FLYOUT', 'POPOUT', 'LINEOUT', '-', '-', 'INFIELD SINGLE', '-', '-', 'GROUND OUT']
+
+# How runners move on each batted ball (doubles pick between the two double tables at random). #
+BATTED_BALL_ADVANCEMENT = {
+    BattedBallOutcome.OUTFIELD_SINGLE: Advancement.SINGLE,
+    BattedBallOutcome.INFIELD_SINGLE: Advancement.SINGLE,
+    BattedBallOutcome.OUTFIELD_DOUBLE: Advancement.DOUBLE_ALL_SCORE,
+    BattedBallOutcome.OUTFIELD_TRIPLE: Advancement.TRIPLE,
+    BattedBallOutcome.HOMERUN: Advancement.HOMERUN
+}  # anything else retires the batter
+
+REGULATION_HALF_INNINGS = 18
 
 
 # Simulation Functions #
-def simulate_at_bat(pitcher: Player, batter: Player, real_time_reporting: bool) -> (BattingOutcome, int, float):
+def simulate_at_bat(pitcher: Player, batter: Player, real_time_reporting: bool = False, random_source: RandomSource = None, *, events: EventSink = NULL_SINK, half_inning: int = 0) -> (BattingOutcome, int, float):
+    """
+    Plays one at-bat pitch by pitch.
+    :param real_time_reporting: No longer used (the play-by-play goes to events), kept so positional calls still work.
+    :param events: Sink receiving a GameEvent per pitch and result.
+    :param half_inning: Half inning the events are tagged with.
+    """
+    if random_source is None:
+        random_source = make_random_source()
+
     # at-bat variables #
     balls = 0
     strikes = 0
     total_pitches = 0
 
+    # matchup ratings, read once since they don't change during the at-bat #
+    ideal_pitch_difficulty = pitcher.throwing_power * pitcher.pitching_control * pitcher.pitching_spin  # the pitchers "best" pitch
+    random_ideal_blend = pitcher.pitching_control * pitcher.pitching_stamina * pitcher.confidence  # blend between a random pitch and the best pitch
+    pitcher_consistency = pitcher.consistency
+    batter_skill = batter.crit_thinking_batting * batter.contact
+    random_skill_blend = batter.confidence  # confidence is key
+    batter_consistency = batter.consistency
+    batter_smarts = batter.crit_thinking_batting
+
     # at-bat loop #
     while True:
-        if real_time_reporting:
-            time.sleep(5)
-            display_option = random.choice(['Pitcher deals...', 'And the pitch...', 'Pitcher throws...', pitcher.last_name + ' deals...', 'And the pitch from ' + pitcher.last_name + '...'])
-            display_text(display_option)
-            time.sleep(3)
+        if events.enabled:
+            events.emit(GameEvent(EventType.PITCH, half_inning, pitcher))
 
         # possible outcomes: HIT, BB, K, ꓘ, HBP #
 
         # finding the pitch difficulty #
-        ideal_pitch_difficulty = pitcher.throwing_power * pitcher.pitching_control * pitcher.pitching_spin  # the pitchers "best" pitch
-        random_ideal_blend = pitcher.pitching_control * pitcher.pitching_stamina * pitcher.confidence  # blend between a random pitch and the best pitch
-        actual_pitch_difficulty = np.interp(random_ideal_blend, [0, 1], [np.random.random(), ideal_pitch_difficulty])
-        ball_difficulty = (1 - pitcher.consistency) * np.random.random() + (pitcher.consistency * actual_pitch_difficulty)  # if the pitcher isn't consistent, it's even more random.
+        actual_pitch_difficulty = np.interp(random_ideal_blend, [0, 1], [random_source.next_uniform(), ideal_pitch_difficulty])
+        ball_difficulty = (1 - pitcher_consistency) * random_source.next_uniform() + (pitcher_consistency * actual_pitch_difficulty)  # if the pitcher isn't consistent, it's even more random.
 
         # finding the batter ability #
-        batter_skill = batter.crit_thinking_batting * batter.contact
-        random_skill_blend = batter.confidence  # confidence is key
-        batter_ability = np.interp(random_skill_blend, [0, 1], [np.random.random(), batter_skill])  # same deal as pitcher calculations
-        swing_skill = (1 - batter.consistency) * np.random.random() + batter.consistency * batter_ability
+        batter_ability = np.interp(random_skill_blend, [0, 1], [random_source.next_uniform(), batter_skill])  # same deal as pitcher calculations
+        swing_skill = (1 - batter_consistency) * random_source.next_uniform() + batter_consistency * batter_ability
 
         # calculate the distribution of hits for this matchup #
         swing_pitch_disparity = swing_skill - ball_difficulty
@@ -107,9 +126,9 @@ def simulate_at_bat(pitcher: Player, batter: Player, real_time_reporting: bool)
 
         # find outcome of pitch #
         # TODO - graph how this logic works in desmos
-        is_ball_hit = np.random.normal(dist_mean, dist_std, 1)[0] > 0.5  # if more than 50%, it's a hit!
+        is_ball_hit = random_source.next_normal(dist_mean, dist_std) > 0.5  # if more than 50%, it's a hit!
         # depends on ball difficulty and batter smarts #
-        is_ball_outside_strikezone = (ball_difficulty < 0.25) or (ball_difficulty < 0.4 and batter.crit_thinking_batting > 0.5) or (ball_difficulty < 0.75 < batter.crit_thinking_batting)
+        is_ball_outside_strikezone = (ball_difficulty < 0.25) or (ball_difficulty < 0.4 and batter_smarts > 0.5) or (ball_difficulty < 0.75 < batter_smarts)
         does_ball_hit_batter = ball_difficulty < 0.01  # if it is truly an *awful* pitch
 
         # increment pitch count #
@@ -117,61 +136,63 @@ def simulate_at_bat(pitcher: Player, batter: Player, real_time_reporting: bool)
 
         # process outcome #
         if is_ball_hit and not does_ball_hit_batter:
-            if real_time_reporting:
-                display_text(batter.full_name + ' makes contact!')
+            if events.enabled:
+                events.emit(GameEvent(EventType.CONTACT, half_inning, batter, swing_pitch_disparity))
             return BattingOutcome.BATTER_CONTACT, total_pitches, swing_pitch_disparity
         if does_ball_hit_batter:
-            if real_time_reporting:
-                display_text(batter.full_name + ' is hit by the pitch!')
+            if events.enabled:
+                events.emit(GameEvent(EventType.HIT_BY_PITCH, half_inning, batter))
             return BattingOutcome.HIT_BY_PITCH, total_pitches, 0
         if not is_ball_hit and not is_ball_outside_strikezone:
-            if real_time_reporting:
-                display_text('Strike! Count is now ' + str(balls) + '-' + str(strikes) + '.')
             strikes += 1
             pitcher.stats.pitching.strikes += 1
+            if events.enabled:
+                events.emit(GameEvent(EventType.STRIKE, half_inning, batter, (balls, strikes)))
         if not is_ball_hit and is_ball_outside_strikezone:
-            if real_time_reporting:
-                display_text('Ball! Count is now ' + str(balls) + '-' + str(strikes) + '.')
             balls += 1
             pitcher.stats.pitching.balls += 1
+            if events.enabled:
+                events.emit(GameEvent(EventType.BALL, half_inning, batter, (balls, strikes)))
         if strikes > 2:
-            if real_time_reporting:
-                display_text(batter.full_name + ' strikes out swinging!')
+            if events.enabled:
+                events.emit(GameEvent(EventType.STRIKEOUT, half_inning, batter))
             pitcher.stats.pitching.strikeouts += 1
             return BattingOutcome.STRIKEOUT_SWINGING, total_pitches, 0
         if balls > 3:
-            if real_time_reporting:
-                display_text(batter.full_name + ' takes a walk.')
+            if events.enabled:
+                events.emit(GameEvent(EventType.WALK, half_inning, batter))
             pitcher.stats.pitching.walks_given += 1
             return BattingOutcome.WALK, total_pitches, 0
 
 
-def calculate_hit_trajectory(pitcher: Player, batter: Player, contact_strength: float) -> (float, float, float):
+def calculate_hit_trajectory(pitcher: Player, batter: Player, contact_strength: float, random_source: RandomSource = None) -> (float, float, float):
     # LA: 0 is level, 90 is straight up, -90 is straight down #
     # contact_strength: 1 is pitcher dominant, 0.5 is equal, 0 is batter dominant #
     # hit direction: 0 is left foul pole, 90 is right foul pole
 
     # TODO- also graph this interaction in desmos or something
     # TODO- redo logic here
+    if random_source is None:
+        random_source = make_random_source()
 
     # Launch Angle #
     la_magnitude = 90 * contact_strength  # this is dubious and needs a rewrite
-    la_sign = np.sign(np.random.normal(contact_strength, 0.333, 1)[0])  # more often positive than negative but i DONT agree with this.
+    la_sign = np.sign(random_source.next_normal(contact_strength, 0.333))  # more often positive than negative but i DONT agree with this.
     launch_angle = la_magnitude * la_sign
 
     # Exit Velocity #
     ev_mean = 30 * (pitcher.throwing_power * batter.power + contact_strength) + 80  # TODO- see if this matches reality
     ev_std = 3 * (1 - contact_strength)
-    exit_velocity = np.random.normal(ev_mean, ev_std, 1)[0]  # mph
+    exit_velocity = random_source.next_normal(ev_mean, ev_std)  # mph
 
     # Hit Direction #
     direction = 45
     if batter.handedness == 'left':
-        direction = np.clip(np.random.normal(33, 15, 1)[0], 0, 90)
+        direction = np.clip(random_source.next_normal(33, 15), 0, 90)
     elif batter.handedness == 'right':
-        direction = np.clip(np.random.normal(66, 15, 1)[0], 0, 90)
+        direction = np.clip(random_source.next_normal(66, 15), 0, 90)
     elif batter.handedness == 'switch':
-        direction = np.clip(np.random.normal(45, 15, 1)[0], 0, 90)
+        direction = np.clip(random_source.next_normal(45, 15), 0, 90)
 
     return launch_angle, exit_velocity, direction
 
@@ -192,24 +213,45 @@ def calculate_hit_distance_and_time(launch_angle: float, exit_velocity: float, b
     return impact_distance * M_TO_FT * BATTING_DISTANCE_ADJUSTMENT, np.sqrt(time_in_air_squared)
 
 
-def get_polar_distance(r1: float, r2: float, deg1: float, deg2: float) -> float:
-    return np.sqrt(r1 ** 2 + r2 ** 2 - 2 * r1 * r2 * np.cos(np.deg2rad(deg1 - deg2)))
-
-
 def get_stadium_wall_distance(direction: float, stadium: Stadium):
-    return np.interp(direction, [0, 45, 90], stadium.field_distances)
+    return stadium.get_wall_distance(direction)
+
+
+class GameSnapshot:
+    """
+    Frozen copy of a game's situation, e.g. for win probability (see simulation.win_expectancy).
+    """
+    __slots__ = ['half_inning', 'outs', 'bases', 'runners', 'game_runs', 'batter_on_plate', 'pitchers', 'is_final']
+
+    def __init__(self, half_inning: int, outs: int, bases: int, runners: list, game_runs: list, batter_on_plate: list, pitchers: list, is_final: bool):
+        """
+        :param outs: Outs of the current half inning (3 between half innings).
+        :param bases: Occupancy mask of the bases.
+        :param runners: Batting order slot on each base, -1 if empty.
+        :param pitchers: [away pitcher, home pitcher].
+        :param is_final: True once the game is over.
+        """
+        self.half_inning = half_inning
+        self.outs = outs
+        self.bases = bases
+        self.runners = tuple(runners)
+        self.game_runs = tuple(game_runs)
+        self.batter_on_plate = tuple(batter_on_plate)
+        self.pitchers = tuple(pitchers)
+        self.is_final = is_final
 
+    def __repr__(self):
+        return 'GameSnapshot(half_inning=' + str(self.half_inning) + ', outs=' + str(self.outs) + ', bases=' + format(self.bases, '03b') + ', score=' + str(self.game_runs) + ')'
 
-def count_runners(runners_on_base: list) -> int:
-    total_runners_on_base = 0
-    for runner in runners_on_base:
-        if runner is not None:
-            total_runners_on_base += 1
-    return total_runners_on_base
+    def get_run_differential(self) -> int:
+        """
+        :return: Home runs minus away runs.
+        """
+        return self.game_runs[TeamSide.HOME_TEAM.value] - self.game_runs[TeamSide.AWAY_TEAM.value]
 
 
 class Game:
-    def __init__(self, away_team: Team, home_team: Team, real_time_reporting: bool):
+    def __init__(self, away_team: Team, home_team: Team, real_time_reporting: bool, rng: np.random.Generator = None, buffered_random: bool = None, matchup_cache=None, fielding_alignments: list = None, event_sink: EventSink = None, update_lineups: bool = True):
         # Game Score Tracking #
         self.game_runs = [0, 0]
         self.game_hits = [0, 0]
@@ -220,22 +262,36 @@ class Game:
 
         # Player Tracking #
         self.batter_on_plate = [0, 0]
-        self.real_time_reporting = real_time_reporting
+
+        # play-by-play: kept in a BufferedSink when reporting (see simulation.playback), dropped otherwise #
+        if event_sink is None:
+            event_sink = BufferedSink() if real_time_reporting else NULL_SINK
+        self.events = event_sink
 
         # Simulation Tracking #
+        self.rng = resolve_generator(rng)  # every draw in this game comes from here (see RandomContext.game_generator)
+        self.random_source = make_random_source(self.rng, buffered_random)  # scalar draws for the pitch and fielding loops
+        self.matchup_cache = matchup_cache  # optional simulation.matchup_cache.MatchupCache, shared between games
         self.away_team: Team = away_team
         self.home_team: Team = home_team
 
         self.fielding_team = self.home_team
         self.batting_team = self.away_team
 
-        # Set up teams #
-        self.away_team.update_lineup()
-        self.home_team.update_lineup()
+        # where each side's fielders stand [away, home] (defensive shifts) #
+        if fielding_alignments is None:
+            fielding_alignments = [DEFAULT_ALIGNMENT, DEFAULT_ALIGNMENT]
+        self.fielding_alignments = fielding_alignments
+
+        # Set up teams (a season runner may have done this already) #
+        if update_lineups:
+            self.away_team.update_lineup(self.rng)
+            self.home_team.update_lineup(self.rng)
 
         # Innings #
         self.half_inning = 0
         self.should_continue_playing = True
+        self.base_out_state = BaseOutState()  # of the half inning being played
 
         # Location by Playboi Carti #
         self.stadium = home_team.home_stadium
@@ -243,9 +299,232 @@ class Game:
     def __repr__(self):
         return self.away_team.short_name + ' @ ' + self.home_team.short_name
 
-    def get_catch_probability(self, distance_of_ball: float, direction: float, fielder_position: int, fielding_team: Team, is_outfield: bool) -> (float, float):
+    def play_at_bat(self, pitcher: Player, batter: Player) -> (BattingOutcome, int, float):
+        # cached matchups skip the pitch loop, so there are no pitch events to report #
+        if self.matchup_cache is not None and not self.events.enabled:
+            return self.matchup_cache.simulate_at_bat(pitcher, batter, self.random_source)
+        return simulate_at_bat(pitcher, batter, random_source=self.random_source, events=self.events, half_inning=self.half_inning)
+
+    def get_snapshot(self) -> GameSnapshot:
+        """
+        Current situation of the game. Can be taken from an event sink while the game is played, and comes with every
+        PLATE_APPEARANCE_END event for playback.
+        """
+        state = self.base_out_state
+        pitchers = [self.away_team.get_player_at_field_position_in_lineup('P'), self.home_team.get_player_at_field_position_in_lineup('P')]
+        return GameSnapshot(self.half_inning, state.outs, state.bases, state.runners, self.game_runs, self.batter_on_plate, pitchers, not self.should_continue_playing)
+
+    def get_win_probability(self, table) -> float:
+        """
+        Home team's chance of winning from the current situation, looked up in a win expectancy table.
+        :param table: simulation.win_expectancy.WinExpectancyTable.
+        """
+        return table.get_home_win_probability(self.get_snapshot())
+
+    def emit(self, event_type: EventType, player: Player = None, detail=None) -> None:
+        self.events.emit(GameEvent(event_type, self.half_inning, player, detail))
+
+    def play_game(self) -> TeamSide:
+        """
+        Plays the whole game, updating player, team and game stats.
+        :return: Side of the winning team.
+        """
+        # STATS #
+        batting_orders = [self.away_team.get_batting_order(), self.home_team.get_batting_order()]
+        for team, batting_order in zip([self.away_team, self.home_team], batting_orders):
+            team.get_player_at_field_position_in_lineup('P').stats.pitching.games_pitched_in += 1
+            for batter in batting_order:
+                batter.stats.batting.games_played += 1
+
+        if self.events.enabled:
+            self.emit(EventType.GAME_START, None, (self.away_team.__repr__(), self.home_team.__repr__()))  # records before this game
+
+        # inning loop #
+        while self.should_continue_playing:
+            self.play_half_inning(batting_orders[self.half_inning % 2])
+
+            # should simulation end? #
+            if self.half_inning < REGULATION_HALF_INNINGS - 2:  # all the way to bot 8th
+                self.should_continue_playing = True
+            elif self.half_inning % 2 == TeamSide.AWAY_TEAM.value:  # top of the 9th or later
+                self.should_continue_playing = self.game_runs[TeamSide.AWAY_TEAM.value] >= self.game_runs[TeamSide.HOME_TEAM.value]
+            else:  # bottom of the 9th or later
+                self.should_continue_playing = self.game_runs[TeamSide.AWAY_TEAM.value] == self.game_runs[TeamSide.HOME_TEAM.value]
+            self.half_inning += 1
+
+        return self.finish_game()
+
+    def play_half_inning(self, batting_order: list) -> None:
+        # inning attributes #
+        batting_side = self.half_inning % 2
+        if batting_side == TeamSide.AWAY_TEAM.value:
+            self.fielding_team = self.home_team
+            self.batting_team = self.away_team
+        else:
+            self.fielding_team = self.away_team
+            self.batting_team = self.home_team
+        pitcher: Player = self.fielding_team.get_player_at_field_position_in_lineup('P')
+        state = BaseOutState()
+        self.base_out_state = state
+        runs_this_inning = 0
+
+        if self.half_inning >= REGULATION_HALF_INNINGS:  # extra innings start with the last batter of the previous inning on second
+            state.put_runner(SECOND_BASE, (self.batter_on_plate[batting_side] - 1) % len(batting_order))
+
+        if self.events.enabled:
+            self.emit(EventType.HALF_INNING_START, None, tuple(self.game_runs))
+
+        while state.outs < 3 and not self.is_walk_off():
+            runs = self.play_plate_appearance(pitcher, batting_order, state)
+            runs_this_inning += runs
+            self.game_runs[batting_side] += runs
+            if self.events.enabled:  # the situation now, for win probability when the events are played back later
+                self.emit(EventType.PLATE_APPEARANCE_END, None, self.get_snapshot())
+
+        # populate scoring data for inning #
+        self.inning_runs[batting_side].append(runs_this_inning)
+        pitcher.stats.pitching.runs_allowed += runs_this_inning
+        pitcher.stats.pitching.innings_pitched += 1
+
+    def is_walk_off(self) -> bool:
+        return self.half_inning >= REGULATION_HALF_INNINGS - 1 and self.half_inning % 2 == TeamSide.HOME_TEAM.value and self.game_runs[TeamSide.HOME_TEAM.value] > self.game_runs[TeamSide.AWAY_TEAM.value]
+
+    def play_plate_appearance(self, pitcher: Player, batting_order: list, state: BaseOutState) -> int:
+        """
+        Plays one batter against the current pitcher and applies the result to the base-out state.
+        :return: Runs scored on the play.
+        """
+        batting_side = self.half_inning % 2
+        batter_index = self.batter_on_plate[batting_side]
+        batter: Player = batting_order[batter_index]
+        self.batter_on_plate[batting_side] = (batter_index + 1) % len(batting_order)
+
+        outcome, pitches, contact_strength = self.play_at_bat(pitcher, batter)
+
+        # STATS #
+        batter.stats.batting.plate_appearances += 1
+        pitcher.stats.pitching.batters_faced += 1
+        pitcher.stats.pitching.pitches += pitches
+        self.pitch_totals[1 - batting_side] += pitches  # pitches thrown by each side
+
+        if outcome == BattingOutcome.STRIKEOUT_SWINGING:
+            batter.stats.batting.strikeouts += 1
+            batter.stats.batting.at_bats += 1
+            batter.stats.batting.left_on_base += state.count_runners()
+            state.outs += 1
+            return 0
+
+        if outcome == BattingOutcome.WALK or outcome == BattingOutcome.HIT_BY_PITCH:
+            if outcome == BattingOutcome.WALK:
+                batter.stats.batting.walks += 1
+            else:
+                batter.stats.batting.hit_by_pitch += 1
+                pitcher.stats.pitching.hit_by_pitches += 1
+            return self.score_runners(state.advance(Advancement.WALK, batter_index), batter, batting_order)
+
+        # ball in play #
+        launch_angle, exit_velocity, direction = calculate_hit_trajectory(pitcher, batter, contact_strength, self.random_source)
+        distance_of_ball, time_in_air = calculate_hit_distance_and_time(launch_angle, exit_velocity, batter.height_inches / 2)
+        hit_result, forceout_probability, closest_fielder = self.calculate_fielding_outcome(distance_of_ball, direction, time_in_air, launch_angle, self.fielding_team, self.stadium)
+
+        batter.stats.batting.at_bats += 1
+        batter.stats.batting.batted_balls += 1
+        batter.stats.batting.launch_angle.append(launch_angle)
+        batter.stats.batting.exit_velocity.append(exit_velocity)
+        batter.stats.batting.direction.append(direction)
+        batter.stats.batting.batted_ball_outcome.append(hit_result.value)
+        pitcher.stats.pitching.launch_angle_against.append(launch_angle)
+        pitcher.stats.pitching.exit_velocity_against.append(exit_velocity)
+        pitcher.stats.pitching.direction_against.append(direction)
+        pitcher.stats.pitching.batted_ball_outcome_against.append(hit_result.value)
+
+        advancement = BATTED_BALL_ADVANCEMENT.get(hit_result, Advancement.OUT)
+        if advancement == Advancement.OUT:
+            if hit_result == BattedBallOutcome.POPOUT:
+                batter.stats.batting.out_popout += 1
+            elif hit_result == BattedBallOutcome.LINEOUT:
+                batter.stats.batting.out_lineout += 1
+            elif hit_result == BattedBallOutcome.FLYOUT:
+                batter.stats.batting.out_flyout += 1
+            batter.stats.batting.left_on_base += state.count_runners()
+            if self.events.enabled:
+                self.emit(EventType.OUT, batter, hit_result)
+        else:
+            self.game_hits[batting_side] += 1
+            batter.stats.batting.hits += 1
+            pitcher.stats.pitching.hits_allowed += 1
+            if advancement == Advancement.SINGLE:
+                batter.stats.batting.singles += 1
+                pitcher.stats.pitching.singles_allowed += 1
+            elif advancement == Advancement.DOUBLE_ALL_SCORE:
+                batter.stats.batting.doubles += 1
+                pitcher.stats.pitching.extra_base_hits_allowed += 1
+                if self.random_source.next_uniform() >= DOUBLE_ALL_SCORE_CHANCE:
+                    advancement = Advancement.DOUBLE_TRAILER_HOLDS
+            elif advancement == Advancement.TRIPLE:
+                batter.stats.batting.triples += 1
+                pitcher.stats.pitching.extra_base_hits_allowed += 1
+            elif advancement == Advancement.HOMERUN:
+                batter.stats.batting.home_runs += 1
+                pitcher.stats.pitching.home_runs_allowed += 1
+                self.home_runs.append((batter, distance_of_ball, direction, exit_velocity, launch_angle, self.half_inning))
+            if self.events.enabled:
+                self.emit(EventType.HIT, batter, hit_result)
+
+        # forceout? the lead runner is thrown out before anyone advances #
+        if state.count_runners() > 0 and forceout_probability > FORCEOUT_THRESHOLD[hit_result.value - 1]:
+            forced_runner = state.force_out_lead_runner()
+            if self.events.enabled:
+                self.emit(EventType.FORCEOUT, batting_order[forced_runner])
+            if state.outs + (advancement == Advancement.OUT) >= 3:
+                state.outs = 3
+                return 0
+
+        return self.score_runners(state.advance(advancement, batter_index), batter, batting_order)
+
+    def score_runners(self, scored: list, batter: Player, batting_order: list) -> int:
+        for runner_index in scored:
+            batting_order[runner_index].stats.batting.runs += 1
+            if self.events.enabled:
+                self.emit(EventType.RUN_SCORED, batting_order[runner_index])
+        batter.stats.batting.runs_batted_in += len(scored)
+        return len(scored)
+
+    def finish_game(self) -> TeamSide:
+        away_runs = self.game_runs[TeamSide.AWAY_TEAM.value]
+        home_runs = self.game_runs[TeamSide.HOME_TEAM.value]
+        if away_runs == 0:
+            self.home_team.get_player_at_field_position_in_lineup('P').stats.pitching.shutouts += 1
+        if home_runs == 0:
+            self.away_team.get_player_at_field_position_in_lineup('P').stats.pitching.shutouts += 1
+
+        self.away_team.stats.runs_scored += away_runs
+        self.away_team.stats.runs_against += home_runs
+        self.home_team.stats.runs_scored += home_runs
+        self.home_team.stats.runs_against += away_runs
+        for team in [self.away_team, self.home_team]:  # only the lineup's stats changed
+            team.mark_changed([team.get_player_by_name(player_name) for player_name in team.game_lineup.values()])
+
+        if self.events.enabled:
+            self.emit(EventType.GAME_END, None, (away_runs, home_runs))
+
+        if away_runs > home_runs:
+            self.away_team.stats.wins += 1
+            self.home_team.stats.losses += 1
+            return TeamSide.AWAY_TEAM
+        self.home_team.stats.wins += 1
+        self.away_team.stats.losses += 1
+        return TeamSide.HOME_TEAM
+
+    def get_fielding_alignment(self, fielding_team: Team) -> FieldingAlignment:
+        if fielding_team is self.away_team:
+            return self.fielding_alignments[TeamSide.AWAY_TEAM.value]
+        return self.fielding_alignments[TeamSide.HOME_TEAM.value]
+
+    def get_catch_probability(self, distance_of_ball: float, direction: float, fielder_position: int, fielding_team: Team, is_outfield: bool, distance_from_fielder: float = None) -> (float, float):
         # TODO- redo all this logic to detect which positions this passes by (i.e. lineout to infield vs ground to outfield)
-        distance_from_fielder = get_polar_distance(distance_of_ball, FIELDER_POSITIONS[fielder_position - 1][0], direction, FIELDER_POSITIONS[fielder_position - 1][1])
+        if distance_from_fielder is None:
+            distance_from_fielder = self.get_fielding_alignment(fielding_team).get_fielder_distance(fielder_position, distance_of_ball, direction)
         fielder: Player = fielding_team.get_player_at_field_position_in_lineup(fielder_position)
 
         # Calculate Fielder Reach #
@@ -257,7 +536,7 @@ class Game:
         else:  # probably because they have less time to react
             range_mean = 3 * (fielder.consistency + fielder.speed) + 5
             range_std = 2 * (1 - fielder.consistency)
-        max_range = np.max([0, np.random.normal(range_mean, range_std, 1)[0]])
+        max_range = max(0, self.random_source.next_normal(range_mean, range_std))
 
         # Calculating Range Deficit (units are in feet) #
         fielder_distance = np.max([0, distance_from_fielder - max_range])
@@ -265,13 +544,15 @@ class Game:
         range_deficit /= fielder.height_inches / 12  # shifts to: -0.5 is in range, 0 is at half of reach, 0.5 is full extension
 
         # Catching Probability #
-        catch_probability = np.random.normal(range_deficit, 0.5 * (1 - fielder.consistency), 1)[0]
+        catch_probability = self.random_source.next_normal(range_deficit, 0.5 * (1 - fielder.consistency))
         # negative is catch, positive is miss. consistency of 1 means if it's within half reach they will ALWAYS get it.
         if np.sign(catch_probability) > 0 and range_deficit < 0:  # they didn't catch it, but it was catchable!
-            if self.real_time_reporting:
-                display_text(fielder.last_name + ' makes an error fielding the ball!')
+            if self.events.enabled:
+                self.emit(EventType.ERROR, fielder)
             fielder.stats.fielding.errors += 1
-            self.game_errors[self.half_inning % 2] += 1
+            self.game_errors[1 - self.half_inning % 2] += 1  # charged to the fielding side
+        elif np.sign(catch_probability) <= 0 and self.events.enabled:
+            self.emit(EventType.CATCH, fielder)
         return catch_probability, fielder_distance
 
     def calculate_fielding_outcome(self, distance_of_ball: float, direction: float, time_in_air: float, launch_angle: float, fielding_team: Team, stadium: Stadium) -> (BattedBallOutcome, float, FieldPosition):
@@ -281,16 +562,12 @@ class Game:
             return BattedBallOutcome.HOMERUN, 0, None
         if distance_of_ball > 160:  # infield/outfield boundary, feet
             # Finding the closest fielder #
-            if direction < 33:  # left field
-                closest_fielder = FieldPosition.LEFT_FIELDER
-            elif 33 <= direction <= 66:  # center field
-                closest_fielder = FieldPosition.CENTER_FIELDER
-            else:  # right field
-                closest_fielder = FieldPosition.RIGHT_FIELDER
+            closest_position, distance_from_fielder = self.get_fielding_alignment(fielding_team).get_nearest_fielder(distance_of_ball, direction, OUTFIELD_POSITIONS)
+            closest_fielder = FieldPosition(closest_position)
 
             # Fielder Play Simulation #
             fielder: Player = fielding_team.get_player_at_field_position_in_lineup(closest_fielder.value)
-            catch_probability, fielder_distance = self.get_catch_probability(distance_of_ball, direction, closest_fielder.value, fielding_team, True)
+            catch_probability, fielder_distance = self.get_catch_probability(distance_of_ball, direction, closest_fielder.value, fielding_team, True, distance_from_fielder)
             fielder_play_skill = fielder.throwing_power * fielder.crit_thinking_fielding
 
             # Catch logic #
@@ -306,22 +583,16 @@ class Game:
         elif 50 < distance_of_ball < 160:  # infield, feet
             # figuring out if it is a popout #
             popout_catch_chance = np.interp(time_in_air, [2, 3, 4, 6], [0, 0.5, 0.7, 1])  # seconds, chance.
-            if np.random.random() > (1 - popout_catch_chance):  # it's a popout!
+            if self.random_source.next_uniform() > (1 - popout_catch_chance):  # it's a popout!
                 return BattedBallOutcome.POPOUT, 0, None
 
             # otherwise... find the closest fielder #
-            if direction < 22.5:  # 3B
-                closest_fielder = FieldPosition.THIRD_BASEMAN
-            elif 22.5 <= direction <= 45:  # SS (has a litttle more range so has the =s)
-                closest_fielder = FieldPosition.SHORTSTOP
-            elif 45 < direction <= 67.5:  # 2B (little more right range so has one =)
-                closest_fielder = FieldPosition.SECOND_BASEMAN
-            else:  # 1B
-                closest_fielder = FieldPosition.FIRST_BASEMAN
+            closest_position, distance_from_fielder = self.get_fielding_alignment(fielding_team).get_nearest_fielder(distance_of_ball, direction, INFIELD_POSITIONS)
+            closest_fielder = FieldPosition(closest_position)
 
             # Fielder Play Simulation #
             fielder: Player = fielding_team.get_player_at_field_position_in_lineup(closest_fielder.value)
-            catch_probability, fielder_distance = self.get_catch_probability(distance_of_ball, direction, closest_fielder.value, fielding_team, False)
+            catch_probability, fielder_distance = self.get_catch_probability(distance_of_ball, direction, closest_fielder.value, fielding_team, False, distance_from_fielder)
             fielder_play_skill = fielder.throwing_power * fielder.crit_thinking_fielding
 
             # Catch logic #
@@ -329,17 +600,18 @@ class Game:
                 return BattedBallOutcome.LINEOUT, fielder_play_skill, closest_fielder
             else:  # not caught.
                 # TODO- TEMPORARY GROUND BALLS
-                if np.random.random() > 0.5:  # ground ball
+                if self.random_source.next_uniform() > 0.5:  # ground ball
                     return BattedBallOutcome.GROUND_OUT, fielder_play_skill, closest_fielder
                 else:  # single
                     return BattedBallOutcome.INFIELD_SINGLE, 0, None
         else:  # catcher/pitcher fielding
             pitcher = fielding_team.get_player_at_field_position_in_lineup('P')
             catcher = fielding_team.get_player_at_field_position_in_lineup('C')
-            if np.random.random() < (pitcher.consistency + catcher.consistency) / 2:  # average of fielding ability
+            if self.random_source.next_uniform() < (pitcher.consistency + catcher.consistency) / 2:  # average of fielding ability
+                battery_fielder = [FieldPosition.CATCHER, FieldPosition.PITCHER][self.random_source.next_integer(2)]
                 if launch_angle > 0:  # "pop up"
-                    return BattedBallOutcome.POPOUT, 0, random.choice([FieldPosition.CATCHER, FieldPosition.PITCHER])
+                    return BattedBallOutcome.POPOUT, 0, battery_fielder
                 else:  # topped the ball
-                    return BattedBallOutcome.GROUND_OUT, 0, random.choice([FieldPosition.CATCHER, FieldPosition.PITCHER])
+                    return BattedBallOutcome.GROUND_OUT, 0, battery_fielder
             else:  # they don't make it in time :(
                 return BattedBallOutcome.INFIELD_SINGLE, 0, None
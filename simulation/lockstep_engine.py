@@ -0,0 +1,180 @@
+import numpy as np
+
+from data.rng import resolve_generator
+from simulation.base_out import Advancement, BASE_MASKS, DOUBLE_ALL_SCORE_CHANCE, NEW_BASES, OUTS_MADE, RUNS_SCORED, SECOND_BASE, get_lead_runner_base
+from simulation.batch_simulation import BATTER_AT_BAT_ATTRIBUTES, BATTER_BATTED_BALL_ATTRIBUTES, PITCHER_AT_BAT_ATTRIBUTES, calculate_fielding_outcomes, get_attribute_arrays, get_defense_arrays, get_wall_table_stack, simulate_at_bats, simulate_batted_balls
+from simulation.fielding import FieldingAlignment
+from simulation.game_simulation import BATTED_BALL_ADVANCEMENT, FORCEOUT_THRESHOLD, REGULATION_HALF_INNINGS, BattedBallOutcome, BattingOutcome, TeamSide
+
+LINEUP_SIZE = 9
+
+
+def build_outcome_tables() -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    :return: Advancement value and forceout threshold per BattedBallOutcome value, and the occupancy mask left after
+    the lead runner of each mask is forced out.
+    """
+    outcome_advancement = np.full(max(outcome.value for outcome in BattedBallOutcome) + 1, Advancement.OUT.value, dtype=np.int8)
+    for outcome, advancement in BATTED_BALL_ADVANCEMENT.items():
+        outcome_advancement[outcome.value] = advancement.value
+    forceout_thresholds = np.array([1] + FORCEOUT_THRESHOLD, dtype=float)
+    lead_runner_forced = np.array([bases & ~(1 << get_lead_runner_base(bases)) if bases else 0 for bases in range(BASE_MASKS)], dtype=np.int8)
+    return outcome_advancement, forceout_thresholds, lead_runner_forced
+
+
+OUTCOME_ADVANCEMENT, FORCEOUT_THRESHOLDS, LEAD_RUNNER_FORCED = build_outcome_tables()
+
+
+class LockstepGames:
+    """
+    N independent games advanced together: every step plays one plate appearance in each unfinished game with the
+    batched at-bat, batted-ball and fielding functions, then applies the base-out transition tables. Follows the
+    rules of Game.play_game (walk-offs, skipped bottom halves, runner on second in extra innings) but keeps no player
+    stats or narration, for season projections and bracket odds.
+    """
+
+    def __init__(self, teams: list, away_indices, home_indices, rng: np.random.Generator = None, alignment: FieldingAlignment = None, final_half_inning=None):
+        """
+        :param teams: Teams taking part, with their current game lineups.
+        :param away_indices: Index into teams of the away side of each game.
+        :param home_indices: Index into teams of the home side of each game (and of the park).
+        :param rng: Random generator shared by every game.
+        :param alignment: Where fielders stand (no shift if None).
+        :param final_half_inning: Half inning (per game or for all) after which games stop whatever the score, with no
+        walk-offs or extra innings. None plays complete games.
+        """
+        self.rng = resolve_generator(rng)
+        self.alignment = alignment
+
+        # per team attribute arrays #
+        batters = [batter for team in teams for batter in team.get_batting_order()]
+        self.batters = {name: values.reshape(len(teams), LINEUP_SIZE) for name, values in get_attribute_arrays(batters, BATTER_AT_BAT_ATTRIBUTES + BATTER_BATTED_BALL_ATTRIBUTES).items()}
+        self.pitchers = get_attribute_arrays([team.get_player_at_field_position_in_lineup('P') for team in teams], PITCHER_AT_BAT_ATTRIBUTES)
+        self.defense = get_defense_arrays(teams)
+        self.wall_tables = get_wall_table_stack([team.home_stadium for team in teams])
+
+        # per game state #
+        self.away = np.asarray(away_indices, dtype=int)
+        self.home = np.asarray(home_indices, dtype=int)
+        total_games = len(self.away)
+        self.half_inning = np.zeros(total_games, dtype=int)
+        self.outs = np.zeros(total_games, dtype=np.int8)
+        self.bases = np.zeros(total_games, dtype=np.int8)
+        self.game_runs = np.zeros((total_games, 2), dtype=int)
+        self.batter_on_plate = np.zeros((total_games, 2), dtype=int)
+        self.finished = np.zeros(total_games, dtype=bool)
+        self.final_half_inning = None if final_half_inning is None else np.broadcast_to(final_half_inning, total_games)
+
+    def __len__(self):
+        return len(self.away)
+
+    def set_state(self, half_inning=0, outs=0, bases=0, game_runs=(0, 0), batter_on_plate=(0, 0)) -> None:
+        """
+        Starts the games from a given situation instead of the first pitch. Each value is either shared by every game
+        or an array with one entry (row for the pairs) per game.
+        :param bases: Occupancy mask.
+        :param game_runs: [away, home] runs.
+        :param batter_on_plate: [away, home] batting order slot due up.
+        """
+        self.half_inning[:] = half_inning
+        self.outs[:] = outs
+        self.bases[:] = bases
+        self.game_runs[:] = game_runs
+        self.batter_on_plate[:] = batter_on_plate
+
+    def play(self) -> np.ndarray:
+        """
+        Plays every game to the end.
+        :return: Winning TeamSide value of each game.
+        """
+        active = np.flatnonzero(~self.finished)
+        while len(active) > 0:
+            self.play_plate_appearances(active)
+            self.finish_half_innings(active)
+            active = active[~self.finished[active]]
+        return self.get_winners()
+
+    def play_plate_appearances(self, games: np.ndarray) -> None:
+        """
+        One plate appearance in each of the given games.
+        """
+        batting_side = self.half_inning[games] % 2
+        is_away_batting = batting_side == TeamSide.AWAY_TEAM.value
+        batting_team = np.where(is_away_batting, self.away[games], self.home[games])
+        fielding_team = np.where(is_away_batting, self.home[games], self.away[games])
+        slot = self.batter_on_plate[games, batting_side]
+        self.batter_on_plate[games, batting_side] = (slot + 1) % LINEUP_SIZE
+
+        pitchers = {name: values[fielding_team] for name, values in self.pitchers.items()}
+        batters = {name: values[batting_team, slot] for name, values in self.batters.items()}
+        outcomes, _, disparity, _, _ = simulate_at_bats(pitchers, batters, self.rng)
+
+        advancement = np.full(len(games), Advancement.OUT.value, dtype=np.int8)  # strikeouts included
+        advancement[(outcomes == BattingOutcome.WALK.value) | (outcomes == BattingOutcome.HIT_BY_PITCH.value)] = Advancement.WALK.value
+        is_forced = np.zeros(len(games), dtype=bool)
+
+        # balls in play #
+        contact = np.flatnonzero(outcomes == BattingOutcome.BATTER_CONTACT.value)
+        if len(contact) > 0:
+            launch_angle, _, direction, distance, time_in_air = simulate_batted_balls({'throwing_power': pitchers['throwing_power'][contact]}, {name: batters[name][contact] for name in BATTER_BATTED_BALL_ATTRIBUTES}, disparity[contact], self.rng)
+            hit_results, play_skill, _, _ = calculate_fielding_outcomes(distance, direction, time_in_air, launch_angle, self.defense, fielding_team[contact], self.wall_tables, self.home[games][contact], self.alignment, self.rng)
+            contact_advancement = OUTCOME_ADVANCEMENT[hit_results]
+            trailer_holds = (contact_advancement == Advancement.DOUBLE_ALL_SCORE.value) & (self.rng.random(len(contact)) >= DOUBLE_ALL_SCORE_CHANCE)
+            contact_advancement[trailer_holds] = Advancement.DOUBLE_TRAILER_HOLDS.value
+            advancement[contact] = contact_advancement
+            is_forced[contact] = play_skill > FORCEOUT_THRESHOLDS[hit_results]
+
+        # forceout? the lead runner is thrown out before anyone advances #
+        bases = self.bases[games]
+        is_forced &= bases != 0
+        bases = np.where(is_forced, LEAD_RUNNER_FORCED[bases], bases)
+        outs = self.outs[games] + is_forced
+        is_inning_ended = is_forced & (outs + (advancement == Advancement.OUT.value) >= 3)  # nobody scores or moves
+
+        self.game_runs[games, batting_side] += np.where(is_inning_ended, 0, RUNS_SCORED[advancement, bases])
+        self.outs[games] = np.where(is_inning_ended, 3, outs + OUTS_MADE[advancement, bases])
+        self.bases[games] = NEW_BASES[advancement, bases]
+
+    def finish_half_innings(self, games: np.ndarray) -> None:
+        """
+        Ends walk-offs and completed half innings, moving on to the next half inning or ending the game.
+        """
+        half_inning = self.half_inning[games]
+        away_runs = self.game_runs[games, TeamSide.AWAY_TEAM.value]
+        home_runs = self.game_runs[games, TeamSide.HOME_TEAM.value]
+        is_bottom = half_inning % 2 == TeamSide.HOME_TEAM.value
+        is_walk_off = (half_inning >= REGULATION_HALF_INNINGS - 1) & is_bottom & (home_runs > away_runs)
+
+        # should simulation end? (same rule as Game.play_game) #
+        is_half_over = self.outs[games] >= 3
+        if self.final_half_inning is None:
+            should_continue = (half_inning < REGULATION_HALF_INNINGS - 2) | np.where(is_bottom, away_runs == home_runs, away_runs >= home_runs)
+        else:
+            is_walk_off[:] = False
+            should_continue = half_inning < self.final_half_inning[games]
+        self.finished[games] = is_walk_off | (is_half_over & ~should_continue)
+
+        # next half inning, extra innings start with a runner on second #
+        next_half = games[is_half_over & should_continue & ~is_walk_off]
+        self.half_inning[next_half] += 1
+        self.outs[next_half] = 0
+        self.bases[next_half] = np.where(self.half_inning[next_half] >= REGULATION_HALF_INNINGS, 1 << SECOND_BASE, 0)
+
+    def get_winners(self) -> np.ndarray:
+        return np.where(self.game_runs[:, TeamSide.AWAY_TEAM.value] > self.game_runs[:, TeamSide.HOME_TEAM.value], TeamSide.AWAY_TEAM.value, TeamSide.HOME_TEAM.value)
+
+    def get_records(self, team_count: int) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+        """
+        Totals of the finished games per team.
+        :return: Arrays of wins, losses, runs scored and runs against, indexed like teams.
+        """
+        winners = self.get_winners()
+        winning_team = np.where(winners == TeamSide.AWAY_TEAM.value, self.away, self.home)
+        losing_team = np.where(winners == TeamSide.AWAY_TEAM.value, self.home, self.away)
+        away_runs = self.game_runs[:, TeamSide.AWAY_TEAM.value]
+        home_runs = self.game_runs[:, TeamSide.HOME_TEAM.value]
+        wins = np.bincount(winning_team, minlength=team_count)
+        losses = np.bincount(losing_team, minlength=team_count)
+        runs_scored = np.bincount(self.away, away_runs, team_count) + np.bincount(self.home, home_runs, team_count)
+        runs_against = np.bincount(self.away, home_runs, team_count) + np.bincount(self.home, away_runs, team_count)
+        return wins, losses, runs_scored.astype(int), runs_against.astype(int)
@@ -0,0 +1,340 @@
+from enum import Enum
+
+import numpy as np
+
+from data.player import Player
+from data.rng import resolve_generator
+from data.stadium import Stadium
+from data.team import Team
+from simulation.base_out import Advancement, BaseOutState, BASE_MASKS, SECOND_BASE, DOUBLE_ALL_SCORE_CHANCE
+from simulation.batch_simulation import BATTER_BATTED_BALL_ATTRIBUTES, calculate_fielding_outcomes, get_attribute_arrays, get_defense_arrays, simulate_batted_balls
+from simulation.fielding import DEFAULT_ALIGNMENT, FieldingAlignment
+from simulation.game_simulation import BATTED_BALL_ADVANCEMENT, FORCEOUT_THRESHOLD, BattedBallOutcome, BattingOutcome, Game, TeamSide
+from simulation.matchup_cache import MatchupCache
+
+# The 24 base-out states are numbered outs * BASE_MASKS + bases, the third out is one absorbing state. #
+BASE_OUT_STATES = 3 * BASE_MASKS
+INNING_OVER = BASE_OUT_STATES
+LINEUP_SIZE = 9
+REGULATION_INNINGS = 9
+
+MARKOV_CONTACT_SAMPLES = 4096  # batted balls simulated per matchup to estimate its hit/out mix
+INNING_RUN_POINTS = 32  # run totals 0-31 per half inning (transform size, more than that in an inning is never seen)
+MAX_RUNS_PER_PLAY = 4
+
+# Every way a plate appearance can change the base-out state: an advancement, with or without the lead runner forced out first. #
+EVENTS = [(advancement, forced) for advancement in Advancement for forced in (False, True)]
+
+
+class SimulationEngine(Enum):
+    MONTE_CARLO = 0  # Game, pitch by pitch with full stats
+    MARKOV = 1  # MarkovGame, analytical run distributions
+
+
+def get_state_index(bases: int, outs: int) -> int:
+    return outs * BASE_MASKS + bases
+
+
+def get_event_index(advancement: Advancement, forced: bool) -> int:
+    return advancement.value * 2 + int(forced)
+
+
+def build_event_tables() -> (np.ndarray, np.ndarray):
+    """
+    Plays every event from every base-out state with the same BaseOutState rules as Game.play_plate_appearance.
+    :return: Arrays indexed [event, state] of the next state (INNING_OVER after the third out) and the runs scored.
+    """
+    next_states = np.zeros((len(EVENTS), BASE_OUT_STATES), dtype=np.int8)
+    runs_scored = np.zeros((len(EVENTS), BASE_OUT_STATES), dtype=np.int8)
+    for event_index, (advancement, forced) in enumerate(EVENTS):
+        for outs in range(3):
+            for bases in range(BASE_MASKS):
+                state = BaseOutState()
+                state.bases = bases
+                state.outs = outs
+                state_index = get_state_index(bases, outs)
+                if forced and state.count_runners() > 0:
+                    state.force_out_lead_runner()
+                    if state.outs + (advancement == Advancement.OUT) >= 3:
+                        next_states[event_index, state_index] = INNING_OVER
+                        continue
+                runs_scored[event_index, state_index] = len(state.advance(advancement, 0))
+                next_states[event_index, state_index] = INNING_OVER if state.outs >= 3 else get_state_index(state.bases, state.outs)
+    return next_states, runs_scored
+
+
+EVENT_NEXT_STATE, EVENT_RUNS = build_event_tables()
+
+# indicator[event, state, next state, runs], so a lineup's transitions are one einsum away #
+EVENT_TRANSITIONS = np.zeros((len(EVENTS), BASE_OUT_STATES, BASE_OUT_STATES + 1, MAX_RUNS_PER_PLAY + 1))
+EVENT_TRANSITIONS[np.arange(len(EVENTS))[:, None], np.arange(BASE_OUT_STATES)[None, :], EVENT_NEXT_STATE, EVENT_RUNS] = 1
+
+
+def get_plate_appearance_probabilities(pitcher: Player, batter: Player, defense: dict, stadium: Stadium, matchup_cache: MatchupCache, alignment: FieldingAlignment = None, contact_samples: int = MARKOV_CONTACT_SAMPLES, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Event probabilities of one batter against a pitcher and defense. The at-bat part is exact (count Markov chain of
+    the matchup), the batted-ball part is estimated from a batch of simulated balls in play.
+    :param defense: Output of get_defense_arrays for the fielding team (one row).
+    :param stadium: Park the game is played in.
+    :param matchup_cache: Where the matchup's at-bat distribution comes from.
+    :param alignment: Where the fielders stand (no shift if None).
+    :param contact_samples: Batted balls to simulate.
+    :param rng: Random generator to draw from.
+    :return: Probability of each entry of EVENTS.
+    """
+    rng = resolve_generator(rng)
+    distribution = matchup_cache.get_distribution(pitcher, batter)
+    outcome_probabilities = {outcome: 0 for outcome in BattingOutcome}
+    for probability, outcome, _, _, _ in distribution.endings:
+        outcome_probabilities[outcome] += probability
+    total = sum(outcome_probabilities.values())
+
+    probabilities = np.zeros(len(EVENTS))
+    probabilities[get_event_index(Advancement.OUT, False)] += outcome_probabilities[BattingOutcome.STRIKEOUT_SWINGING] / total
+    probabilities[get_event_index(Advancement.WALK, False)] += (outcome_probabilities[BattingOutcome.WALK] + outcome_probabilities[BattingOutcome.HIT_BY_PITCH]) / total
+    contact_probability = outcome_probabilities[BattingOutcome.BATTER_CONTACT] / total
+    if contact_probability == 0 or len(distribution.contact_disparities) == 0:
+        return probabilities
+
+    # balls in play #
+    contact_strength = rng.choice(distribution.contact_disparities, contact_samples)
+    pitchers = {'throwing_power': np.full(contact_samples, pitcher.throwing_power)}
+    batters = get_attribute_arrays([batter], BATTER_BATTED_BALL_ATTRIBUTES)
+    batters = {name: np.repeat(values, contact_samples) for name, values in batters.items()}
+    launch_angle, _, direction, distance, time_in_air = simulate_batted_balls(pitchers, batters, contact_strength, rng)
+    zeros = np.zeros(contact_samples, dtype=int)
+    outcomes, play_skill, _, _ = calculate_fielding_outcomes(distance, direction, time_in_air, launch_angle, defense, zeros, stadium.get_wall_table()[None, :], zeros, alignment, rng)
+
+    forceout_threshold = np.array(FORCEOUT_THRESHOLD)[outcomes - 1]
+    is_forced = play_skill > forceout_threshold
+    for outcome in BattedBallOutcome:
+        is_outcome = outcomes == outcome.value
+        if not is_outcome.any():
+            continue
+        advancement = BATTED_BALL_ADVANCEMENT.get(outcome, Advancement.OUT)
+        for forced in (False, True):
+            probability = contact_probability * np.count_nonzero(is_outcome & (is_forced == forced)) / contact_samples
+            if advancement == Advancement.DOUBLE_ALL_SCORE:  # split doubles the same way Game does
+                probabilities[get_event_index(Advancement.DOUBLE_ALL_SCORE, forced)] += probability * DOUBLE_ALL_SCORE_CHANCE
+                probabilities[get_event_index(Advancement.DOUBLE_TRAILER_HOLDS, forced)] += probability * (1 - DOUBLE_ALL_SCORE_CHANCE)
+            else:
+                probabilities[get_event_index(advancement, forced)] += probability
+    return probabilities
+
+
+def get_lineup_probabilities(batting_team: Team, fielding_team: Team, stadium: Stadium, matchup_cache: MatchupCache, alignment: FieldingAlignment = None, contact_samples: int = MARKOV_CONTACT_SAMPLES, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Event probabilities of a whole batting order (Team.game_lineup) against the other team's pitcher and defense.
+    :return: Array of shape (9, events), row is the batting order slot.
+    """
+    pitcher = fielding_team.get_player_at_field_position_in_lineup('P')
+    defense = get_defense_arrays([fielding_team])
+    return np.array([get_plate_appearance_probabilities(pitcher, batter, defense, stadium, matchup_cache, alignment, contact_samples, rng) for batter in batting_team.get_batting_order()])
+
+
+def get_lineup_transitions(lineup_probabilities: np.ndarray) -> np.ndarray:
+    """
+    :return: Array [batter, state, next state, runs] of transition probabilities for each batting order slot.
+    """
+    return np.einsum('be,esdr->bsdr', lineup_probabilities, EVENT_TRANSITIONS)
+
+
+def get_transition_matrices(lineup_probabilities: np.ndarray, run_weights: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    Builds the transient (batter, base-out state) chain of a half inning, with every play weighted by
+    run_weights[runs] so one matrix can carry either probabilities or a transform of the run count.
+    :param lineup_probabilities: Output of get_lineup_probabilities.
+    :param run_weights: Array of shape (points, MAX_RUNS_PER_PLAY + 1).
+    :return: Transient matrices of shape (points, 9 * 24, 9 * 24) and absorbing matrices of shape (points, 9 * 24, 9),
+    where the absorbing column is the batting order slot leading off the next inning.
+    """
+    weighted = np.einsum('bsdr,pr->pbsd', get_lineup_transitions(lineup_probabilities), run_weights)
+    points = len(run_weights)
+    transient = np.zeros((points, LINEUP_SIZE, BASE_OUT_STATES, LINEUP_SIZE, BASE_OUT_STATES), dtype=weighted.dtype)
+    absorbing = np.zeros((points, LINEUP_SIZE, BASE_OUT_STATES, LINEUP_SIZE), dtype=weighted.dtype)
+    for batter in range(LINEUP_SIZE):
+        next_batter = (batter + 1) % LINEUP_SIZE
+        transient[:, batter, :, next_batter, :] = weighted[:, batter, :, :INNING_OVER]
+        absorbing[:, batter, :, next_batter] = weighted[:, batter, :, INNING_OVER]
+    size = LINEUP_SIZE * BASE_OUT_STATES
+    return transient.reshape(points, size, size), absorbing.reshape(points, size, LINEUP_SIZE)
+
+
+def get_run_expectancy(lineup_probabilities: np.ndarray) -> np.ndarray:
+    """
+    Expected runs for the rest of the half inning from every base-out state (RE24), for each batter due up.
+    :return: Array of shape (9, 24) indexed [batting order slot, get_state_index(bases, outs)].
+    """
+    transitions = get_lineup_transitions(lineup_probabilities)
+    transient, _ = get_transition_matrices(lineup_probabilities, np.ones((1, MAX_RUNS_PER_PLAY + 1)))
+    expected_play_runs = np.einsum('bsdr,r->bs', transitions, np.arange(MAX_RUNS_PER_PLAY + 1)).reshape(-1)
+    run_expectancy = np.linalg.solve(np.eye(len(expected_play_runs)) - transient[0], expected_play_runs)
+    return run_expectancy.reshape(LINEUP_SIZE, BASE_OUT_STATES)
+
+
+def get_inning_run_distributions(lineup_probabilities: np.ndarray, start_bases: list = (0,)) -> np.ndarray:
+    """
+    Full run distribution of a half inning for every leadoff batter, from the chain's probability generating function:
+    it's evaluated at roots of unity with one batched linear solve, then inverted with an FFT. The run counts are real,
+    so only the first half of the roots is needed.
+    :param lineup_probabilities: Output of get_lineup_probabilities.
+    :param start_bases: Occupancy masks the inning can start with (runner on second in extra innings), solved together.
+    :return: Array [start mask, leadoff slot, next inning's leadoff slot, runs] of probabilities.
+    """
+    roots = np.exp(-2j * np.pi * np.arange(INNING_RUN_POINTS // 2 + 1) / INNING_RUN_POINTS)
+    run_weights = roots[:, None] ** np.arange(MAX_RUNS_PER_PLAY + 1)[None, :]
+    transient, absorbing = get_transition_matrices(lineup_probabilities, run_weights)
+    size = LINEUP_SIZE * BASE_OUT_STATES
+    transforms = np.linalg.solve(np.eye(size)[None, :, :] - transient, absorbing)  # (points, slot/state, next leadoff)
+
+    distributions = []
+    for bases in start_bases:
+        start_rows = np.arange(LINEUP_SIZE) * BASE_OUT_STATES + get_state_index(bases, 0)
+        inning_distribution = np.fft.irfft(transforms[:, start_rows, :], INNING_RUN_POINTS, axis=0)  # (runs, leadoff, next leadoff)
+        distributions.append(np.clip(inning_distribution, 0, None).transpose(1, 2, 0))
+    return np.array(distributions)
+
+
+def get_game_run_distribution(inning_distributions: np.ndarray, innings: int = REGULATION_INNINGS, first_batter: int = 0) -> (np.ndarray, np.ndarray):
+    """
+    Chains half innings together, carrying the batting order over from one inning to the next.
+    :param inning_distributions: Output of get_inning_run_distributions.
+    :param innings: Innings to play.
+    :param first_batter: Batting order slot leading off the first inning.
+    :return: Distribution of the total runs, and of the slot leading off the inning after the last one.
+    """
+    inning_run_points = inning_distributions.shape[2]
+    distribution = np.zeros((LINEUP_SIZE, innings * (inning_run_points - 1) + 1))  # [leadoff slot, runs so far]
+    distribution[first_batter, 0] = 1
+    for _ in range(innings):
+        next_distribution = np.zeros_like(distribution)
+        for runs in range(inning_run_points):
+            moved = inning_distributions[:, :, runs].T @ distribution
+            next_distribution[:, runs:] += moved[:, :distribution.shape[1] - runs]
+        distribution = next_distribution
+    return distribution.sum(axis=0), distribution.sum(axis=1)
+
+
+def sample_from_distribution(distribution: np.ndarray, rng: np.random.Generator) -> int:
+    return int(min(np.searchsorted(np.cumsum(distribution), rng.random() * distribution.sum(), side='right'), len(distribution) - 1))
+
+
+class TeamProjection:
+    """
+    What the Markov engine knows about one side of a game.
+    """
+
+    def __init__(self, lineup_probabilities: np.ndarray):
+        self.lineup_probabilities = lineup_probabilities
+        self.inning_distributions, self.extra_inning_distributions = get_inning_run_distributions(lineup_probabilities, [0, 1 << SECOND_BASE])
+        self.run_distribution, self.next_leadoff = get_game_run_distribution(self.inning_distributions)
+
+        # extra innings start wherever regulation left the batting order #
+        self.extra_inning_run_distribution = np.einsum('l,lnr->r', self.next_leadoff / self.next_leadoff.sum(), self.extra_inning_distributions)
+        self.expected_runs_per_inning = np.einsum('lnr,r->l', self.inning_distributions, np.arange(INNING_RUN_POINTS))  # by leadoff slot
+        self.expected_runs = float(np.dot(self.run_distribution, np.arange(len(self.run_distribution))))
+
+
+class MarkovGame:
+    """
+    Analytical alternative to Game. Instead of playing pitch by pitch it turns both lineups into base-out Markov chains
+    and solves them, so win probability and run distributions come out in milliseconds. play_game samples a final
+    score from those distributions and only updates team standings, not player stats.
+    """
+
+    def __init__(self, away_team: Team, home_team: Team, rng: np.random.Generator = None, matchup_cache: MatchupCache = None, fielding_alignments: list = None, contact_samples: int = MARKOV_CONTACT_SAMPLES):
+        self.rng = resolve_generator(rng)
+        if matchup_cache is None:
+            matchup_cache = MatchupCache()
+        self.matchup_cache = matchup_cache
+        if fielding_alignments is None:
+            fielding_alignments = [DEFAULT_ALIGNMENT, DEFAULT_ALIGNMENT]
+        self.fielding_alignments = fielding_alignments
+        self.contact_samples = contact_samples
+        self.away_team: Team = away_team
+        self.home_team: Team = home_team
+        self.stadium = home_team.home_stadium
+        self.game_runs = [0, 0]
+
+        # Set up teams #
+        self.away_team.update_lineup(self.rng)
+        self.home_team.update_lineup(self.rng)
+
+        self.projections = None
+
+    def __repr__(self):
+        return self.away_team.short_name + ' @ ' + self.home_team.short_name
+
+    def get_projections(self) -> list:
+        """
+        :return: TeamProjection of each side [away, home], solved on first use.
+        """
+        if self.projections is None:
+            away_probabilities = get_lineup_probabilities(self.away_team, self.home_team, self.stadium, self.matchup_cache, self.fielding_alignments[TeamSide.HOME_TEAM.value], self.contact_samples, self.rng)
+            home_probabilities = get_lineup_probabilities(self.home_team, self.away_team, self.stadium, self.matchup_cache, self.fielding_alignments[TeamSide.AWAY_TEAM.value], self.contact_samples, self.rng)
+            self.projections = [TeamProjection(away_probabilities), TeamProjection(home_probabilities)]
+        return self.projections
+
+    def get_expected_runs(self) -> (float, float):
+        away, home = self.get_projections()
+        return away.expected_runs, home.expected_runs
+
+    def get_win_probability(self) -> (float, float):
+        """
+        Regulation is exact (walk-offs and skipped bottom halves never change the winner). Extra innings are treated
+        as identical, independent innings with the runner on second.
+        :return: Win probability of the away and home team.
+        """
+        away, home = self.get_projections()
+        away_ahead, tied = get_lead_probabilities(away.run_distribution, home.run_distribution)
+        extra_away_ahead, extra_tied = get_lead_probabilities(away.extra_inning_run_distribution, home.extra_inning_run_distribution)
+        extra_home_ahead = 1 - extra_away_ahead - extra_tied
+        away_win_probability = away_ahead + tied * extra_away_ahead / max(extra_away_ahead + extra_home_ahead, 1e-12)
+        return away_win_probability, 1 - away_win_probability
+
+    def play_game(self) -> TeamSide:
+        """
+        Draws a final score and applies it to the team standings, like Game.finish_game.
+        :return: Side of the winning team.
+        """
+        away, home = self.get_projections()
+        self.game_runs = [sample_from_distribution(away.run_distribution, self.rng), sample_from_distribution(home.run_distribution, self.rng)]
+        while self.game_runs[TeamSide.AWAY_TEAM.value] == self.game_runs[TeamSide.HOME_TEAM.value]:
+            self.game_runs[TeamSide.AWAY_TEAM.value] += sample_from_distribution(away.extra_inning_run_distribution, self.rng)
+            self.game_runs[TeamSide.HOME_TEAM.value] += sample_from_distribution(home.extra_inning_run_distribution, self.rng)
+
+        away_runs, home_runs = self.game_runs
+        self.away_team.stats.runs_scored += away_runs
+        self.away_team.stats.runs_against += home_runs
+        self.home_team.stats.runs_scored += home_runs
+        self.home_team.stats.runs_against += away_runs
+        self.away_team.mark_changed()
+        self.home_team.mark_changed()
+        if away_runs > home_runs:
+            self.away_team.stats.wins += 1
+            self.home_team.stats.losses += 1
+            return TeamSide.AWAY_TEAM
+        self.home_team.stats.wins += 1
+        self.away_team.stats.losses += 1
+        return TeamSide.HOME_TEAM
+
+
+def get_lead_probabilities(away_distribution: np.ndarray, home_distribution: np.ndarray) -> (float, float):
+    """
+    :return: Probability that the away total is higher, and that both are equal (independent run distributions).
+    """
+    size = max(len(away_distribution), len(home_distribution))
+    away_distribution = np.pad(away_distribution, (0, size - len(away_distribution)))
+    home_distribution = np.pad(home_distribution, (0, size - len(home_distribution)))
+    home_below = np.concatenate([[0], np.cumsum(home_distribution)[:-1]])  # P(home < runs)
+    return float(np.dot(away_distribution, home_below)), float(np.dot(away_distribution, home_distribution))
+
+
+def create_game(away_team: Team, home_team: Team, engine: SimulationEngine = SimulationEngine.MONTE_CARLO, rng: np.random.Generator = None, matchup_cache: MatchupCache = None, fielding_alignments: list = None):
+    """
+    Builds a game with the chosen engine. Both kinds have play_game() -> TeamSide.
+    :return: Game or MarkovGame.
+    """
+    if engine == SimulationEngine.MARKOV:
+        return MarkovGame(away_team, home_team, rng, matchup_cache, fielding_alignments)
+    return Game(away_team, home_team, False, rng, matchup_cache=matchup_cache, fielding_alignments=fielding_alignments)
@@ -0,0 +1,150 @@
+import bisect
+from collections import OrderedDict
+from operator import itemgetter
+
+import numpy as np
+
+from data.player import RATING_INDEX, Player
+from data.rng import RandomSource
+from simulation.batch_simulation import PITCHER_AT_BAT_ATTRIBUTES, BATTER_AT_BAT_ATTRIBUTES, get_pitch_constants, resolve_pitches
+from simulation.game_simulation import BattingOutcome
+
+MATCHUP_CACHE_SIZE = 4096  # matchups kept before the least recently used is evicted
+MATCHUP_PITCH_SAMPLES = 8192  # pitches thrown to estimate a matchup's per-pitch probabilities
+
+# read a matchup key straight off the rating vectors #
+PITCHER_KEY_RATINGS = itemgetter(*[RATING_INDEX[name] for name in PITCHER_AT_BAT_ATTRIBUTES])
+BATTER_KEY_RATINGS = itemgetter(*[RATING_INDEX[name] for name in BATTER_AT_BAT_ATTRIBUTES])
+
+
+def get_matchup_key(pitcher: Player, batter: Player) -> tuple:
+    """
+    Cache key of a matchup: every attribute the at-bat model reads. A player whose attributes change simply
+    maps to a new key, so stale entries are never returned and fall out of the LRU on their own.
+    """
+    return PITCHER_KEY_RATINGS(pitcher.ratings) + BATTER_KEY_RATINGS(batter.ratings)
+
+
+def get_count_outcome_distribution(p_contact: float, p_hit_by_pitch: float, p_strike: float, p_ball: float) -> list:
+    """
+    Walks the ball/strike count Markov chain exactly. A pitch doesn't depend on the count, so the at-bat is fully
+    described by the four per-pitch probabilities.
+    :return: List of (probability, BattingOutcome, pitches, balls, strikes) for every way the at-bat can end.
+    """
+    reach = np.zeros((4, 3))  # probability of ever reaching each count (balls, strikes)
+    reach[0, 0] = 1
+    endings = []
+    for balls in range(4):
+        for strikes in range(3):
+            if balls > 0:
+                reach[balls, strikes] += reach[balls - 1, strikes] * p_ball
+            if strikes > 0:
+                reach[balls, strikes] += reach[balls, strikes - 1] * p_strike
+            count_probability = reach[balls, strikes]
+            pitches = balls + strikes + 1
+            endings.append((count_probability * p_contact, BattingOutcome.BATTER_CONTACT, pitches, balls, strikes))
+            endings.append((count_probability * p_hit_by_pitch, BattingOutcome.HIT_BY_PITCH, pitches, balls, strikes))
+            if strikes == 2:
+                endings.append((count_probability * p_strike, BattingOutcome.STRIKEOUT_SWINGING, pitches, balls, 3))
+            if balls == 3:
+                endings.append((count_probability * p_ball, BattingOutcome.WALK, pitches, 4, strikes))
+    return [ending for ending in endings if ending[0] > 0]
+
+
+class MatchupDistribution:
+    """
+    Precomputed at-bat outcome distribution for one pitcher/batter matchup.
+    """
+
+    def __init__(self, pitch_probabilities: (float, float, float, float), contact_disparities: np.ndarray):
+        """
+        :param pitch_probabilities: Per-pitch (contact, hit by pitch, strike, ball) probabilities.
+        :param contact_disparities: Swing/pitch disparities observed on contact, sampled when the at-bat ends in contact.
+        """
+        self.pitch_probabilities = pitch_probabilities
+        self.endings = get_count_outcome_distribution(*pitch_probabilities)
+        self.cumulative = list(np.cumsum([ending[0] for ending in self.endings]))
+        self.contact_disparities = contact_disparities.tolist()
+
+    def sample(self, random_source: RandomSource) -> (BattingOutcome, int, float, int, int):
+        """
+        Draws one at-bat.
+        :return: Outcome, pitch count, swing/pitch disparity (0 unless contact), final balls and strikes.
+        """
+        ending_index = bisect.bisect_right(self.cumulative, random_source.next_uniform() * self.cumulative[-1])
+        _, outcome, pitches, balls, strikes = self.endings[min(ending_index, len(self.endings) - 1)]
+        disparity = 0
+        if outcome == BattingOutcome.BATTER_CONTACT:
+            disparity = self.contact_disparities[random_source.next_integer(len(self.contact_disparities))]
+        return outcome, pitches, disparity, balls, strikes
+
+
+class MatchupCache:
+    """
+    LRU cache of MatchupDistribution keyed on pitcher/batter attributes. Stands in for simulate_at_bat when
+    pitch-by-pitch narration isn't needed: every at-bat after the first for a matchup is a single O(1) draw.
+    """
+
+    def __init__(self, max_size: int = MATCHUP_CACHE_SIZE, pitch_samples: int = MATCHUP_PITCH_SAMPLES, seed: int = 0):
+        """
+        :param max_size: Matchups kept before evicting the least recently used.
+        :param pitch_samples: Pitches thrown when estimating a new matchup.
+        :param seed: Root seed for estimation. Each matchup is estimated from a stream derived from its key, so the
+        cache content doesn't depend on the order matchups are first seen in.
+        """
+        self.max_size = max_size
+        self.pitch_samples = pitch_samples
+        self.seed = seed
+        self.distributions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.distributions)
+
+    def clear(self) -> None:
+        self.distributions.clear()
+
+    def build_distribution(self, key: tuple) -> MatchupDistribution:
+        """
+        Estimates the per-pitch probabilities of a matchup by throwing pitch_samples pitches in one batch.
+        :param key: Matchup key from get_matchup_key.
+        :return: New MatchupDistribution.
+        """
+        pitcher_count = len(PITCHER_AT_BAT_ATTRIBUTES)
+        pitchers = {name: np.array([key[i]]) for i, name in enumerate(PITCHER_AT_BAT_ATTRIBUTES)}
+        batters = {name: np.array([key[pitcher_count + i]]) for i, name in enumerate(BATTER_AT_BAT_ATTRIBUTES)}
+        key_entropy = np.array(key, dtype=np.float64).view(np.uint64).tolist()
+        rng = np.random.default_rng(np.random.SeedSequence([self.seed] + key_entropy))
+
+        is_contact, is_hit_by_pitch, is_strike, is_ball, disparity = resolve_pitches(get_pitch_constants(pitchers, batters), np.zeros(self.pitch_samples, dtype=int), rng)
+        pitch_probabilities = (is_contact.mean(), is_hit_by_pitch.mean(), is_strike.mean(), is_ball.mean())
+        return MatchupDistribution(pitch_probabilities, disparity[is_contact])
+
+    def get_distribution(self, pitcher: Player, batter: Player) -> MatchupDistribution:
+        key = get_matchup_key(pitcher, batter)
+        distribution = self.distributions.get(key)
+        if distribution is not None:
+            self.hits += 1
+            self.distributions.move_to_end(key)
+            return distribution
+
+        self.misses += 1
+        distribution = self.build_distribution(key)
+        self.distributions[key] = distribution
+        if len(self.distributions) > self.max_size:
+            self.distributions.popitem(last=False)
+        return distribution
+
+    def simulate_at_bat(self, pitcher: Player, batter: Player, random_source: RandomSource) -> (BattingOutcome, int, float):
+        """
+        Drop-in for game_simulation.simulate_at_bat (without narration), including its pitcher stat updates.
+        """
+        outcome, pitches, disparity, balls, strikes = self.get_distribution(pitcher, batter).sample(random_source)
+        pitcher.stats.pitching.balls += balls
+        pitcher.stats.pitching.strikes += strikes
+        if outcome == BattingOutcome.STRIKEOUT_SWINGING:
+            pitcher.stats.pitching.strikeouts += 1
+        elif outcome == BattingOutcome.WALK:
+            pitcher.stats.pitching.walks_given += 1
+        return outcome, pitches, disparity
@@ -0,0 +1,86 @@
+import asyncio
+import inspect
+
+from display.text_output import display_text, format_event
+from simulation.events import BufferedSink, EventType
+from simulation.game_simulation import Game, TeamSide
+from simulation.win_expectancy import WinExpectancyTable
+
+# seconds waited before each kind of event is shown, same pacing the old blocking time.sleep calls had #
+# (wind-up before every pitch, then a beat before its result) anything else follows immediately. #
+DEFAULT_DELAYS = {EventType.PITCH: 5, EventType.BALL: 3, EventType.STRIKE: 3, EventType.CONTACT: 3, EventType.HIT_BY_PITCH: 3}
+
+
+class LiveGame:
+    """
+    Live broadcast of a Game. The game is simulated instantly into its BufferedSink, then the events are rendered and
+    handed to the sinks on an asyncio schedule, so waiting between pitches never blocks other games on the same event loop.
+    """
+
+    def __init__(self, game: Game, sinks: list = None, delays: dict = None, speed: float = 1, win_expectancy: WinExpectancyTable = None):
+        """
+        :param game: Game to play (given a BufferedSink if it has no event sink).
+        :param sinks: Callables taking one line of text, plain functions or coroutines (e.g. a channel's send).
+        Defaults to display_text.
+        :param delays: EventType -> seconds, overrides DEFAULT_DELAYS.
+        :param speed: Playback speed multiplier (2 is twice as fast).
+        :param win_expectancy: Table to announce the win probability after each plate appearance with, none if None.
+        """
+        self.game = game
+        if not self.game.events.enabled:
+            self.game.events = BufferedSink()
+        if sinks is None:
+            sinks = [display_text]
+        self.sinks = sinks
+        self.delays = dict(DEFAULT_DELAYS)
+        if delays is not None:
+            self.delays.update(delays)
+        self.speed = speed
+        self.win_expectancy = win_expectancy
+
+    def __repr__(self):
+        return 'LiveGame(' + self.game.__repr__() + ')'
+
+    async def emit(self, text: str) -> None:
+        for sink in self.sinks:
+            result = sink(text)
+            if inspect.isawaitable(result):
+                await result
+
+    async def play(self) -> TeamSide:
+        """
+        Simulates the game, then plays its events back in real time.
+        :return: Side of the winning team.
+        """
+        winner = self.game.play_game()
+        loop = asyncio.get_running_loop()
+        emit_time = loop.time()
+        for event in self.game.events.consume():
+            # lines are scheduled against the start time, so slow sinks don't make the broadcast drift #
+            emit_time += self.delays.get(event.event_type, 0) / self.speed
+            wait = emit_time - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            text = format_event(event, self.game, self.win_expectancy)
+            if text is not None:
+                await self.emit(text)
+        return winner
+
+
+async def play_live_games(games: list, sinks: list = None, delays: dict = None, speed: float = 1, win_expectancy: WinExpectancyTable = None) -> list:
+    """
+    Broadcasts several games at once on the running event loop.
+    :param games: Game objects.
+    :param sinks: Sinks shared by every game (see LiveGame), or a list with one list of sinks per game.
+    :return: Side of the winning team of each game.
+    """
+    if sinks is None or len(sinks) == 0 or not isinstance(sinks[0], list):
+        sinks = [sinks] * len(games)
+    return list(await asyncio.gather(*[LiveGame(game, game_sinks, delays, speed, win_expectancy).play() for game, game_sinks in zip(games, sinks)]))
+
+
+def run_live_games(games: list, sinks: list = None, delays: dict = None, speed: float = 1, win_expectancy: WinExpectancyTable = None) -> list:
+    """
+    Blocking entry point for play_live_games, when there is no event loop running yet.
+    """
+    return asyncio.run(play_live_games(games, sinks, delays, speed, win_expectancy))
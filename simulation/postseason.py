@@ -0,0 +1,222 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+import numpy as np
+
+from data.rng import RandomContext
+from simulation.game_simulation import TeamSide
+from simulation.lockstep_engine import LockstepGames
+
+POSTSEASON_TEAMS_PER_DIVISION = 1
+POSTSEASON_BEST_OF = 5  # same format as the old one-off season
+ODDS_BATCH_SIMULATIONS = 500  # season endings simulated per task
+ODDS_ROUND_BATCHES = 8  # tasks between two stopping checks, fixed so the odds don't depend on the worker count
+ODDS_MAX_SIMULATIONS = 100000
+ODDS_CONFIDENCE_Z = 1.96  # 95% intervals
+
+# league of a worker process, set by initialize_odds_worker #
+ODDS_WORKER_LEAGUE = None
+
+
+class OddsOutcome(Enum):
+    DIVISION = 0
+    PENNANT = 1  # reached the final
+    TITLE = 2
+
+
+def get_divisions(teams: list) -> (list, list):
+    """
+    Groups teams by their division, in order of first appearance (teams without one all share the '' division).
+    :return: Division names and the team indices of each division.
+    """
+    names = []
+    divisions = []
+    for team_index, team in enumerate(teams):
+        if team.division not in names:
+            names.append(team.division)
+            divisions.append([])
+        divisions[names.index(team.division)].append(team_index)
+    return names, divisions
+
+
+class OddsLeague:
+    """
+    Everything a simulated season ending needs: the teams with their current lineups, the divisions, the records so far
+    and the games left. Sent to each worker once.
+    """
+
+    def __init__(self, teams: list, remaining_games: list, teams_per_division: int = POSTSEASON_TEAMS_PER_DIVISION, best_of: int = POSTSEASON_BEST_OF):
+        """
+        :param teams: Teams of the league (lineups already set).
+        :param remaining_games: List of (away team index, home team index) still to be played.
+        :param teams_per_division: Teams of each division reaching the bracket.
+        :param best_of: Games per postseason series (odd).
+        """
+        self.teams = teams
+        self.division_names, self.divisions = get_divisions(teams)
+        bracket_size = len(self.divisions) * teams_per_division
+        if best_of % 2 == 0:
+            raise ValueError('Postseason series must have an odd number of games! Currently ' + str(best_of) + ' games.')
+        if bracket_size & (bracket_size - 1) != 0:
+            raise ValueError('Number of advancing postseason teams must be a power of 2! Currently ' + str(bracket_size) + ' teams.')
+        if min(len(division) for division in self.divisions) < teams_per_division:
+            raise ValueError('Every division needs at least ' + str(teams_per_division) + ' teams!')
+        self.teams_per_division = teams_per_division
+        self.best_of = best_of
+        self.remaining_games = np.array(remaining_games, dtype=int).reshape(-1, 2)
+        self.wins = np.array([team.stats.wins for team in teams])
+        self.run_diffs = np.array([team.stats.run_diff() for team in teams])
+
+    def __len__(self):
+        return len(self.teams)
+
+    def simulate(self, simulations: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Plays the remaining games and the bracket a number of times.
+        :return: How often each team won its division, the pennant and the title, shape (OddsOutcome, teams).
+        """
+        team_count = len(self.teams)
+        counts = np.zeros((len(OddsOutcome), team_count), dtype=int)
+        wins = np.tile(self.wins, (simulations, 1))
+        run_diffs = np.tile(self.run_diffs, (simulations, 1))
+
+        # regular season #
+        if len(self.remaining_games) > 0:
+            away = np.tile(self.remaining_games[:, 0], simulations)
+            home = np.tile(self.remaining_games[:, 1], simulations)
+            games = LockstepGames(self.teams, away, home, rng)
+            winners = games.play()
+            offsets = np.repeat(np.arange(simulations) * team_count, len(self.remaining_games))  # row of each game
+            wins += np.bincount(offsets + np.where(winners == TeamSide.AWAY_TEAM.value, away, home), minlength=simulations * team_count).reshape(simulations, team_count)
+            margins = games.game_runs[:, TeamSide.AWAY_TEAM.value] - games.game_runs[:, TeamSide.HOME_TEAM.value]
+            run_diffs += (np.bincount(offsets + away, margins, simulations * team_count) - np.bincount(offsets + home, margins, simulations * team_count)).reshape(simulations, team_count).astype(int)
+
+        # division standings: same order as get_standings, exact ties broken at random #
+        standings_key = wins * 100 + run_diffs + rng.random(wins.shape)
+        bracket = []
+        for division in self.divisions:
+            order = np.argsort(-standings_key[:, division], axis=1)[:, :self.teams_per_division]
+            bracket.append(np.asarray(division)[order])
+        bracket = np.concatenate(bracket, axis=1)  # seeded like play_postseason_bracket: division by division
+        counts[OddsOutcome.DIVISION.value] = np.bincount(bracket[:, 0::self.teams_per_division].ravel(), minlength=team_count)
+
+        # postseason, every round of every simulation at once #
+        while bracket.shape[1] > 1:
+            if bracket.shape[1] == 2:  # the final
+                counts[OddsOutcome.PENNANT.value] = np.bincount(bracket.ravel(), minlength=team_count)
+            away = bracket[:, 0::2].ravel()
+            home = bracket[:, 1::2].ravel()
+            # all games of a series are played, whoever wins most of them is who would have clinched first #
+            games = LockstepGames(self.teams, np.repeat(away, self.best_of), np.repeat(home, self.best_of), rng)
+            away_wins = (games.play() == TeamSide.AWAY_TEAM.value).reshape(-1, self.best_of).sum(axis=1)
+            bracket = np.where(away_wins > self.best_of // 2, away, home).reshape(simulations, -1)
+        counts[OddsOutcome.TITLE.value] = np.bincount(bracket[:, 0], minlength=team_count)
+        if len(self.divisions) * self.teams_per_division == 1:  # no final to reach
+            counts[OddsOutcome.PENNANT.value] = counts[OddsOutcome.TITLE.value]
+        return counts
+
+
+# Worker Process #
+def initialize_odds_worker(league: OddsLeague) -> None:
+    global ODDS_WORKER_LEAGUE
+    ODDS_WORKER_LEAGUE = league
+
+
+def simulate_odds_batch(context: RandomContext, batch_number: int, simulations: int, league: OddsLeague = None) -> np.ndarray:
+    """
+    One batch of season endings, drawn from the batch's own keyed stream.
+    :param league: Defaults to the worker's.
+    :return: See OddsLeague.simulate.
+    """
+    if league is None:
+        league = ODDS_WORKER_LEAGUE
+    return league.simulate(simulations, context.odds_generator(batch_number))
+
+
+class PostseasonOdds:
+    """
+    Division, pennant and title odds of every team from the current standings. The rest of the schedule and the bracket
+    are simulated in batches across a process pool until every probability's confidence interval is narrower than the
+    target (or the simulation budget runs out), so nightly runs take bounded time. Batches come in rounds of fixed size,
+    so the same seed gives the same odds whatever the number of workers.
+    """
+
+    def __init__(self, teams: list, remaining_schedule: list, seed: int = None, workers: int = None, teams_per_division: int = POSTSEASON_TEAMS_PER_DIVISION, best_of: int = POSTSEASON_BEST_OF, batch_simulations: int = ODDS_BATCH_SIMULATIONS):
+        """
+        :param teams: Teams of the league, with their current records and lineups.
+        :param remaining_schedule: Days left, each a list of (away team index, home team index),
+        e.g. SeasonRunner.schedule[runner.day:].
+        :param seed: Root seed of the simulations.
+        :param workers: Worker processes, 0 simulates in this process. Defaults to the number of cores.
+        :param teams_per_division: Teams of each division reaching the bracket.
+        :param best_of: Games per postseason series (odd).
+        :param batch_simulations: Season endings per task.
+        """
+        if workers is None:
+            workers = os.cpu_count()
+        self.league = OddsLeague(teams, [game for day in remaining_schedule for game in day], teams_per_division, best_of)
+        self.context = RandomContext(seed)
+        self.workers = workers
+        self.batch_simulations = batch_simulations
+        self.counts = np.zeros((len(OddsOutcome), len(teams)), dtype=int)
+        self.simulations = 0
+        self.batches = 0
+
+    def __repr__(self):
+        return 'PostseasonOdds(' + str(self.simulations) + ' simulations, ' + str(len(self.league)) + ' teams)'
+
+    def run(self, target_width: float = None, max_simulations: int = ODDS_MAX_SIMULATIONS) -> np.ndarray:
+        """
+        Simulates season endings, carrying on from earlier calls.
+        :param target_width: Stop once every confidence interval is narrower than this. None spends the whole budget.
+        :param max_simulations: Budget, counting the simulations of earlier calls.
+        :return: Probabilities (see get_probabilities).
+        """
+        if self.workers == 0:
+            self.run_rounds(None, target_width, max_simulations)
+        else:
+            with ProcessPoolExecutor(self.workers, initializer=initialize_odds_worker, initargs=(self.league,)) as executor:
+                self.run_rounds(executor, target_width, max_simulations)
+        return self.get_probabilities()
+
+    def run_rounds(self, executor: ProcessPoolExecutor, target_width: float, max_simulations: int) -> None:
+        while self.simulations < max_simulations and not self.is_precise(target_width):
+            batch_count = min(ODDS_ROUND_BATCHES, -(-(max_simulations - self.simulations) // self.batch_simulations))
+            batch_numbers = list(range(self.batches, self.batches + batch_count))
+            if executor is None:
+                results = [simulate_odds_batch(self.context, batch_number, self.batch_simulations, self.league) for batch_number in batch_numbers]
+            else:
+                results = executor.map(simulate_odds_batch, [self.context] * batch_count, batch_numbers, [self.batch_simulations] * batch_count)
+            for counts in results:
+                self.counts += counts
+            self.simulations += batch_count * self.batch_simulations
+            self.batches += batch_count
+
+    def is_precise(self, target_width: float = None) -> bool:
+        """
+        :return: True if every confidence interval is narrower than target_width.
+        """
+        if target_width is None or self.simulations == 0:
+            return False
+        low, high = self.get_confidence_intervals()
+        return (high - low).max() < target_width
+
+    def get_probabilities(self) -> np.ndarray:
+        """
+        :return: Array of shape (OddsOutcome, teams), e.g. odds[OddsOutcome.TITLE.value][team index].
+        """
+        return self.counts / max(1, self.simulations)
+
+    def get_confidence_intervals(self, z: float = ODDS_CONFIDENCE_Z) -> (np.ndarray, np.ndarray):
+        """
+        Wilson score intervals, which stay inside [0, 1] and don't collapse for teams that never (or always) make it.
+        :param z: Normal quantile of the confidence level.
+        :return: Lower and upper bounds, shaped like get_probabilities.
+        """
+        simulations = max(1, self.simulations)
+        probabilities = self.counts / simulations
+        denominator = 1 + z ** 2 / simulations
+        center = (probabilities + z ** 2 / (2 * simulations)) / denominator
+        half_width = z * np.sqrt(probabilities * (1 - probabilities) / simulations + z ** 2 / (4 * simulations ** 2)) / denominator
+        return center - half_width, center + half_width
@@ -0,0 +1,329 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from data.player import PlayerStatistics
+from data.player_table import PlayerTable, TablePlayer
+from data.rng import RandomContext
+from data.stat_history import HistoryMode, StatHistory
+from data.team import FIELDING_POSITIONS_NUMBERS, FIELDING_POSITIONS_TEXT, Team, TeamStatistics
+from simulation.game_simulation import Game, TeamSide
+from simulation.matchup_cache import MatchupCache
+
+SEASON_SERIES_LENGTH = 4  # games between every pair of teams, half at each park
+
+# state of a worker process, created by initialize_worker #
+WORKER_MATCHUP_CACHE = None
+WORKER_LEAGUE = None
+
+
+def make_round_robin_schedule(team_count: int, series_length: int = SEASON_SERIES_LENGTH) -> list:
+    """
+    Every pair of teams meets series_length times, half at each park, and nobody plays twice in a day
+    (circle method, an odd team count gives one team the day off).
+    :return: List of days, each a list of (away team index, home team index).
+    """
+    series_length = max(2, series_length + series_length % 2)  # same limits as the old round robin
+    rotation = list(range(team_count))
+    if team_count % 2 == 1:
+        rotation.append(None)
+    days = []
+    for _ in range(len(rotation) - 1):
+        pairs = [(rotation[i], rotation[-1 - i]) for i in range(len(rotation) // 2)]
+        pairs = [pair for pair in pairs if None not in pair]
+        for game in range(series_length):
+            if game < series_length // 2:
+                days.append(list(pairs))
+            else:
+                days.append([(home, away) for away, home in pairs])
+        rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
+    return days
+
+
+def get_standings(teams: list) -> list:
+    """
+    :return: Teams sorted like the division leaderboards (wins, then run differential).
+    """
+    return sorted(teams, key=lambda team: team.stats.wins * 100 + team.stats.run_diff(), reverse=True)
+
+
+# Stat Deltas #
+def get_stat_delta(stats) -> dict:
+    """
+    Nonzero counters and non-empty histories of a stats object that started out empty.
+    """
+    return {name: value for name, value in vars(stats).items() if value}
+
+
+def merge_stat_delta(stats, delta: dict) -> None:
+    for name, value in delta.items():
+        if isinstance(value, StatHistory):
+            getattr(stats, name).merge(value)
+        else:
+            setattr(stats, name, getattr(stats, name) + value)
+
+
+def get_game_copy(team: Team) -> (Team, list):
+    """
+    Lightweight copy of a team to ship to a worker: only the lineup players, all with empty stats, so the stats
+    after the game are exactly what it added. Their histories keep every value whatever HISTORY_MODE is, so merging
+    them back adds the values one by one, in the same order as a serial game.
+    :return: Team copy and the forty-man roster index of each of its players.
+    """
+    lineup_players = [team.get_player_by_name(player_name) for player_name in team.game_lineup.values()]
+    team_copy = copy.copy(team)
+    team_copy.stats = TeamStatistics()
+    team_copy.forty_man_roster = []
+    for player in lineup_players:
+        player_copy = copy.copy(player)
+        player_copy.stats = PlayerStatistics(history_mode=HistoryMode.FULL)
+        team_copy.forty_man_roster.append(player_copy)
+    team_copy.index_roster()
+    return team_copy, [team.forty_man_roster.index(player) for player in lineup_players]
+
+
+def get_team_delta(team_copy: Team, roster_indices: list) -> (dict, list):
+    """
+    :return: Team stat delta and a list of (roster index, batting, pitching, fielding deltas) per player.
+    """
+    player_deltas = []
+    for roster_index, player in zip(roster_indices, team_copy.forty_man_roster):
+        player_deltas.append((roster_index, get_stat_delta(player.stats.batting), get_stat_delta(player.stats.pitching), get_stat_delta(player.stats.fielding)))
+    return get_stat_delta(team_copy.stats), player_deltas
+
+
+def merge_team_delta(team: Team, delta: (dict, list)) -> None:
+    team_delta, player_deltas = delta
+    merge_stat_delta(team.stats, team_delta)
+    players = []
+    for roster_index, batting, pitching, fielding in player_deltas:
+        player = team.forty_man_roster[roster_index]
+        merge_stat_delta(player.stats.batting, batting)
+        merge_stat_delta(player.stats.pitching, pitching)
+        merge_stat_delta(player.stats.fielding, fielding)
+        players.append(player)
+    team.mark_changed(players)
+
+
+class TableLeague:
+    """
+    Everything needed to rebuild a game from a few integers: the player attribute table (league-wide player index)
+    and one shell per team (name, stadium, strategy...) without players or stats.
+    """
+
+    def __init__(self, table: PlayerTable, team_shells: list, team_offsets: list):
+        """
+        :param table: Attribute table, rows are every team's forty-man roster back to back.
+        :param team_shells: Output of get_team_shell per team.
+        :param team_offsets: Table row of each team's first player.
+        """
+        self.table = table
+        self.team_shells = team_shells
+        self.team_offsets = team_offsets
+
+    @staticmethod
+    def from_teams(teams: list, shared: bool = False) -> 'TableLeague':
+        team_offsets = [0]
+        for team in teams[:-1]:
+            team_offsets.append(team_offsets[-1] + len(team.forty_man_roster))
+        table = PlayerTable.from_players([player for team in teams for player in team.forty_man_roster], shared)
+        return TableLeague(table, [get_team_shell(team) for team in teams], team_offsets)
+
+    def get_lineup_indices(self, team_index: int, team: Team) -> list:
+        """
+        :return: Table row of each lineup player, in FIELDING_POSITIONS_TEXT order.
+        """
+        return [self.team_offsets[team_index] + team.forty_man_roster.index(team.get_player_by_name(team.game_lineup[position_name])) for position_name in FIELDING_POSITIONS_TEXT]
+
+    def get_team(self, team_index: int, lineup_indices: list) -> (Team, list):
+        """
+        Rebuilds a team for one game from its lineup's table rows.
+        :return: Team and the forty-man roster index of each of its players (for get_team_delta).
+        """
+        team = copy.copy(self.team_shells[team_index])
+        team.stats = TeamStatistics()
+        team.forty_man_roster = [TablePlayer(self.table, index, position) for index, position in zip(lineup_indices, FIELDING_POSITIONS_NUMBERS)]
+        team.game_lineup = {position_name: player.full_name for position_name, player in zip(FIELDING_POSITIONS_TEXT, team.forty_man_roster)}
+        team.index_roster()
+        return team, [index - self.team_offsets[team_index] for index in lineup_indices]
+
+
+def get_team_shell(team: Team) -> Team:
+    team_shell = copy.copy(team)
+    team_shell.forty_man_roster = []
+    team_shell.game_lineup = {}
+    team_shell.stats = TeamStatistics()
+    team_shell.index_roster()
+    return team_shell
+
+
+# Worker Process #
+def initialize_worker(matchup_cache_seed: int, table_name: str = None, player_count: int = 0, team_shells: list = None, team_offsets: list = None) -> None:
+    """
+    Sets up a worker process once. With a table name it attaches to the shared PlayerTable, so later tasks only
+    need team and player indices.
+    """
+    global WORKER_MATCHUP_CACHE, WORKER_LEAGUE
+    WORKER_MATCHUP_CACHE = MatchupCache(seed=matchup_cache_seed)
+    if table_name is not None:
+        WORKER_LEAGUE = TableLeague(PlayerTable(player_count, table_name), team_shells, team_offsets)
+
+
+def play_scheduled_games(context: RandomContext, games: list) -> list:
+    """
+    Plays a share of a day's games on team copies.
+    :param context: Season RandomContext (every game draws from its own keyed stream).
+    :param games: List of (day, game number, away copy, away roster indices, home copy, home roster indices).
+    :return: List of (game number, winning TeamSide value, away delta, home delta).
+    """
+    results = []
+    for day, game_number, away_team, away_indices, home_team, home_indices in games:
+        game = Game(away_team, home_team, False, context.game_generator(day, game_number), matchup_cache=WORKER_MATCHUP_CACHE, update_lineups=False)
+        winner = game.play_game()
+        results.append((game_number, winner.value, get_team_delta(away_team, away_indices), get_team_delta(home_team, home_indices)))
+    return results
+
+
+def play_indexed_games(context: RandomContext, games: list, league: TableLeague = None, matchup_cache: MatchupCache = None) -> list:
+    """
+    Plays a share of a day's games from table rows.
+    :param context: Season RandomContext.
+    :param games: List of (day, game number, away team index, away lineup rows, home team index, home lineup rows).
+    :param league: League to rebuild the teams from, defaults to the worker's.
+    :param matchup_cache: Defaults to the worker's.
+    :return: Same as play_scheduled_games.
+    """
+    if league is None:
+        league = WORKER_LEAGUE
+    if matchup_cache is None:
+        matchup_cache = WORKER_MATCHUP_CACHE
+    results = []
+    for day, game_number, away_index, away_lineup, home_index, home_lineup in games:
+        away_team, away_indices = league.get_team(away_index, away_lineup)
+        home_team, home_indices = league.get_team(home_index, home_lineup)
+        game = Game(away_team, home_team, False, context.game_generator(day, game_number), matchup_cache=matchup_cache, update_lineups=False)
+        winner = game.play_game()
+        results.append((game_number, winner.value, get_team_delta(away_team, away_indices), get_team_delta(home_team, home_indices)))
+    return results
+
+
+class SeasonRunner:
+    """
+    Plays a round robin season day by day. Lineups are set in the parent, each day's games are split across a
+    process pool, and the workers' stat deltas are merged back in game order before the next day, so a season
+    comes out identical to serial mode (workers=0) for the same seed.
+    With shared_attributes, player attributes live in a shared-memory PlayerTable and a game is sent as a few integers.
+    Games then see float32 attributes, so compare serial and parallel runs with the same setting.
+    """
+
+    def __init__(self, teams: list, seed: int = None, series_length: int = SEASON_SERIES_LENGTH, workers: int = None, matchup_cache_seed: int = 0, shared_attributes: bool = False):
+        """
+        :param teams: Teams of the league.
+        :param seed: Root seed of the season.
+        :param series_length: Games between every pair of teams.
+        :param workers: Worker processes, 0 plays every game in this process. Defaults to the number of cores.
+        :param matchup_cache_seed: Seed of the matchup caches (shared by serial mode and every worker).
+        :param shared_attributes: Send games to workers as table rows instead of team copies.
+        """
+        if workers is None:
+            workers = os.cpu_count()
+        self.teams = teams
+        self.context = RandomContext(seed)
+        self.schedule = make_round_robin_schedule(len(teams), series_length)
+        self.workers = workers
+        self.matchup_cache_seed = matchup_cache_seed
+        self.matchup_cache = MatchupCache(seed=matchup_cache_seed)  # serial mode only
+        self.shared_attributes = shared_attributes
+        self.league = None  # TableLeague while play_season runs with shared_attributes
+        self.day = 0
+
+    def __repr__(self):
+        return 'SeasonRunner(day ' + str(self.day) + '/' + str(len(self.schedule)) + ', ' + str(len(self.teams)) + ' teams)'
+
+    def set_lineups(self, day: int) -> None:
+        for game_number, (away_index, home_index) in enumerate(self.schedule[day]):
+            rng = self.context.lineup_generator(day, game_number)
+            self.teams[away_index].update_lineup(rng)
+            self.teams[home_index].update_lineup(rng)
+
+    def play_day(self, executor: ProcessPoolExecutor = None) -> list:
+        """
+        Plays the next day of the schedule.
+        :param executor: Process pool to split the games across, None to play them here.
+        :return: Winning TeamSide of each game of the day.
+        """
+        day = self.day
+        games = self.schedule[day]
+        self.set_lineups(day)
+
+        if self.shared_attributes:
+            if self.league is None:
+                self.league = TableLeague.from_teams(self.teams)
+            tasks = []
+            for game_number, (away_index, home_index) in enumerate(games):
+                tasks.append((day, game_number, away_index, self.league.get_lineup_indices(away_index, self.teams[away_index]), home_index, self.league.get_lineup_indices(home_index, self.teams[home_index])))
+            if executor is None:
+                results = play_indexed_games(self.context, tasks, self.league, self.matchup_cache)
+            else:
+                results = self.map_tasks(executor, play_indexed_games, tasks)
+        elif executor is None:
+            winners = []
+            for game_number, (away_index, home_index) in enumerate(games):
+                game = Game(self.teams[away_index], self.teams[home_index], False, self.context.game_generator(day, game_number), matchup_cache=self.matchup_cache, update_lineups=False)
+                winners.append(game.play_game())
+            self.day += 1
+            return winners
+        else:
+            tasks = []
+            for game_number, (away_index, home_index) in enumerate(games):
+                away_copy, away_indices = get_game_copy(self.teams[away_index])
+                home_copy, home_indices = get_game_copy(self.teams[home_index])
+                tasks.append((day, game_number, away_copy, away_indices, home_copy, home_indices))
+            results = self.map_tasks(executor, play_scheduled_games, tasks)
+
+        # merged in game order whatever order the workers finish in #
+        winners = []
+        for game_number, winner, away_delta, home_delta in sorted(results, key=lambda result: result[0]):
+            away_index, home_index = games[game_number]
+            merge_team_delta(self.teams[away_index], away_delta)
+            merge_team_delta(self.teams[home_index], home_delta)
+            winners.append(TeamSide(winner))
+
+        self.day += 1
+        return winners
+
+    def map_tasks(self, executor: ProcessPoolExecutor, function, tasks: list) -> list:
+        """
+        Splits a day's tasks into one chunk per worker.
+        :return: Results of every task.
+        """
+        chunk_count = min(self.workers, len(tasks))
+        chunks = [tasks[chunk::chunk_count] for chunk in range(chunk_count)]
+        return [result for chunk_results in executor.map(function, [self.context] * len(chunks), chunks) for result in chunk_results]
+
+    def play_season(self, days: int = None) -> list:
+        """
+        Plays the rest of the schedule (or the given number of days).
+        :return: Standings after the last day played.
+        """
+        last_day = len(self.schedule) if days is None else min(len(self.schedule), self.day + days)
+        if self.workers == 0:
+            while self.day < last_day:
+                self.play_day()
+        elif self.shared_attributes:
+            self.league = TableLeague.from_teams(self.teams, shared=True)
+            table = self.league.table
+            try:
+                initargs = (self.matchup_cache_seed, table.get_shared_memory_name(), len(table), self.league.team_shells, self.league.team_offsets)
+                with ProcessPoolExecutor(self.workers, initializer=initialize_worker, initargs=initargs) as executor:
+                    while self.day < last_day:
+                        self.play_day(executor)
+            finally:
+                self.league = None
+                table.close()
+                table.unlink()
+        else:
+            with ProcessPoolExecutor(self.workers, initializer=initialize_worker, initargs=(self.matchup_cache_seed,)) as executor:
+                while self.day < last_day:
+                    self.play_day(executor)
+        return get_standings(self.teams)
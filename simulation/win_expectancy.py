@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import Executor, Future
+
+import numpy as np
+
+from data.rng import resolve_generator
+from data.team import Team
+from simulation.base_out import BASE_MASKS, SECOND_BASE
+from simulation.game_simulation import REGULATION_HALF_INNINGS, Game, GameSnapshot, TeamSide
+from simulation.lockstep_engine import LINEUP_SIZE, LockstepGames
+
+WIN_EXPECTANCY_PATH = 'sources/win_expectancy.npy'
+WIN_EXPECTANCY_HALF_INNINGS = REGULATION_HALF_INNINGS + 2  # every extra inning plays like the 10th
+WIN_EXPECTANCY_MAX_RUN_DIFFERENTIAL = 15  # bigger leads are looked up as this one
+WIN_EXPECTANCY_GAMES_PER_STATE = 1000
+LIVE_WIN_PROBABILITY_SIMULATIONS = 2000
+
+
+def get_live_situation(snapshot: GameSnapshot) -> (int, int, int, float):
+    """
+    Situation a game carries on from: after a completed half inning that's the start of the next one.
+    :return: Half inning, outs and bases to play from, and the home win probability if the game is already decided
+    (None otherwise).
+    """
+    half_inning, outs, bases = snapshot.half_inning, snapshot.outs, snapshot.bases
+    run_differential = snapshot.get_run_differential()
+    is_bottom = half_inning % 2 == TeamSide.HOME_TEAM.value
+    if snapshot.is_final or (half_inning >= REGULATION_HALF_INNINGS - 1 and is_bottom and run_differential > 0):  # walk-off
+        return half_inning, outs, bases, float(run_differential > 0)
+    if outs >= 3:
+        # same rule as Game.play_game #
+        if half_inning >= REGULATION_HALF_INNINGS - 2 and (run_differential != 0 if is_bottom else run_differential > 0):
+            return half_inning, outs, bases, float(run_differential > 0)
+        half_inning += 1
+        outs = 0
+        bases = 1 << SECOND_BASE if half_inning >= REGULATION_HALF_INNINGS else 0
+    return half_inning, outs, bases, None
+
+
+class WinExpectancyTable:
+    """
+    Home win probability by half inning, outs, bases and run differential, built once by mass simulation and kept on
+    disk. Lookups are a few integer operations, so they can follow every event of a live game.
+    """
+
+    def __init__(self, probabilities: np.ndarray):
+        """
+        :param probabilities: Array of shape (half innings, outs, base masks, run differentials), home minus away
+        run differential from -max to +max.
+        """
+        self.probabilities = probabilities
+        self.max_run_differential = (probabilities.shape[3] - 1) // 2
+
+    def __repr__(self):
+        return 'WinExpectancyTable(' + 'x'.join(str(size) for size in self.probabilities.shape) + ')'
+
+    @staticmethod
+    def build(teams: list, games_per_state: int = WIN_EXPECTANCY_GAMES_PER_STATE, rng: np.random.Generator = None, max_run_differential: int = WIN_EXPECTANCY_MAX_RUN_DIFFERENTIAL) -> 'WinExpectancyTable':
+        """
+        From every (half inning, outs, bases) state, plays games between random pairs of teams (random batters due up)
+        to the end of regulation, or of the current extra inning, whatever the score. The runs each side adds don't
+        depend on the score until then, so one pass covers every run differential: the home team wins if it ends up
+        ahead, and a tie goes to extra innings, won as often as from the start of the 10th.
+        :param teams: League to draw the matchups from (lineups already set).
+        :param games_per_state: Games simulated from each state.
+        """
+        rng = resolve_generator(rng)
+        half_innings, outs, bases = [values.ravel() for values in np.meshgrid(np.arange(WIN_EXPECTANCY_HALF_INNINGS), np.arange(3), np.arange(BASE_MASKS), indexing='ij')]
+        total_games = len(half_innings) * games_per_state
+        away = rng.integers(len(teams), size=total_games)
+        home = (away + rng.integers(1, len(teams), size=total_games)) % len(teams)  # never the away team
+        start_half_innings = np.repeat(half_innings, games_per_state)
+        final_half_innings = np.maximum(REGULATION_HALF_INNINGS - 1, start_half_innings | 1)  # through a bottom half
+        games = LockstepGames(teams, away, home, rng, final_half_inning=final_half_innings)
+        games.set_state(start_half_innings, np.repeat(outs, games_per_state), np.repeat(bases, games_per_state), batter_on_plate=rng.integers(LINEUP_SIZE, size=(total_games, 2)))
+        games.play()
+
+        added_differential = (games.game_runs[:, TeamSide.HOME_TEAM.value] - games.game_runs[:, TeamSide.AWAY_TEAM.value]).reshape(len(half_innings), games_per_state)
+        final_differential = added_differential[:, :, None] + np.arange(-max_run_differential, max_run_differential + 1)
+        home_ahead = (final_differential > 0).mean(axis=1)
+        tied = (final_differential == 0).mean(axis=1)
+
+        # extra innings: tied at the start of the 10th with a runner on second #
+        extra_state = np.flatnonzero((half_innings == REGULATION_HALF_INNINGS) & (outs == 0) & (bases == 1 << SECOND_BASE))[0]
+        extra_home_ahead = home_ahead[extra_state, max_run_differential]
+        extra_tied = tied[extra_state, max_run_differential]
+        extra_win_probability = extra_home_ahead / max(1 - extra_tied, 1e-12)
+
+        probabilities = home_ahead + tied * extra_win_probability
+        return WinExpectancyTable(probabilities.reshape(WIN_EXPECTANCY_HALF_INNINGS, 3, BASE_MASKS, -1).astype(np.float32))
+
+    @staticmethod
+    def load(path: str = WIN_EXPECTANCY_PATH) -> 'WinExpectancyTable':
+        return WinExpectancyTable(np.load(path))
+
+    def save(self, path: str = WIN_EXPECTANCY_PATH) -> None:
+        np.save(path, self.probabilities)
+
+    def lookup(self, half_inning: int, outs: int, bases: int, run_differential: int) -> float:
+        """
+        :param run_differential: Home runs minus away runs.
+        :return: Home win probability from the start of a plate appearance in this situation.
+        """
+        if half_inning >= REGULATION_HALF_INNINGS:
+            half_inning = REGULATION_HALF_INNINGS + half_inning % 2
+        run_differential = min(max(run_differential, -self.max_run_differential), self.max_run_differential)
+        return float(self.probabilities[half_inning, outs, bases, run_differential + self.max_run_differential])
+
+    def get_home_win_probability(self, snapshot: GameSnapshot) -> float:
+        half_inning, outs, bases, decided = get_live_situation(snapshot)
+        if decided is not None:
+            return decided
+        return self.lookup(half_inning, outs, bases, snapshot.get_run_differential())
+
+
+def get_win_expectancy_table(teams: list = None, path: str = WIN_EXPECTANCY_PATH, games_per_state: int = WIN_EXPECTANCY_GAMES_PER_STATE, rng: np.random.Generator = None) -> WinExpectancyTable:
+    """
+    Loads the table from disk, building and saving it first if it isn't there yet.
+    :param teams: League to build it from (needed only if there is no saved table).
+    """
+    if not os.path.exists(path):
+        if teams is None:
+            raise FileNotFoundError('No win expectancy table at ' + path + ', pass teams to build one.')
+        WinExpectancyTable.build(teams, games_per_state, rng).save(path)
+    return WinExpectancyTable.load(path)
+
+
+def simulate_win_probability(away_team: Team, home_team: Team, snapshot: GameSnapshot, simulations: int = LIVE_WIN_PROBABILITY_SIMULATIONS, rng: np.random.Generator = None) -> float:
+    """
+    Plays the rest of a game from a snapshot a number of times with the actual lineups and the batters due up.
+    Slower than a table lookup, but specific to the matchup.
+    :return: Home win probability.
+    """
+    half_inning, outs, bases, decided = get_live_situation(snapshot)
+    if decided is not None:
+        return decided
+    games = LockstepGames([away_team, home_team], np.zeros(simulations, dtype=int), np.ones(simulations, dtype=int), rng)
+    games.set_state(half_inning, outs, bases, snapshot.game_runs, snapshot.batter_on_plate)
+    return float(np.mean(games.play() == TeamSide.HOME_TEAM.value))
+
+def submit_win_probability(executor: Executor, game: Game, simulations: int = LIVE_WIN_PROBABILITY_SIMULATIONS, rng: np.random.Generator = None) -> Future:
+    """
+    Runs simulate_win_probability for the game's current situation on a worker, so a broadcast doesn't wait on it.
+    :return: Future of the home win probability.
+    """
+    return executor.submit(simulate_win_probability, game.away_team, game.home_team, game.get_snapshot(), simulations, rng)